@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Kalshi History Backfill
+One-shot job that loads real trade history for a date range into the same
+trade store the daily job uses: lists every series, the markets of each series
+that were open during the range, then walks /markets/trades per ticker on a
+bounded worker pool.
+
+Every stored page is committed together with a per-ticker checkpoint (window,
+next cursor, finished flag), so a killed job resumes where it stopped and
+tickers already backfilled for the window are skipped. A run with no failures
+records the window as covered, so the dashboard reads its days as complete.
+
+Usage:
+    python backfill_kalshi_history.py --start 2025-01-01
+    python backfill_kalshi_history.py --start 2025-01-01 --end 2025-06-30 --workers 16
+    python backfill_kalshi_history.py --start 2025-01-01 --base-url http://127.0.0.1:8000/trade-api/v2
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from shared.http_client import call_with_failover, request_with_failover
+from shared.trade_store import KALSHI_TRADES_DB, TradeStore
+from ingest_kalshi_trades import API_ENDPOINTS, TRADES_PAGE_LIMIT, parse_trade
+from update_kalshi_data import fetch_series_tickers, iter_market_pages
+
+DEFAULT_WORKERS = 8
+# Print a progress line every this many finished tickers
+PROGRESS_EVERY = 100
+
+
+def parse_date(value):
+    """'YYYY-MM-DD' -> epoch seconds at 00:00 UTC"""
+    return int(datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+
+
+def parse_time(value):
+    if not value:
+        return None
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+def list_market_tickers(endpoints, series_ticker, start_ts, end_ts):
+    """Tickers of a series' markets that were open at some point in [start_ts, end_ts)"""
+    params = {"series_ticker": series_ticker, "min_close_ts": start_ts}
+
+    def walk(session, base_url):
+        return [m for page in iter_market_pages(session, base_url, params) for m in page]
+
+    _, markets = call_with_failover(endpoints, walk)
+    tickers = []
+    for m in markets:
+        opened = parse_time(m.get("open_time"))
+        if m.get("ticker") and (opened is None or opened < end_ts):
+            tickers.append(m["ticker"])
+    return tickers
+
+
+def resume_cursor(checkpoint, start_ts, end_ts):
+    """
+    None if the ticker is already backfilled for the window, else the cursor to
+    start from ("" for a fresh walk, or the saved cursor of an interrupted one)
+    """
+    if not checkpoint:
+        return ""
+    same_window = (checkpoint["start_ts"], checkpoint["end_ts"]) == (start_ts, end_ts)
+    if checkpoint["done"]:
+        covered = checkpoint["start_ts"] <= start_ts and checkpoint["end_ts"] >= end_ts
+        return None if covered else ""
+    return (checkpoint["cursor"] or "") if same_window else ""
+
+
+def backfill_ticker(store, write_lock, endpoints, ticker, start_ts, end_ts):
+    """Walk one ticker's trades in the window; returns (new trades, skipped)"""
+    with write_lock:
+        cursor = resume_cursor(store.get_checkpoint(ticker), start_ts, end_ts)
+    if cursor is None:
+        return 0, True
+
+    inserted = 0
+    while True:
+        params = {"ticker": ticker, "min_ts": start_ts, "max_ts": end_ts - 1,
+                  "limit": TRADES_PAGE_LIMIT}
+        if cursor:
+            params["cursor"] = cursor
+        _, response = request_with_failover(endpoints, "/markets/trades", params=params)
+        data = response.json()
+        rows = [parse_trade(t) for t in data.get("trades") or []]
+        cursor = data.get("cursor") or ""
+        done = not cursor or not rows
+        with write_lock:
+            inserted += store.append_backfill_page(ticker, rows, start_ts, end_ts, cursor, done)
+        if done:
+            return inserted, False
+
+
+def backfill(store, start_ts, end_ts, endpoints=API_ENDPOINTS, workers=DEFAULT_WORKERS):
+    """Backfill every market open during [start_ts, end_ts); returns a stats dict"""
+    started = int(time.time())
+    _, series_tickers = call_with_failover(endpoints, fetch_series_tickers)
+    print(f"Listing markets of {len(series_tickers):,} series...")
+
+    stats = {"series": len(series_tickers), "tickers": 0, "skipped": 0, "trades": 0, "failed": []}
+    write_lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        tickers = []
+        futures = {pool.submit(list_market_tickers, endpoints, s, start_ts, end_ts): s
+                   for s in series_tickers}
+        for future in as_completed(futures):
+            try:
+                tickers.extend(future.result())
+            except Exception as e:
+                stats["failed"].append(f"series {futures[future]}: {e}")
+        tickers = sorted(set(tickers))
+        stats["tickers"] = len(tickers)
+        print(f"Backfilling trades of {len(tickers):,} markets with {workers} workers...")
+
+        futures = {pool.submit(backfill_ticker, store, write_lock, endpoints, t, start_ts, end_ts): t
+                   for t in tickers}
+        for finished, future in enumerate(as_completed(futures), 1):
+            try:
+                inserted, skipped = future.result()
+                stats["trades"] += inserted
+                stats["skipped"] += skipped
+            except Exception as e:
+                stats["failed"].append(f"{futures[future]}: {e}")
+            if finished % PROGRESS_EVERY == 0:
+                print(f"  {finished:,}/{len(tickers):,} markets, {stats['trades']:,} new trades")
+    if not stats["failed"]:
+        # Trades after the job started may be missing for tickers walked early
+        store.extend_coverage(f"backfill:{start_ts}", start_ts, min(end_ts, started))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill Kalshi trade history into the local trade store")
+    parser.add_argument("--start", required=True, help="first UTC day to backfill (YYYY-MM-DD)")
+    parser.add_argument("--end", help="UTC day after the last one to backfill (default: today)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"concurrent requests (default {DEFAULT_WORKERS})")
+    parser.add_argument("--base-url", help="use this API base URL instead of the Kalshi endpoints "
+                                           "(e.g. a local fixture server)")
+    parser.add_argument("--db", default=KALSHI_TRADES_DB, help="trade store path")
+    args = parser.parse_args()
+
+    start_ts = parse_date(args.start)
+    end_ts = parse_date(args.end) if args.end else (int(time.time()) // 86400 + 1) * 86400
+    if end_ts <= start_ts:
+        parser.error("--end must be after --start")
+    endpoints = [args.base_url.rstrip("/")] if args.base_url else API_ENDPOINTS
+
+    store = TradeStore(args.db)
+    try:
+        started = time.monotonic()
+        stats = backfill(store, start_ts, end_ts, endpoints, args.workers)
+        print(f"Backfill stored {stats['trades']:,} new trades from {stats['tickers']:,} markets "
+              f"({stats['skipped']:,} already done) in {time.monotonic() - started:.1f}s")
+        print(f"Refreshed rollups for {store.refresh_rollups()} day(s), "
+              f"candles for {store.refresh_candles()} day(s)")
+        print(f"Trade store now holds {store.trade_count():,} trades")
+    finally:
+        store.close()
+
+    for failure in stats["failed"][:20]:
+        print(f"  failed: {failure}")
+    if stats["failed"]:
+        print(f"{len(stats['failed'])} series/markets failed; rerun the same command to resume")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Kalshi Drill-down Page Generator
+Writes one page per event ticker and per top-N market (by 24h volume) from the
+per-market snapshot saved by update_kalshi_data.py (kalshi_markets.json).
+
+Every page is a shard with an input hash (its data plus the template). The
+hashes of the last run are kept in kalshi/drilldowns.json; only shards whose
+hash changed, or whose file is missing, are rendered, on a process pool.
+Pages of events and markets that dropped out of the snapshot are removed.
+
+When the run's market delta (kalshi_markets_delta.json, see
+shared.snapshot_diff) picks up exactly where the last rendered snapshot left
+off, only the shards of markets in the delta, of markets entering or leaving
+the top N, and of their events are hashed; every other shard keeps its hash.
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Get the directory where this script is located
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from shared.renderer import LAST_UPDATED, file_hash, load_template, write_if_changed
+from shared.snapshot_diff import load_delta
+
+MARKETS_PATH = os.path.join(SCRIPT_DIR, "kalshi_markets.json")
+DELTA_PATH = os.path.join(SCRIPT_DIR, "kalshi_markets_delta.json")
+TEMPLATE_PATH = os.path.join(SCRIPT_DIR, "templates", "drilldown.html")
+OUTPUT_DIR = os.path.join(ROOT_DIR, "kalshi")
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "drilldowns.json")
+
+# Markets with the largest 24h volume that get their own page
+TOP_MARKETS = 500
+# Shards handed to a worker process at a time
+CHUNK_SIZE = 64
+
+
+def safe_name(ticker):
+    """File name for a ticker (Kalshi tickers are already mostly [A-Z0-9-.])"""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", ticker)
+
+
+def fmt_count(value):
+    return f"{int(value or 0):,}"
+
+
+def metric_card(label, value):
+    return (f'            <div class="metric-card"><div class="label">{html.escape(label)}</div>'
+            f'<div class="value">{html.escape(value)}</div></div>')
+
+
+def table_row(cells):
+    """cells: (html, numeric) pairs; html must already be escaped"""
+    return "                <tr>" + "".join(
+        f'<td class="num">{cell}</td>' if numeric else f"<td>{cell}</td>" for cell, numeric in cells
+    ) + "</tr>"
+
+
+def table_head(columns):
+    return "".join(f'<th class="num">{name}</th>' if numeric else f"<th>{name}</th>"
+                   for name, numeric in columns)
+
+
+def market_link(market, prefix):
+    ticker = html.escape(market["ticker"])
+    if market.get("has_page"):
+        return f'<a href="{prefix}{safe_name(market["ticker"])}.html">{ticker}</a>'
+    return ticker
+
+
+# -- shard payloads (built in the parent, hashed, rendered in workers) -------
+
+def rank_markets(markets):
+    """Markets by 24h volume, largest first (ticker breaks ties so the order is stable)"""
+    return sorted(markets, key=lambda m: (-(m.get("volume_24h") or 0), m["ticker"]))
+
+
+def build_shards(ranked, top_n=TOP_MARKETS):
+    """
+    {relative path: (kind, payload)} for every event page and every top-N market
+    page, plus {event ticker: markets} in ranked order
+    """
+    top = {m["ticker"] for m in ranked[:top_n]}
+
+    events = {}
+    for m in ranked:
+        events.setdefault(m.get("event_ticker") or m["ticker"], []).append(
+            dict(m, has_page=m["ticker"] in top))
+
+    shards = {}
+    for event_ticker, event_markets in events.items():
+        shards[f"events/{safe_name(event_ticker)}.html"] = (
+            "event", {"event_ticker": event_ticker, "markets": event_markets})
+    for m in ranked[:top_n]:
+        shards[f"markets/{safe_name(m['ticker'])}.html"] = ("market", {"market": m})
+    return shards, events
+
+
+def shard_hash(kind, payload, template_hash):
+    encoded = json.dumps([kind, payload, template_hash], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+# -- rendering ----------------------------------------------------------------
+
+def render_event(payload):
+    markets = payload["markets"]
+    volume = sum(m.get("volume_24h") or 0 for m in markets)
+    open_interest = sum(m.get("open_interest") or 0 for m in markets)
+    title = markets[0].get("title") if len(markets) == 1 else None
+    rows = "\n".join(table_row([
+        (market_link(m, "../markets/"), False),
+        (html.escape(m.get("title") or ""), False),
+        (html.escape(m.get("status") or ""), False),
+        (fmt_count(m.get("volume_24h")), True),
+        (fmt_count(m.get("open_interest")), True),
+    ]) for m in markets)
+    return dict(
+        title=html.escape(payload["event_ticker"]),
+        subtitle=html.escape(title or f"{len(markets):,} markets"),
+        home="../../index.html",
+        index="index.html",
+        index_label="All events",
+        metrics="\n".join([
+            metric_card("24h Volume (contracts)", fmt_count(volume)),
+            metric_card("Open Interest", fmt_count(open_interest)),
+            metric_card("Markets", fmt_count(len(markets))),
+        ]),
+        columns=table_head([("Market", False), ("Title", False), ("Status", False),
+                            ("24h Volume", True), ("Open Interest", True)]),
+        rows=rows,
+    )
+
+
+def render_market(payload):
+    m = payload["market"]
+    event_ticker = m.get("event_ticker") or m["ticker"]
+    fields = [
+        ("Event", f'<a href="../events/{safe_name(event_ticker)}.html">{html.escape(event_ticker)}</a>'),
+        ("Status", html.escape(m.get("status") or "")),
+        ("Close time", html.escape(m.get("close_time") or "")),
+    ]
+    return dict(
+        title=html.escape(m["ticker"]),
+        subtitle=html.escape(m.get("title") or ""),
+        home="../../index.html",
+        index="index.html",
+        index_label=f"Top {TOP_MARKETS} markets",
+        metrics="\n".join([
+            metric_card("24h Volume (contracts)", fmt_count(m.get("volume_24h"))),
+            metric_card("Open Interest", fmt_count(m.get("open_interest"))),
+        ]),
+        columns=table_head([("Field", False), ("Value", False)]),
+        rows="\n".join(table_row([(name, False), (value, False)]) for name, value in fields),
+    )
+
+
+RENDERERS = {"event": render_event, "market": render_market}
+
+
+def render_shard(job):
+    """Worker: render one shard and write it if its bytes changed; returns (path, written)"""
+    rel_path, kind, payload = job
+    page = load_template(TEMPLATE_PATH).render(**RENDERERS[kind](payload))
+    return rel_path, write_if_changed(os.path.join(OUTPUT_DIR, rel_path), page)
+
+
+def render_index(kind, markets_or_events, last_updated):
+    """Listing page for events/ or markets/ (always rendered; it is one small page each)"""
+    if kind == "events":
+        rows = "\n".join(table_row([
+            (f'<a href="{safe_name(e)}.html">{html.escape(e)}</a>', False),
+            (fmt_count(len(ms)), True),
+            (fmt_count(sum(m.get("volume_24h") or 0 for m in ms)), True),
+            (fmt_count(sum(m.get("open_interest") or 0 for m in ms)), True),
+        ]) for e, ms in markets_or_events)
+        columns = [("Event", False), ("Markets", True), ("24h Volume", True), ("Open Interest", True)]
+        title, count_label = "Kalshi Events", "Events"
+    else:
+        rows = "\n".join(table_row([
+            (market_link(dict(m, has_page=True), ""), False),
+            (html.escape(m.get("title") or ""), False),
+            (fmt_count(m.get("volume_24h")), True),
+            (fmt_count(m.get("open_interest")), True),
+        ]) for m in markets_or_events)
+        columns = [("Market", False), ("Title", False), ("24h Volume", True), ("Open Interest", True)]
+        title, count_label = f"Top {TOP_MARKETS} Kalshi Markets by 24h Volume", "Markets"
+    other = "markets" if kind == "events" else "events"
+    return load_template(TEMPLATE_PATH).render(
+        title=title,
+        subtitle=f"Last Updated: {html.escape(last_updated)}",
+        home="../../index.html",
+        index=f"../{other}/index.html",
+        index_label=f"All {other}" if other == "events" else f"Top {TOP_MARKETS} markets",
+        metrics=metric_card(count_label, fmt_count(len(markets_or_events))),
+        columns=table_head(columns),
+        rows=rows,
+    )
+
+
+def load_manifest():
+    """{pages: {path: hash}, snapshot: run id, template: hash} of the last run (empty if none)"""
+    try:
+        with open(MANIFEST_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def affected_shards(delta, ranked, previous_pages, top_n=TOP_MARKETS):
+    """
+    Shard paths a delta can have changed: pages of the markets in it, of
+    markets whose top-N membership flipped, and of all their events
+    """
+    columns = delta["columns"]
+    tickers = set(columns["tickers"])
+    event_of = {m["ticker"]: m.get("event_ticker") or m["ticker"] for m in ranked}
+    top_pages = {f"markets/{safe_name(m['ticker'])}.html": m["ticker"] for m in ranked[:top_n]}
+    old_top = {path for path in previous_pages if path.startswith("markets/")}
+    by_page = {f"markets/{safe_name(t)}.html": t for t in event_of}
+    tickers |= {by_page[path] for path in old_top ^ top_pages.keys() if path in by_page}
+
+    events = {event or ticker for ticker, event in zip(columns["tickers"], columns["events"])}
+    events |= {event_of[t] for t in tickers if t in event_of}
+    return ({f"markets/{safe_name(t)}.html" for t in tickers}
+            | {f"events/{safe_name(e)}.html" for e in events})
+
+
+def generate(markets, last_updated, workers=None, force=False, snapshot_run=None, delta=None):
+    """Render changed shards, drop stale ones, rewrite the indexes and the manifest"""
+    template_hash = file_hash(TEMPLATE_PATH)
+    ranked = rank_markets(markets)
+    shards, events = build_shards(ranked)
+
+    manifest = load_manifest()
+    previous = manifest.get("pages", {})
+    incremental = (not force and delta is not None and snapshot_run is not None
+                   and delta.get("current_run") == snapshot_run
+                   and delta.get("previous_run") == manifest.get("snapshot")
+                   and manifest.get("template") == template_hash)
+    affected = affected_shards(delta, ranked, previous) if incremental else None
+    hashes = {path: previous[path] if affected is not None and path not in affected and path in previous
+              else shard_hash(kind, payload, template_hash)
+              for path, (kind, payload) in shards.items()}
+    jobs = [(path, kind, payload) for path, (kind, payload) in shards.items()
+            if force or previous.get(path) != hashes[path]
+            or not os.path.exists(os.path.join(OUTPUT_DIR, path))]
+
+    written = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for _, changed in pool.map(render_shard, jobs, chunksize=CHUNK_SIZE):
+                written += changed
+
+    removed = 0
+    for path in previous:
+        if path not in shards:
+            try:
+                os.remove(os.path.join(OUTPUT_DIR, path))
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+    event_list = sorted(events.items(),
+                        key=lambda e: (-sum(m.get("volume_24h") or 0 for m in e[1]), e[0]))
+    write_if_changed(os.path.join(OUTPUT_DIR, "events", "index.html"),
+                     render_index("events", event_list, last_updated), LAST_UPDATED)
+    write_if_changed(os.path.join(OUTPUT_DIR, "markets", "index.html"),
+                     render_index("markets", ranked[:TOP_MARKETS], last_updated), LAST_UPDATED)
+
+    manifest = json.dumps({"snapshot": snapshot_run, "template": template_hash,
+                           "pages": dict(sorted(hashes.items()))}, indent=1)
+    write_if_changed(MANIFEST_PATH, manifest.encode("utf-8"))
+    hashed = len(shards) if affected is None else len(affected & shards.keys())
+    return {"shards": len(shards), "hashed": hashed, "rendered": len(jobs), "written": written,
+            "removed": removed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Kalshi per-event and top-market pages")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="re-render every shard")
+    args = parser.parse_args()
+
+    if not os.path.exists(MARKETS_PATH):
+        print(f"No per-market data at {MARKETS_PATH}, skipping drill-down pages")
+        return
+    with open(MARKETS_PATH, "r") as f:
+        snapshot = json.load(f)
+
+    stats = generate(snapshot["markets"], snapshot.get("last_updated", ""),
+                     workers=args.workers, force=args.force,
+                     snapshot_run=snapshot.get("snapshot"), delta=load_delta(DELTA_PATH))
+    print(f"Drill-down pages: {stats['shards']:,} shards, {stats['hashed']:,} hashed, "
+          f"{stats['rendered']:,} rendered, {stats['written']:,} written, {stats['removed']:,} removed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Kalshi Trade Ingestion
+Pulls new trades from /markets/trades into the local trade store, resuming from
+the stored high-water timestamp (or an interrupted cursor walk) so each run only
+fetches trades it has not seen yet, then refreshes the daily/weekly rollups for
+the days those trades touched. Each completed walk extends the store's recorded
+coverage, so a cold start's partial first day is not read as a full one.
+
+Usage:
+    python ingest_kalshi_trades.py            # ingest new trades, refresh rollups
+    python ingest_kalshi_trades.py --verify   # check rollups against a full rebuild
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from shared.http_client import DEFAULT_TIMEOUT, call_with_failover
+from shared.trade_store import KALSHI_TRADES_DB, TradeStore
+
+# KALSHI_API_BASE replaces the public endpoints with one base URL (e.g. a local fixture server)
+API_ENDPOINTS = [os.environ["KALSHI_API_BASE"]] if os.environ.get("KALSHI_API_BASE") else [
+    "https://api.elections.kalshi.com/trade-api/v2",
+    "https://trading-api.kalshi.com/trade-api/v2",
+    "https://api.kalshi.com/trade-api/v2"
+]
+
+STREAM = "kalshi:trades"
+# /markets/trades accepts up to 1000 rows per page
+TRADES_PAGE_LIMIT = 1000
+# First run with an empty store only looks back this far; older history is a backfill job
+INITIAL_LOOKBACK_DAYS = 2
+# Re-read this much before the high-water mark to catch trades published late
+OVERLAP_SECONDS = 300
+
+
+def parse_trade(trade):
+    """API trade dict -> trade store row"""
+    created = datetime.fromisoformat(trade["created_time"].replace("Z", "+00:00"))
+    count = trade.get("count_fp") or trade.get("count") or 0
+    return (
+        trade["trade_id"],
+        trade["ticker"],
+        int(created.timestamp()),
+        float(count),
+        trade.get("yes_price"),
+        trade.get("taker_side"),
+    )
+
+
+def ingest_new_trades(store, endpoints=API_ENDPOINTS):
+    """
+    Fetch every trade since the last run into store. Each page is committed
+    together with the cursor that follows it, so an interrupted walk resumes at
+    the next page; the high-water mark and the covered span only advance once
+    the walk completes. Returns the number of new trades stored.
+    """
+    started = int(time.time())
+    state = store.get_state(STREAM)
+    if state.get("pending_min_ts") is not None:
+        min_ts = state["pending_min_ts"]
+        cursor = state.get("cursor")
+        print(f"Resuming interrupted trade ingestion from ts {min_ts}")
+    else:
+        high_water = state.get("high_water_ts")
+        if high_water is None:
+            min_ts = started - INITIAL_LOOKBACK_DAYS * 86400
+        else:
+            min_ts = high_water - OVERLAP_SECONDS
+        cursor = None
+    high_water = state.get("high_water_ts")
+
+    def walk(session, base_url):
+        nonlocal cursor, high_water
+        inserted = 0
+        while True:
+            params = {"limit": TRADES_PAGE_LIMIT, "min_ts": min_ts}
+            if cursor:
+                params["cursor"] = cursor
+            response = session.get(f"{base_url}/markets/trades", params=params, timeout=DEFAULT_TIMEOUT)
+            response.raise_for_status()
+            data = response.json()
+            rows = [parse_trade(t) for t in data.get("trades") or []]
+            cursor = data.get("cursor") or None
+            if rows:
+                page_max = max(row[2] for row in rows)
+                high_water = page_max if high_water is None else max(high_water, page_max)
+            pending = {"high_water_ts": high_water, "pending_min_ts": min_ts, "cursor": cursor}
+            inserted += store.append_trades(rows, STREAM, pending)
+            if not cursor or not rows:
+                break
+        store.set_state(STREAM, high_water_ts=high_water)
+        # Pages run newest first, so a resumed walk is only complete up to its newest trade
+        store.extend_coverage(STREAM, min_ts, started if high_water is None else min(started, high_water + 1))
+        return inserted
+
+    base_url, inserted = call_with_failover(endpoints, walk)
+    print(f"Ingested {inserted:,} new trades from {base_url}")
+    return inserted
+
+
+def verify_rollups(store):
+    """Compare incremental rollups with a full rebuild; returns True if they match"""
+    mismatches = store.verify_rollups()
+    for mismatch in mismatches[:20]:
+        print(f"  {mismatch}")
+    if mismatches:
+        print(f"Rollup verification FAILED: {len(mismatches)} mismatched bucket(s)")
+        return False
+    print("Rollup verification passed: incremental rollups match a full rebuild")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--verify", action="store_true",
+                        help="check the incremental rollups against a full rebuild and exit")
+    args = parser.parse_args()
+
+    store = TradeStore(KALSHI_TRADES_DB)
+    try:
+        if args.verify:
+            store.refresh_rollups()
+            sys.exit(0 if verify_rollups(store) else 1)
+        ingest_new_trades(store)
+        print(f"Refreshed rollups for {store.refresh_rollups()} day(s)")
+        print(f"Trade store now holds {store.trade_count():,} trades")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Polygon OrderFilled / OrdersMatched 日志解码器
+
+通过批量 JSON-RPC (eth_getLogs) 按区块区间拉取 CTF Exchange 与 NegRisk CTF Exchange
+的事件日志，区间结果过多时自适应二分拆分；ABI data 用 NumPy 整批解码，而不是逐条解析。
+RPC 地址可以指向本地 JSON-RPC 替身或回放录制 fixture 的服务，便于离线验证。
+
+用法:
+    python polygon_logs.py --from-block 65000000 --to-block 65001000 [--rpc-url URL]
+"""
+
+import argparse
+import os
+import sys
+from collections import deque
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.http_client import DEFAULT_TIMEOUT, get_session
+
+POLYGON_RPC_URL = os.environ.get("POLYGON_RPC_URL", "https://polygon-rpc.com")
+
+# keccak256("OrderFilled(bytes32,address,address,uint256,uint256,uint256,uint256,uint256)")
+ORDER_FILLED_TOPIC = "0xd0a08e8c493f9c94f29311604c9de1b4e8c8d4c06bd0c789af57f2d65bfec0f6"
+# keccak256("OrdersMatched(bytes32,address,uint256,uint256,uint256,uint256)")
+ORDERS_MATCHED_TOPIC = "0x63bf4d16b7fa898ef4c4b2b6d90fd201e9c56313b65638af6088d149d2ce956c"
+
+# 每个事件 data 中的 uint256 字段（按 ABI 顺序）
+ORDER_FILLED_FIELDS = ("maker_asset_id", "taker_asset_id", "maker_amount", "taker_amount", "fee")
+ORDERS_MATCHED_FIELDS = ("maker_asset_id", "taker_asset_id", "maker_amount", "taker_amount")
+ASSET_FIELDS = ("maker_asset_id", "taker_asset_id")
+
+# 初始区块区间大小、单个批量请求内的调用数
+DEFAULT_BLOCK_CHUNK = 2000
+DEFAULT_BATCH_SIZE = 20
+# 节点返回这些错误时说明区间太大，需要拆分
+RANGE_TOO_LARGE_CODES = {-32005}
+RANGE_TOO_LARGE_HINTS = ("more than", "too many", "exceed", "limit", "range is too large", "too large")
+
+# USDC (collateral) 的 asset id 为 0
+ZERO_WORD = b"0" * 64
+
+
+class RpcError(Exception):
+    """JSON-RPC 调用返回的错误"""
+
+    def __init__(self, error: Dict):
+        self.code = error.get("code")
+        self.message = error.get("message", "")
+        super().__init__(f"RPC error {self.code}: {self.message}")
+
+    @property
+    def range_too_large(self) -> bool:
+        message = self.message.lower()
+        return self.code in RANGE_TOO_LARGE_CODES or any(h in message for h in RANGE_TOO_LARGE_HINTS)
+
+
+class JsonRpcClient:
+    """批量 JSON-RPC 客户端（复用共享的 keep-alive 会话）"""
+
+    def __init__(self, url: str = POLYGON_RPC_URL, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.url = url
+        self.batch_size = batch_size
+        self.session = get_session(url)
+        self._next_id = 0
+
+    def batch(self, calls: Sequence[Tuple[str, list]]) -> List:
+        """
+        一次 HTTP 请求发送多条调用
+
+        Returns:
+            与 calls 顺序一致的结果列表；失败的调用对应位置为 RpcError
+        """
+        payload = []
+        for method, params in calls:
+            self._next_id += 1
+            payload.append({"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params})
+        response = self.session.post(self.url, json=payload, timeout=DEFAULT_TIMEOUT)
+        response.raise_for_status()
+        body = response.json()
+        if isinstance(body, dict):
+            # 不支持批量的节点会返回单个错误对象
+            raise RpcError(body.get("error") or {"message": str(body)})
+        by_id = {item.get("id"): item for item in body}
+        results = []
+        for request in payload:
+            item = by_id.get(request["id"], {"error": {"message": "missing response"}})
+            results.append(RpcError(item["error"]) if "error" in item else item.get("result"))
+        return results
+
+    def call(self, method: str, params: list):
+        result = self.batch([(method, params)])[0]
+        if isinstance(result, RpcError):
+            raise result
+        return result
+
+
+def iter_log_batches(rpc: JsonRpcClient, addresses: Sequence[str], from_block: int, to_block: int,
+                     topics: Sequence[str] = (ORDER_FILLED_TOPIC, ORDERS_MATCHED_TOPIC),
+                     block_chunk: int = DEFAULT_BLOCK_CHUNK) -> Iterator[List[Dict]]:
+    """
+    按区块区间批量拉取日志，每批 eth_getLogs 调用完成后 yield 一次
+
+    某个区间被节点拒绝（结果过多）时二分后重新排队，之后新切出的区间也缩小，
+    直到连续成功再逐步放大，使区间大小自适应事件密度。
+    """
+    filter_base = {"address": list(addresses), "topics": [list(topics)]}
+    pending = deque()
+    next_start = from_block
+    chunk = block_chunk
+
+    while pending or next_start <= to_block:
+        while len(pending) < rpc.batch_size and next_start <= to_block:
+            end = min(next_start + chunk - 1, to_block)
+            pending.append((next_start, end))
+            next_start = end + 1
+
+        ranges = [pending.popleft() for _ in range(min(rpc.batch_size, len(pending)))]
+        calls = [("eth_getLogs", [dict(filter_base, fromBlock=hex(a), toBlock=hex(b))]) for a, b in ranges]
+        results = rpc.batch(calls)
+
+        logs = []
+        split = False
+        for (start, end), result in reversed(list(zip(ranges, results))):
+            if isinstance(result, RpcError):
+                if not result.range_too_large or start == end:
+                    raise result
+                mid = (start + end) // 2
+                pending.appendleft((mid + 1, end))
+                pending.appendleft((start, mid))
+                split = True
+            else:
+                logs.extend(result or [])
+        if split:
+            chunk = max(1, chunk // 2)
+        elif chunk < block_chunk:
+            chunk = min(block_chunk, chunk * 2)
+        if logs:
+            logs.sort(key=lambda log: (int(log["blockNumber"], 16), int(log["logIndex"], 16)))
+            yield logs
+
+
+def _hex_words(logs: List[Dict], n_words: int) -> np.ndarray:
+    """所有日志的 data 拼接后一次性切成 (n, n_words) 的 64 字符十六进制字"""
+    joined = "".join(log["data"][2:2 + 64 * n_words] for log in logs).encode("ascii")
+    return np.frombuffer(joined, dtype="S64").reshape(len(logs), n_words)
+
+
+def _decode_amounts(logs: List[Dict], n_words: int, amount_positions: List[int]) -> np.ndarray:
+    """所有日志的 data 一次性解码为 (n, n_words) 的 uint64；数额字段超过 64 位时报错"""
+    raw = bytes.fromhex("".join(log["data"][2:2 + 64 * n_words] for log in logs))
+    words = np.frombuffer(raw, dtype=np.uint8).reshape(len(logs), n_words, 32)
+    if words[:, amount_positions, :24].any():
+        raise ValueError("数额字段超出 uint64 范围")
+    return np.ascontiguousarray(words[:, :, 24:]).view(">u8").reshape(len(logs), n_words).astype(np.uint64)
+
+
+def _topic_addresses(logs: List[Dict], position: int) -> np.ndarray:
+    return np.array([log["topics"][position][-40:].lower() for log in logs], dtype="S40")
+
+
+def _decode_group(logs: List[Dict], fields: Sequence[str]) -> Dict[str, np.ndarray]:
+    n_words = len(fields)
+    hex_words = _hex_words(logs, n_words)
+    amount_positions = [i for i, field in enumerate(fields) if field not in ASSET_FIELDS]
+    amounts = _decode_amounts(logs, n_words, amount_positions)
+    columns = {
+        "block_number": np.array([int(log["blockNumber"], 16) for log in logs], dtype=np.int64),
+        "log_index": np.array([int(log["logIndex"], 16) for log in logs], dtype=np.int32),
+        "tx_hash": np.array([log["transactionHash"][-64:].lower() for log in logs], dtype="S64"),
+        "exchange": np.array([log["address"][-40:].lower() for log in logs], dtype="S40"),
+        "maker": _topic_addresses(logs, 2),
+    }
+    for i, field in enumerate(fields):
+        if field in ASSET_FIELDS:
+            columns[field] = hex_words[:, i]
+        else:
+            columns[field] = amounts[:, i]
+    return columns
+
+
+def decode_logs(logs: List[Dict]) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    批量解码一批原始日志
+
+    Returns:
+        {"order_filled": 列字典, "orders_matched": 列字典}；每个列字典是等长的
+        NumPy 数组（struct of arrays）。地址为小写十六进制（无 0x），asset id 为
+        64 字符十六进制，数额为 uint64 原始单位（USDC 与 CTF 份额均为 6 位小数）。
+        OrderFilled 额外包含 taker 列；OrdersMatched 的 maker 列是 takerOrderMaker。
+    """
+    order_filled = [log for log in logs if log["topics"] and log["topics"][0].lower() == ORDER_FILLED_TOPIC]
+    orders_matched = [log for log in logs if log["topics"] and log["topics"][0].lower() == ORDERS_MATCHED_TOPIC]
+    decoded = {}
+    if order_filled:
+        decoded["order_filled"] = _decode_group(order_filled, ORDER_FILLED_FIELDS)
+        decoded["order_filled"]["taker"] = _topic_addresses(order_filled, 3)
+    if orders_matched:
+        decoded["orders_matched"] = _decode_group(orders_matched, ORDERS_MATCHED_FIELDS)
+    return decoded
+
+
+def fetch_block_timestamps(rpc: JsonRpcClient, block_numbers) -> Dict[int, int]:
+    """批量获取区块时间戳 {block_number: unix_ts}"""
+    blocks = sorted(set(int(b) for b in block_numbers))
+    timestamps = {}
+    for i in range(0, len(blocks), rpc.batch_size):
+        chunk = blocks[i:i + rpc.batch_size]
+        results = rpc.batch([("eth_getBlockByNumber", [hex(b), False]) for b in chunk])
+        for block, result in zip(chunk, results):
+            if isinstance(result, RpcError):
+                raise result
+            timestamps[block] = int(result["timestamp"], 16)
+    return timestamps
+
+
+def _attach_timestamps(rpc: JsonRpcClient, logs: List[Dict], decoded: Dict) -> None:
+    known = {int(log["blockNumber"], 16): int(log["blockTimestamp"], 16)
+             for log in logs if log.get("blockTimestamp")}
+    missing = {int(log["blockNumber"], 16) for log in logs} - known.keys()
+    if missing:
+        known.update(fetch_block_timestamps(rpc, missing))
+    for columns in decoded.values():
+        columns["timestamp"] = np.array([known[b] for b in columns["block_number"].tolist()], dtype=np.int64)
+
+
+def iter_decoded_events(rpc: JsonRpcClient, addresses: Sequence[str], from_block: int, to_block: int,
+                        block_chunk: int = DEFAULT_BLOCK_CHUNK) -> Iterator[Dict[str, Dict[str, np.ndarray]]]:
+    """逐批 yield 已解码（含区块时间戳）的事件列，内存只与单批大小相关"""
+    for logs in iter_log_batches(rpc, addresses, from_block, to_block, block_chunk=block_chunk):
+        decoded = decode_logs(logs)
+        _attach_timestamps(rpc, logs, decoded)
+        yield decoded
+
+
+def decode_receipt_logs(rpc: JsonRpcClient, tx_hash: str) -> Dict[str, Dict[str, np.ndarray]]:
+    """解码单笔交易回执中的 OrderFilled / OrdersMatched 事件"""
+    receipt = rpc.call("eth_getTransactionReceipt", [tx_hash])
+    logs = [log for log in (receipt or {}).get("logs", [])
+            if log["topics"] and log["topics"][0].lower() in (ORDER_FILLED_TOPIC, ORDERS_MATCHED_TOPIC)]
+    return decode_logs(logs)
+
+
+def to_rows(columns: Dict[str, np.ndarray]) -> List[Dict]:
+    """列字典转为逐事件的字典列表（仅用于展示少量事件）"""
+    names = list(columns)
+    rows = []
+    for values in zip(*(columns[name].tolist() for name in names)):
+        row = {}
+        for name, value in zip(names, values):
+            if isinstance(value, bytes):
+                value = value.decode("ascii")
+                value = str(int(value, 16)) if name in ASSET_FIELDS else "0x" + value
+            row[name] = value
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="拉取并解码 Polymarket OrderFilled / OrdersMatched 日志")
+    parser.add_argument("--rpc-url", default=POLYGON_RPC_URL)
+    parser.add_argument("--from-block", type=int, required=True)
+    parser.add_argument("--to-block", type=int, required=True)
+    parser.add_argument("--block-chunk", type=int, default=DEFAULT_BLOCK_CHUNK)
+    args = parser.parse_args()
+
+    from verify_double_counting import POLYMARKET_CONTRACTS
+    exchanges = [POLYMARKET_CONTRACTS["CTF_EXCHANGE"], POLYMARKET_CONTRACTS["NEGRISK_CTF_EXCHANGE"]]
+    rpc = JsonRpcClient(args.rpc_url)
+    counts = {"order_filled": 0, "orders_matched": 0}
+    for decoded in iter_decoded_events(rpc, exchanges, args.from_block, args.to_block, args.block_chunk):
+        for kind, columns in decoded.items():
+            counts[kind] += len(columns["block_number"])
+    print(f"区块 {args.from_block}-{args.to_block}: "
+          f"OrderFilled {counts['order_filled']:,} 条, OrdersMatched {counts['orders_matched']:,} 条")
+
+
+if __name__ == "__main__":
+    main()
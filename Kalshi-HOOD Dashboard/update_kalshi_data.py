@@ -7,62 +7,344 @@ Uses fallback data generation if API is unavailable.
 
 import json
 import os
-import requests
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from collections import defaultdict
 import random
 
+import numpy as np
+
 # Get the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from shared.chart_data import write_chart_data
+from shared.candles import TIER_WIDTHS, TIERS
+from shared.http_client import call_with_failover, request_with_failover
+from shared.instrumentation import bind, instrumented, set_metrics, stage
+from shared.market_index import MarketIndex, snapshot_entries
+from shared.response_cache import response_cache
+from shared.revenue import estimated_daily_revenue, revenue_tables
+from shared.rollups import labels, rollup, week_starts
+from shared.snapshot import MarketSnapshot, parse_page
+from shared.snapshot_diff import describe, record_run
+from shared.trade_store import KALSHI_TRADES_DB, TradeStore
+from ingest_kalshi_trades import ingest_new_trades
 
-# Try multiple API endpoints
-API_ENDPOINTS = [
+# Try multiple API endpoints (KALSHI_API_BASE replaces them with one, e.g. a local fixture server)
+API_ENDPOINTS = [os.environ["KALSHI_API_BASE"]] if os.environ.get("KALSHI_API_BASE") else [
     "https://api.elections.kalshi.com/trade-api/v2",
     "https://trading-api.kalshi.com/trade-api/v2",
     "https://api.kalshi.com/trade-api/v2"
 ]
 
-def fetch_markets_data():
-    """Try to fetch market data from Kalshi API"""
-    for base_url in API_ENDPOINTS:
+# /markets accepts up to 1000 rows per page
+MARKETS_PAGE_LIMIT = 1000
+# Concurrent cursor walks (one per series) sharing a single keep-alive pool
+MAX_WORKERS = 16
+# Market statuses that count as "trading now"
+ACTIVE_MARKET_STATUSES = {"active", "open"}
+# Statuses after which a market no longer changes
+FINAL_MARKET_STATUSES = {"closed", "settled", "finalized", "determined"}
+# Venue name in the market lifecycle index, and the /markets filter of a live-only walk
+VENUE = "kalshi"
+LIVE_STATUS_FILTER = "open"
+# Cache freshness: pages of final markets, and the series list
+CLOSED_PAGE_TTL = 7 * 24 * 3600
+SERIES_TTL = 6 * 3600
+# Per-market fields kept for the drill-down pages (generate_drilldowns.py)
+MARKET_FIELDS = ("ticker", "event_ticker", "title", "status", "volume_24h", "open_interest", "close_time")
+# Snapshot columns parsed from /markets pages (and from MARKET_FIELDS records, which use the same keys)
+MARKET_COLUMNS = {
+    "ticker": "ticker", "event": "event_ticker", "title": "title", "status": "status",
+    "close_time": "close_time", "volume_24h": "volume_24h", "open_interest": "open_interest",
+    "active": lambda m: m.get("status") in ACTIVE_MARKET_STATUSES,
+}
+MARKETS_PATH = os.path.join(SCRIPT_DIR, "kalshi_markets.json")
+# Dashboard data file read by update_dashboard.py
+VOLUME_DATA_PATH = os.path.join(SCRIPT_DIR, "kalshi_volume_data.json")
+# Per-market changes since the previous run (shared.snapshot_diff), read by generate_drilldowns.py
+DELTA_PATH = os.path.join(SCRIPT_DIR, "kalshi_markets_delta.json")
+# Days of daily history shown on the dashboard
+HISTORY_DAYS = 90
+# Chart shard period per candle tier (1m shards per day, 1h per month, ...)
+CANDLE_SHARDS = {"1m": "D", "1h": "M", "1d": "Y", "1w": "Y"}
+
+def fetch_series_tickers(session, base_url):
+    """List every series ticker; each series is one independent /markets partition"""
+    response = response_cache.get(session, f"{base_url}/series", ttl=SERIES_TTL)
+    return [s["ticker"] for s in response.json().get("series") or [] if s.get("ticker")]
+
+def market_page_ttl(data):
+    """Pages holding only final (closed/settled) markets stay cached for a week; others revalidate"""
+    markets = data.get("markets") or []
+    if markets and all(m.get("status") in FINAL_MARKET_STATUSES for m in markets):
+        return CLOSED_PAGE_TTL
+    return 0
+
+def market_window_start(now=None):
+    """
+    min_close_ts for the market walk: Monday 00:00 UTC of the week holding
+    now - 24h. It covers every market that can carry 24h volume and stays the
+    same all week, so cached pages keep matching the request URLs.
+    """
+    day = (int(now or time.time()) - 24 * 3600) // 86400
+    return int(week_starts(day)) * 86400
+
+def iter_market_pages(session, base_url, params):
+    """Walk every cursor page of /markets for one partition (through the response cache)"""
+    cursor = None
+    while True:
+        page_params = dict(params, limit=MARKETS_PAGE_LIMIT)
+        if cursor:
+            page_params["cursor"] = cursor
+        response = response_cache.get(session, f"{base_url}/markets", params=page_params,
+                                      ttl=market_page_ttl)
+        data = response.json()
+        markets = data.get("markets") or []
+        if markets:
+            yield markets
+        cursor = data.get("cursor")
+        if not cursor or not markets:
+            return
+
+def stream_market_pages(session, base_url, max_workers=MAX_WORKERS, min_close_ts=None, status=None):
+    """
+    Yield /markets pages for the whole exchange as soon as workers fetch them.
+
+    Each series is walked by its own cursor chain on a bounded thread pool, so
+    pages from different series overlap instead of queueing behind each other.
+    Only markets closing since the start of the week holding the last 24h are
+    requested (see market_window_start()), which includes every market that
+    can still carry 24h volume or open interest. status narrows the walk
+    further (e.g. "open" when closed markets come from the lifecycle index).
+    """
+    base_params = {"min_close_ts": min_close_ts or market_window_start()}
+    if status:
+        base_params["status"] = status
+    try:
+        series_tickers = fetch_series_tickers(session, base_url)
+    except Exception as e:
+        print(f"Could not list series from {base_url}, walking /markets serially: {e}")
+        series_tickers = []
+
+    if not series_tickers:
+        yield from iter_market_pages(session, base_url, base_params)
+        return
+
+    pages = queue.Queue(maxsize=max_workers * 4)
+    stop = threading.Event()
+    partition_done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def walk(series_ticker):
         try:
-            response = requests.get(
-                f"{base_url}/markets",
-                params={"limit": 100},
-                timeout=30,
-                headers={"Accept": "application/json"}
-            )
-            if response.status_code == 200:
-                data = response.json()
-                markets = data.get("markets", [])
-                if markets:
-                    print(f"Successfully fetched {len(markets)} markets from {base_url}")
-                    return markets
+            params = dict(base_params, series_ticker=series_ticker)
+            for page in iter_market_pages(session, base_url, params):
+                if stop.is_set():
+                    return
+                put(page)
         except Exception as e:
-            print(f"Error with {base_url}: {e}")
-            continue
-    return []
+            put(RuntimeError(f"series {series_ticker}: {e}"))
+        finally:
+            put(partition_done)
+
+    errors = []
+    remaining = len(series_tickers)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for series_ticker in series_tickers:
+            pool.submit(bind(walk), series_ticker)
+        try:
+            while remaining:
+                item = pages.get()
+                if item is partition_done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    errors.append(item)
+                else:
+                    yield item
+        finally:
+            stop.set()
+
+    if errors:
+        raise RuntimeError(f"{len(errors)} of {len(series_tickers)} series failed, first: {errors[0]}")
+
+def snapshot_totals(snapshot):
+    """Exchange-wide totals of a market snapshot; the snapshot itself is kept under "markets" """
+    sums = snapshot.totals()
+    return {"volume_24h": int(round(sums["volume_24h"])),
+            "open_interest": int(round(sums["open_interest"])),
+            "active_markets": sums["active_markets"], "markets_seen": len(snapshot),
+            "markets": snapshot}
+
+def aggregate_market_pages(pages):
+    """Parse a stream of /markets pages into one MarketSnapshot (each page once, as it lands) and total it"""
+    return snapshot_totals(MarketSnapshot.concat([parse_page(markets, MARKET_COLUMNS) for markets in pages]))
+
+def market_records(snapshot):
+    """Trimmed per-market dicts (MARKET_FIELDS) of a snapshot, in row order"""
+    rows = zip(snapshot.tickers.tolist(), snapshot.events[snapshot.event_ids].tolist(),
+               snapshot.titles.tolist(), snapshot.status_names().tolist(),
+               snapshot.columns["volume_24h"].round().astype(np.int64).tolist(),
+               snapshot.columns["open_interest"].round().astype(np.int64).tolist(),
+               snapshot.close_times())
+    return [dict(zip(MARKET_FIELDS, row)) for row in rows]
+
+def merge_market_index(index, totals, full, min_close_ts):
+    """
+    Record the fetched markets in the lifecycle index. After an open-only walk
+    the frozen contributions and records of closed/settled markets in the
+    window are added to totals; after a full walk totals are already complete.
+    """
+    snapshot = totals["markets"]
+    entries = snapshot_entries(snapshot, market_records(snapshot))
+    if full:
+        dropped = index.record(VENUE, entries, full=True)
+        print(f"Full refresh of the market index: {len(entries):,} markets, {dropped:,} dropped")
+        return totals
+    index.record(VENUE, entries)
+    retired = index.retire_missing(VENUE, snapshot.tickers.tolist(), min_close_ts)
+    frozen = index.frozen_totals(VENUE, min_close_ts)
+    # unique() keeps the live row if a walked market is also frozen in the index
+    merged = snapshot_totals(MarketSnapshot.concat([
+        snapshot, parse_page(index.frozen_records(VENUE, min_close_ts), MARKET_COLUMNS)]).unique())
+    # Frozen 24h volume expires a day after close, so it comes from the index, not the records
+    merged["volume_24h"] = totals["volume_24h"] + int(round(frozen["volume_24h"]))
+    merged["markets_seen"] = totals["markets_seen"]
+    print(f"Walked open markets only: {retired:,} newly closed, "
+          f"{frozen['markets']:,} closed/settled markets taken from the index")
+    return merged
+
+def fetch_markets_data():
+    """
+    Fetch and aggregate the Kalshi market universe from the healthiest endpoint.
+    Only open markets are walked unless the lifecycle index is due a full
+    refresh; closed and settled markets contribute their frozen values.
+    """
+    index = MarketIndex()
+    full = index.full_refresh_due(VENUE)
+    min_close_ts = market_window_start()
+
+    def fetch_all(session, base_url):
+        totals = aggregate_market_pages(stream_market_pages(
+            session, base_url, min_close_ts=min_close_ts, status=None if full else LIVE_STATUS_FILTER))
+        if not totals["markets_seen"]:
+            raise RuntimeError("no markets returned")
+        return totals
+
+    try:
+        try:
+            base_url, totals = call_with_failover(API_ENDPOINTS, fetch_all)
+        except Exception:
+            return None
+        finally:
+            response_cache.evict()
+        print(f"Successfully fetched {totals['markets_seen']:,} markets from {base_url}")
+        print(response_cache.summary())
+        return merge_market_index(index, totals, full, min_close_ts)
+    finally:
+        index.close()
+
+def sorted_market_records(snapshot):
+    """market_records() sorted by ticker - what the drill-down stage reads"""
+    return market_records(snapshot.select(np.argsort(snapshot.tickers.astype(str), kind="stable")))
+
+def save_markets(snapshot, last_updated, snapshot_run=None):
+    """
+    Write the per-market snapshot (sorted by ticker, one market per line) for
+    the drill-down stage, tagged with the run id of its stored snapshot
+    """
+    markets = sorted_market_records(snapshot)
+    tmp_path = MARKETS_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write('{"last_updated": %s, "snapshot": %s, "markets": [\n'
+                % (json.dumps(last_updated), json.dumps(snapshot_run)))
+        f.write(",\n".join(json.dumps(m, separators=(",", ":")) for m in markets))
+        f.write("\n]}\n")
+    os.replace(tmp_path, MARKETS_PATH)
+    return len(markets)
 
 def fetch_exchange_schedule():
     """Try to fetch exchange schedule for volume data"""
-    for base_url in API_ENDPOINTS:
-        try:
-            response = requests.get(
-                f"{base_url}/exchange/schedule",
-                timeout=30,
-                headers={"Accept": "application/json"}
-            )
-            if response.status_code == 200:
-                return response.json()
-        except:
-            continue
-    return None
+    try:
+        _, response = request_with_failover(API_ENDPOINTS, "/exchange/schedule")
+    except Exception:
+        return None
+    return response.json()
+
+def build_weekly_data(daily_data):
+    """Sum daily records into ISO weeks (Monday start)"""
+    dates = [day["date"] for day in daily_data]
+    volumes = [day["volume"] for day in daily_data]
+    week_starts, week_volumes = rollup(dates, volumes)["weekly"]
+    weekly_data = []
+    for week, volume in zip(labels(week_starts), week_volumes.tolist()):
+        volume = int(round(volume))
+        weekly_data.append({
+            "week_start": week,
+            "volume": volume,
+            "volume_millions": round(volume / 1e6, 2),
+            "volume_billions": round(volume / 1e9, 3)
+        })
+    return weekly_data
+
+def build_history_from_store(store, days=None):
+    """
+    Daily and weekly volume from the store's rollup tables (the last `days`
+    days, or everything when days is None), or None until the store holds a
+    complete week. Only days inside the store's covered span count - a cold
+    start's first day and today are partial - and only weeks of seven such days.
+    """
+    span = store.covered_span()
+    if span is None:
+        return None
+    first_day = -(-span[0] // 86400)
+    if days is not None:
+        first_day = max(first_day, int(time.time()) // 86400 - days)
+    end_day = span[1] // 86400
+    first_week = int(week_starts(first_day - 1)) + 7
+    end_date, last_week = labels(np.array([end_day, end_day - 7], dtype="datetime64[D]"))
+    rows = [row for row in store.daily_volume(first_day * 86400) if row[0] < end_date]
+    if not rows:
+        return None
+    daily_data = []
+    for date_str, contracts in rows:
+        volume = int(round(contracts))
+        daily_data.append({
+            "date": date_str,
+            "volume": volume,
+            "volume_millions": round(volume / 1e6, 2)
+        })
+    weekly_data = []
+    for week, contracts in store.weekly_volume(first_week * 86400):
+        if week > last_week:
+            break
+        volume = int(round(contracts))
+        weekly_data.append({
+            "week_start": week,
+            "volume": volume,
+            "volume_millions": round(volume / 1e6, 2),
+            "volume_billions": round(volume / 1e9, 3)
+        })
+    if not weekly_data:
+        return None
+    return daily_data, weekly_data
 
 def generate_realistic_data():
     """Generate realistic volume data based on known Kalshi patterns"""
     today = datetime.utcnow().date()
     daily_data = []
-    weekly_data = []
     
     base_daily_volume = 280_000_000
     
@@ -85,20 +367,7 @@ def generate_realistic_data():
             "volume_millions": round(volume / 1e6, 2)
         })
     
-    weekly_volumes = defaultdict(int)
-    for day in daily_data:
-        dt = datetime.strptime(day["date"], "%Y-%m-%d")
-        week_start = dt - timedelta(days=dt.weekday())
-        week_str = week_start.strftime("%Y-%m-%d")
-        weekly_volumes[week_str] += day["volume"]
-    
-    for week, volume in sorted(weekly_volumes.items()):
-        weekly_data.append({
-            "week_start": week,
-            "volume": volume,
-            "volume_millions": round(volume / 1e6, 2),
-            "volume_billions": round(volume / 1e9, 3)
-        })
+    weekly_data = build_weekly_data(daily_data)
     
     current_24h_volume = int(base_daily_volume * random.uniform(0.9, 1.1))
     current_oi = int(current_24h_volume * random.uniform(1.5, 2.5))
@@ -112,19 +381,82 @@ def generate_realistic_data():
             "open_interest": current_oi,
             "open_interest_millions": round(current_oi / 1e6, 2),
             "active_markets": random.randint(800, 1200),
-            "estimated_daily_revenue": round(current_24h_volume * 0.02, 2)
+            "estimated_daily_revenue": estimated_daily_revenue(current_24h_volume)
         }
     }
 
-def main():
-    print(f"Starting Kalshi data update at {datetime.utcnow().isoformat()}")
-    
-    print("Attempting to fetch from Kalshi API...")
-    markets = fetch_markets_data()
-    
-    if markets:
-        total_volume_24h = sum(m.get("volume_24h", 0) for m in markets)
-        total_oi = sum(m.get("open_interest", 0) for m in markets)
+def write_kalshi_chart_data(daily_data, weekly_data, candles=None):
+    """
+    Write the dashboard's chart series as sharded columnar files under data/kalshi/.
+    candles ({tier: [(start, contracts, trades)]}) adds one exchange-wide volume
+    series per candle tier (candles_1m ... candles_1w, volume in $M) for the
+    page to pick from by zoom level.
+    """
+    series = {
+        "daily": ([d["date"] for d in daily_data],
+                  {"volume": [d["volume_millions"] for d in daily_data]}),
+        "weekly": ([w["week_start"] for w in weekly_data],
+                   {"volume": [w["volume_billions"] for w in weekly_data]}),
+    }
+    candles = candles or {}
+    for tier, rows in candles.items():
+        series[f"candles_{tier}"] = (
+            [row[0] for row in rows],
+            {"volume": [round(row[1] / 1e6, 4) for row in rows], "trades": [row[2] for row in rows]},
+            {"key": "ts", "shard": CANDLE_SHARDS[tier]},
+        )
+    # End of the newest minute bucket; the minute tier always covers the latest trade
+    extra = {"latest_ts": candles["1m"][-1][0] + TIER_WIDTHS["1m"]} if candles.get("1m") else {}
+    return write_chart_data("kalshi", series, extra)
+
+def ingest_trades():
+    """
+    Ingest new trades into the local store. Returns the number ingested and
+    the store's trade count and newest trade time afterwards.
+    """
+    store = TradeStore(KALSHI_TRADES_DB)
+    try:
+        try:
+            ingested = ingest_new_trades(store, API_ENDPOINTS)
+        except Exception as e:
+            print(f"Trade ingestion failed, using stored history only: {e}")
+            ingested = 0
+        return {"ingested": ingested, "trades": store.trade_count(), "max_ts": store.max_ts()}
+    finally:
+        store.close()
+
+def read_trade_history():
+    """
+    Refresh the rollups and candle tiers for newly ingested trades and read back
+    the full daily/weekly history (or None) and the exchange-wide volume of
+    every candle tier
+    """
+    store = TradeStore(KALSHI_TRADES_DB)
+    try:
+        refreshed = store.refresh_rollups()
+        print(f"Refreshed rollups for {refreshed} day(s)")
+        refreshed = store.refresh_candles()
+        print(f"Refreshed candle tiers for {refreshed} day(s)")
+        candles = {tier: store.candle_volume(tier) for tier, _, _ in TIERS}
+        return build_history_from_store(store), candles
+    finally:
+        store.close()
+
+def load_trade_history():
+    """Ingest new trades into the local store, then read_trade_history()"""
+    ingest_trades()
+    return read_trade_history()
+
+def build_volume_data(totals, history):
+    """
+    The dashboard data file from the market totals (or None if the API was
+    unavailable) and the stored trade history (or None). Returns
+    (data, full daily series, full weekly series) - the chart data gets the
+    whole history, the data file the last HISTORY_DAYS days.
+    """
+    if totals:
+        total_volume_24h = totals["volume_24h"]
+        total_oi = totals["open_interest"]
         
         print(f"Real API data: 24h Volume: ${total_volume_24h:,}, OI: ${total_oi:,}")
         
@@ -134,8 +466,8 @@ def main():
             data["metrics"]["volume_24h_millions"] = round(total_volume_24h / 1e6, 2)
             data["metrics"]["open_interest"] = total_oi
             data["metrics"]["open_interest_millions"] = round(total_oi / 1e6, 2)
-            data["metrics"]["active_markets"] = len(markets)
-            data["source"] = "Kalshi API (partial) + Historical patterns"
+            data["metrics"]["active_markets"] = totals["active_markets"]
+            data["source"] = "Kalshi API (all markets) + Historical patterns"
         else:
             print("API returned no volume data, using generated data")
             data = generate_realistic_data()
@@ -145,15 +477,66 @@ def main():
         data = generate_realistic_data()
         data["source"] = "Generated from historical patterns (API unavailable)"
     
+    if history:
+        daily_all, weekly_all = history
+        cutoff = (datetime.utcnow().date() - timedelta(days=HISTORY_DAYS)).isoformat()
+        data["daily_data"] = [d for d in daily_all if d["date"] >= cutoff]
+        data["weekly_data"] = weekly_all[-14:]
+        data["source"] += " | Daily/weekly history from stored trades"
+    else:
+        daily_all, weekly_all = data["daily_data"], data["weekly_data"]
+    
+    # Revenue scenarios from the final 24h volume and latest week; the trend path needs real history
+    volume_24h = data["metrics"]["volume_24h"]
+    latest_week_volume = data["weekly_data"][-1]["volume"] if data["weekly_data"] else 0
+    data["revenue"] = revenue_tables(volume_24h, latest_week_volume,
+                                     [d["volume"] for d in daily_all] if history else None)
+    
     data["last_updated"] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+    
     data["update_frequency"] = "Daily via GitHub Actions"
     data["note"] = "Volume data based on Kalshi market patterns (~$2B weekly)"
-    
-    output_path = os.path.join(SCRIPT_DIR, "kalshi_volume_data.json")
-    with open(output_path, "w") as f:
+    return data, daily_all, weekly_all
+
+def save_volume_data(data, totals=None, snapshot_run=None):
+    """Write the dashboard data file and, if markets were fetched, the per-market snapshot"""
+    if totals and len(totals["markets"]):
+        saved = save_markets(totals["markets"], data["last_updated"], snapshot_run)
+        print(f"Per-market data saved to {MARKETS_PATH} ({saved:,} markets)")
+    with open(VOLUME_DATA_PATH, "w") as f:
         json.dump(data, f, indent=2)
+    print(f"Data saved to {VOLUME_DATA_PATH}")
+
+@instrumented("kalshi")
+def main():
+    print(f"Starting Kalshi data update at {datetime.utcnow().isoformat()}")
+    
+    print("Attempting to fetch from Kalshi API...")
+    with stage("fetch_markets"):
+        totals = fetch_markets_data()
+    set_metrics(http_cache=dict(response_cache.stats))
+    snapshot_run = None
+    if totals:
+        set_metrics(markets=totals["markets_seen"], volume_24h=totals["volume_24h"],
+                    open_interest=totals["open_interest"])
+        with stage("snapshot_diff"):
+            snapshot_run, summary, movers = record_run(VENUE, totals["markets"], DELTA_PATH)
+        set_metrics(market_changes=summary)
+        print(describe(summary, movers))
+    
+    print("Updating trade history...")
+    with stage("trade_history"):
+        history, candles = load_trade_history()
+    
+    data, daily_all, weekly_all = build_volume_data(totals, history)
+    
+    with stage("chart_data"):
+        manifest_path = write_kalshi_chart_data(daily_all, weekly_all, candles)
+    print(f"Chart data written to {os.path.dirname(manifest_path)}")
+    
+    with stage("write_json"):
+        save_volume_data(data, totals, snapshot_run)
 
-    print(f"Data saved to {output_path}")
     print(f"Daily records: {len(data['daily_data'])}")
     print(f"Weekly records: {len(data['weekly_data'])}")
     print(f"24h Volume: ${data['metrics']['volume_24h_millions']}M")
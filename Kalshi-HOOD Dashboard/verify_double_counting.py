@@ -10,11 +10,20 @@ Polymarket Double Counting 验证脚本
 3. 计算不同统计方法的差异
 """
 
-import requests
+import argparse
 import json
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.dune_client import DUNE_API_BASE, DuneClient
+from polygon_logs import (POLYGON_RPC_URL, ZERO_WORD, JsonRpcClient, decode_receipt_logs,
+                          iter_decoded_events, to_rows)
 
 # Polymarket 合约地址
 POLYMARKET_CONTRACTS = {
@@ -23,21 +32,110 @@ POLYMARKET_CONTRACTS = {
     "CONDITIONAL_TOKENS": "0x4d97dcd97ec945f40cf65f87097ace5ea0476045"
 }
 
-# OrderFilled 事件签名
-ORDER_FILLED_TOPIC = "0x..." # 需要从合约 ABI 获取
+# OrderFilled / OrdersMatched 事件签名见 polygon_logs.py
+
+# 各统计方法（与 verification_query.sql 对应）
+VOLUME_METHODS = ("sum_all_order_filled", "taker_side_only", "maker_side_only", "orders_matched")
+
+
+class VolumeMethodAccumulator:
+    """
+    流式计算各统计方法的交易量
+
+    逐批接收 polygon_logs.iter_decoded_events() 产出的事件列，每批用 NumPy 向量化
+    分组求和后累加到按天、按市场的计数器中。内存只与天数 × 市场数相关，与事件
+    总数无关，因此可以单次遍历一周甚至更长的链上数据。市场以非 USDC 一侧的
+    token id 标识。
+    """
+
+    def __init__(self, exchange_addresses: Iterable[bytes]):
+        self.exchange_addresses = np.array(sorted(exchange_addresses), dtype="S40")
+        self.by_day: Dict[int, np.ndarray] = {}
+        self.by_market: Dict[bytes, np.ndarray] = {}
+        self.events = 0
+
+    def _fold(self, target: Dict, keys: np.ndarray, method: int, amounts: np.ndarray) -> None:
+        if not keys.size:
+            return
+        unique, inverse = np.unique(keys, return_inverse=True)
+        sums = np.bincount(inverse, weights=amounts)
+        for key, total in zip(unique.tolist(), sums.tolist()):
+            row = target.get(key)
+            if row is None:
+                row = target[key] = np.zeros(len(VOLUME_METHODS))
+            row[method] += total
+
+    def _add(self, method: int, mask: np.ndarray, days: np.ndarray, markets: np.ndarray,
+             amounts: np.ndarray) -> None:
+        usdc = amounts[mask].astype(np.float64) / 1e6
+        self._fold(self.by_day, days[mask], method, usdc)
+        self._fold(self.by_market, markets[mask], method, usdc)
+
+    def update(self, decoded: Dict[str, Dict[str, np.ndarray]]) -> None:
+        """累加一批已解码事件"""
+        filled = decoded.get("order_filled")
+        if filled is not None:
+            days = filled["timestamp"] // 86400
+            maker_usdc = filled["maker_asset_id"] == ZERO_WORD
+            taker_usdc = filled["taker_asset_id"] == ZERO_WORD
+            markets = np.where(maker_usdc, filled["taker_asset_id"], filled["maker_asset_id"])
+            # taker 为交易所合约 => taker-focused 事件
+            taker_focused = np.isin(filled["taker"], self.exchange_addresses)
+            self._add(0, taker_usdc, days, markets, filled["taker_amount"])
+            self._add(1, taker_usdc & taker_focused, days, markets, filled["taker_amount"])
+            self._add(2, maker_usdc & ~taker_focused, days, markets, filled["maker_amount"])
+            self.events += len(days)
+
+        matched = decoded.get("orders_matched")
+        if matched is not None:
+            days = matched["timestamp"] // 86400
+            maker_usdc = matched["maker_asset_id"] == ZERO_WORD
+            markets = np.where(maker_usdc, matched["taker_asset_id"], matched["maker_asset_id"])
+            amounts = np.where(maker_usdc, matched["maker_amount"], matched["taker_amount"])
+            usdc_side = maker_usdc | (matched["taker_asset_id"] == ZERO_WORD)
+            self._add(3, usdc_side, days, markets, amounts)
+            self.events += len(days)
+
+    @staticmethod
+    def _summary(row: np.ndarray) -> Dict[str, float]:
+        summary = dict(zip(VOLUME_METHODS, row.tolist()))
+        taker = summary["taker_side_only"]
+        summary["double_count_ratio"] = summary["sum_all_order_filled"] / taker if taker else 0.0
+        return summary
+
+    def result(self) -> Dict:
+        """汇总结果：总计、按天（倒序，与 SQL 一致）、按市场"""
+        total = sum(self.by_day.values(), np.zeros(len(VOLUME_METHODS)))
+        result = self._summary(total)
+        result["events"] = self.events
+        result["by_day"] = {
+            datetime.utcfromtimestamp(day * 86400).strftime("%Y-%m-%d"): self._summary(row)
+            for day, row in sorted(self.by_day.items(), reverse=True)
+        }
+        result["by_market"] = {
+            str(int(market, 16)): self._summary(row) for market, row in self.by_market.items()
+        }
+        return result
 
 class PolymarketVolumeAnalyzer:
     """分析 Polymarket 交易量统计"""
 
-    def __init__(self, dune_api_key: Optional[str] = None):
+    def __init__(self, dune_api_key: Optional[str] = None, rpc_url: Optional[str] = None):
         """
         初始化分析器
 
         Args:
             dune_api_key: Dune Analytics API key (可选)
+            rpc_url: Polygon JSON-RPC 地址 (可选，可指向本地替身节点)
         """
         self.dune_api_key = dune_api_key or os.environ.get("DUNE_API_KEY")
-        self.base_url = "https://api.dune.com/api/v1"
+        self.base_url = DUNE_API_BASE
+        self.dune = DuneClient(self.dune_api_key, self.base_url)
+        self.rpc = JsonRpcClient(rpc_url or POLYGON_RPC_URL)
+        self.exchange_addresses = {
+            POLYMARKET_CONTRACTS["CTF_EXCHANGE"][2:].encode(),
+            POLYMARKET_CONTRACTS["NEGRISK_CTF_EXCHANGE"][2:].encode(),
+        }
 
     def get_sample_transactions(self, limit: int = 10) -> List[str]:
         """
@@ -59,8 +157,7 @@ class PolymarketVolumeAnalyzer:
         Returns:
             包含事件分析结果的字典
         """
-        # 这里需要实际的链上数据查询
-        # 可以使用 Alchemy, Infura, 或 Polygon RPC
+        decoded = decode_receipt_logs(self.rpc, tx_hash)
 
         result = {
             "tx_hash": tx_hash,
@@ -70,25 +167,58 @@ class PolymarketVolumeAnalyzer:
             "analysis": {}
         }
 
-        # TODO: 实现实际的事件解析
-        # 需要连接到 Polygon 节点并解析交易日志
+        # taker 为交易所合约的 OrderFilled 是 taker-focused 事件
+        filled = decoded.get("order_filled")
+        if filled is not None:
+            taker_focused = np.isin(filled["taker"], list(self.exchange_addresses))
+            for row, is_taker in zip(to_rows(filled), taker_focused.tolist()):
+                key = "taker_focused_events" if is_taker else "maker_focused_events"
+                result[key].append(row)
+        matched = decoded.get("orders_matched")
+        if matched is not None:
+            result["orders_matched_events"] = to_rows(matched)
+
+        # USDC 侧数额（asset id 为 0 的一侧），单位 USDC
+        def usdc_volume(events):
+            total = 0
+            for e in events:
+                if e["maker_asset_id"] == "0":
+                    total += e["maker_amount"]
+                elif e["taker_asset_id"] == "0":
+                    total += e["taker_amount"]
+            return total / 1e6
+
+        result["analysis"] = {
+            "order_filled_count": len(result["maker_focused_events"]) + len(result["taker_focused_events"]),
+            "sum_all_order_filled_usdc": usdc_volume(result["maker_focused_events"] + result["taker_focused_events"]),
+            "taker_side_usdc": usdc_volume(result["taker_focused_events"]),
+            "orders_matched_usdc": usdc_volume(result["orders_matched_events"]),
+        }
 
         return result
 
-    def calculate_volume_methods(self, events: List[Dict]) -> Dict[str, float]:
+    def calculate_volume_methods(self, events: Iterable[Dict[str, Dict[str, np.ndarray]]]) -> Dict:
         """
         使用不同方法计算交易量
 
+        Args:
+            events: 已解码事件批次的生成器（见 polygon_logs.iter_decoded_events），
+                    单次遍历、常量内存
+
         Returns:
-            各方法计算的交易量
+            各方法计算的交易量 (USDC)，并附带 by_day / by_market 明细
         """
-        return {
-            "sum_all_order_filled": 0.0,  # 错误方法：求和所有 OrderFilled
-            "taker_side_only": 0.0,       # 正确方法：只计算 taker 侧
-            "maker_side_only": 0.0,       # 正确方法：只计算 maker 侧
-            "orders_matched": 0.0,        # 正确方法：使用 OrdersMatched
-            "double_count_ratio": 0.0,    # 错误/正确 的比率
-        }
+        accumulator = VolumeMethodAccumulator(self.exchange_addresses)
+        for decoded in events:
+            accumulator.update(decoded)
+        return accumulator.result()
+
+    def analyze_block_range(self, from_block: int, to_block: int) -> Dict:
+        """
+        在本地复现 verification_query.sql：流式拉取并解码区块区间内的事件后计算各方法交易量
+        """
+        exchanges = [POLYMARKET_CONTRACTS["CTF_EXCHANGE"], POLYMARKET_CONTRACTS["NEGRISK_CTF_EXCHANGE"]]
+        return self.calculate_volume_methods(iter_decoded_events(self.rpc, exchanges, from_block, to_block))
 
     def run_dune_query(self, query_id: int) -> Dict:
         """
@@ -104,37 +234,9 @@ class PolymarketVolumeAnalyzer:
             print("Warning: No Dune API key provided. Using cached/sample data.")
             return {}
 
-        headers = {
-            "X-Dune-API-Key": self.dune_api_key,
-            "Content-Type": "application/json"
-        }
-
-        # 执行查询
-        exec_url = f"{self.base_url}/query/{query_id}/execute"
-        response = requests.post(exec_url, headers=headers)
-
-        if response.status_code != 200:
-            raise Exception(f"Query execution failed: {response.text}")
-
-        execution_id = response.json()["execution_id"]
-
-        # 获取结果
-        result_url = f"{self.base_url}/execution/{execution_id}/results"
-
-        # 轮询等待结果
-        import time
-        for _ in range(60):  # 最多等待 60 秒
-            response = requests.get(result_url, headers=headers)
-            data = response.json()
-
-            if data.get("state") == "QUERY_STATE_COMPLETED":
-                return data.get("result", {})
-            elif data.get("state") == "QUERY_STATE_FAILED":
-                raise Exception(f"Query failed: {data}")
-
-            time.sleep(1)
-
-        raise Exception("Query timeout")
+        # 并发提交、指数退避轮询状态，新鲜结果直接读本地缓存（不消耗额度）
+        data = self.dune.execute(query_id)
+        return data.get("result", {})
 
 
 def create_verification_sql() -> str:
@@ -261,8 +363,28 @@ def create_sample_analysis() -> Dict:
     return analysis
 
 
+def print_block_range_analysis(from_block: int, to_block: int, rpc_url: Optional[str]) -> None:
+    """按天打印区块区间内各统计方法的交易量（列与 verification_query.sql 输出一致）"""
+    analyzer = PolymarketVolumeAnalyzer(rpc_url=rpc_url)
+    result = analyzer.analyze_block_range(from_block, to_block)
+    print(f"区块 {from_block}-{to_block}: 共 {result['events']:,} 个事件, {len(result['by_market']):,} 个市场")
+    print(f"{'day':<12}{'wrong_method':>16}{'taker_side':>16}{'maker_side':>16}{'orders_matched':>16}{'ratio':>8}")
+    for day, row in result["by_day"].items():
+        print(f"{day:<12}{row['sum_all_order_filled']:>16,.2f}{row['taker_side_only']:>16,.2f}"
+              f"{row['maker_side_only']:>16,.2f}{row['orders_matched']:>16,.2f}{row['double_count_ratio']:>8.2f}")
+
+
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="Polymarket Double Counting 验证分析")
+    parser.add_argument("--from-block", type=int, help="链上验证的起始区块")
+    parser.add_argument("--to-block", type=int, help="链上验证的结束区块")
+    parser.add_argument("--rpc-url", help="Polygon JSON-RPC 地址（默认 POLYGON_RPC_URL）")
+    args = parser.parse_args()
+    if args.from_block is not None and args.to_block is not None:
+        print_block_range_analysis(args.from_block, args.to_block, args.rpc_url)
+        return
+
     print("=" * 60)
     print("Polymarket Double Counting 验证分析")
     print("=" * 60)
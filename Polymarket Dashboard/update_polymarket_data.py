@@ -4,83 +4,196 @@ Polymarket Volume Data Fetcher
 Fetches market data from Polymarket Gamma API and saves to JSON
 """
 
-import requests
+import asyncio
+import functools
 import json
 import os
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from collections import defaultdict
 
 # Get the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, ROOT_DIR)
 
-# Gamma API endpoint
-GAMMA_API_BASE = "https://gamma-api.polymarket.com"
+from shared.chart_data import write_chart_data
+from shared.http_client import DEFAULT_TIMEOUT, get_session
+from shared.instrumentation import bind, count, instrumented, set_metrics, stage
+from shared.market_index import MarketIndex, snapshot_entries
+from shared.rate_limit import acquire_async
+from shared.response_cache import response_cache
+from shared.rollups import labels, rollup
+from shared.snapshot import MarketSnapshot, parse_page
+from shared.snapshot_diff import describe, record_run
 
-def fetch_all_markets():
-    """Fetch all active markets from Gamma API"""
-    markets = []
-    offset = 0
-    limit = 100
-    
-    while True:
-        url = f"{GAMMA_API_BASE}/markets?limit={limit}&offset={offset}&active=true"
+# Gamma API endpoint (overridable, e.g. to point at a local fixture server)
+GAMMA_API_BASE = os.environ.get("GAMMA_API_BASE", "https://gamma-api.polymarket.com")
+
+# Crawler settings: page size, concurrent offset windows, per-page retries
+PAGE_LIMIT = 100
+MAX_IN_FLIGHT = int(os.environ.get("GAMMA_MAX_IN_FLIGHT", "8"))
+MAX_RETRIES = 4
+RETRY_BACKOFF = 1.0
+# Pages where every market is closed are served from the response cache this long
+CLOSED_PAGE_TTL = 7 * 24 * 3600
+# Venue name in the market lifecycle index
+VENUE = "polymarket"
+# Gamma filters: every listed market (full refresh) or only those still trading
+ALL_MARKETS = {"active": "true"}
+OPEN_MARKETS = {"active": "true", "closed": "false"}
+# Per-market changes since the previous run (shared.snapshot_diff)
+DELTA_PATH = os.path.join(SCRIPT_DIR, 'polymarket_markets_delta.json')
+# Dashboard data file read by update_dashboard.py
+VOLUME_DATA_PATH = os.path.join(SCRIPT_DIR, 'polymarket_volume_data.json')
+
+def market_status(market):
+    """open / closed / settled (closed and resolved) for a Gamma market"""
+    if not market.get('closed'):
+        return 'open'
+    return 'settled' if market.get('umaResolutionStatus') == 'resolved' else 'closed'
+
+# Snapshot columns parsed from Gamma market objects
+MARKET_COLUMNS = {
+    'ticker': 'id', 'status': market_status, 'active': 'active', 'close_time': 'endDate',
+    'volume_24h': 'volume24hr', 'volume_all_time': 'volumeNum',
+    'open_interest': 'openInterest', 'liquidity': 'liquidity',
+}
+# Per-market record kept in the lifecycle index (snapshot field names, so
+# retire_missing() can mark it closed) and the columns to parse it back
+RECORD_FIELDS = ('ticker', 'status', 'active', 'close_time',
+                 'volume_24h', 'volume_all_time', 'open_interest', 'liquidity')
+RECORD_COLUMNS = {field: field for field in RECORD_FIELDS}
+
+def page_ttl(markets):
+    """Cache freshness for a Gamma page: long if all its markets are closed, else revalidate"""
+    if markets and all(m.get('closed') for m in markets):
+        return CLOSED_PAGE_TTL
+    return 0
+
+async def fetch_page(session, executor, offset, limit=PAGE_LIMIT, filters=ALL_MARKETS):
+    """
+    Fetch one offset window, retrying transient failures with exponential backoff.
+    The rate-limit token is awaited on the event loop, so queued windows do not
+    tie up executor threads; the session itself waits out 429s. Pages go
+    through the response cache (conditional GET, long TTL for closed markets).
+    """
+    loop = asyncio.get_running_loop()
+    params = dict(filters, limit=limit, offset=offset)
+    last_error = None
+    for attempt in range(MAX_RETRIES + 1):
         try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
-            if not data:
-                break
-                
-            markets.extend(data)
-            offset += limit
-            
-            if len(data) < limit:
-                break
-                
+            url = f"{GAMMA_API_BASE}/markets"
+            if not response_cache.is_fresh(url, params):
+                await acquire_async(GAMMA_API_BASE)
+            response = await loop.run_in_executor(executor, bind(functools.partial(
+                response_cache.get, session, url, params=params,
+                ttl=page_ttl, timeout=DEFAULT_TIMEOUT, acquire=False)))
+            return response.json()
         except Exception as e:
-            print(f"Error fetching markets at offset {offset}: {e}")
-            break
-    
-    return markets
-
-def calculate_volume_metrics(markets):
-    """Calculate aggregate volume metrics from market data"""
-    total_volume_24h = 0
-    total_volume_all_time = 0
-    total_open_interest = 0
-    total_liquidity = 0
-    active_markets = 0
-    
-    for market in markets:
-        try:
-            # volume24hr is rolling 24h volume
-            vol_24h = float(market.get('volume24hr', 0) or 0)
-            # volumeNum is all-time volume
-            vol_all = float(market.get('volumeNum', 0) or 0)
-            # openInterest
-            oi = float(market.get('openInterest', 0) or 0)
-            # liquidity
-            liq = float(market.get('liquidity', 0) or 0)
-            
-            total_volume_24h += vol_24h
-            total_volume_all_time += vol_all
-            total_open_interest += oi
-            total_liquidity += liq
-            
-            if market.get('active', False):
-                active_markets += 1
-                
-        except (ValueError, TypeError) as e:
-            continue
-    
+            last_error = e
+            if attempt < MAX_RETRIES:
+                count("retries")
+                delay = RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+                print(f"Retrying offset {offset} in {delay:.1f}s after error: {e}")
+                await asyncio.sleep(delay)
+    raise RuntimeError(f"Offset {offset} failed after {MAX_RETRIES + 1} attempts: {last_error}")
+
+async def crawl_markets(limit=PAGE_LIMIT, max_in_flight=MAX_IN_FLIGHT, filters=ALL_MARKETS):
+    """
+    Crawl every market matching filters with up to max_in_flight offset windows in flight.
+
+    Each worker claims the next unclaimed offset as soon as its previous page
+    lands. The first short (or empty) page fixes the end of the data, so no
+    extra probing requests are issued past it beyond those already in flight.
+    A page that still fails after retries aborts the crawl instead of
+    returning a silently truncated universe. Each page is parsed into a
+    MarketSnapshot as it lands; returns their concatenation.
+    """
+    session = get_session(GAMMA_API_BASE)
+    pages = {}
+    state = {"next_offset": 0, "end_offset": None}
+
+    async def worker():
+        while True:
+            offset = state["next_offset"]
+            if state["end_offset"] is not None and offset >= state["end_offset"]:
+                return
+            state["next_offset"] += limit
+            data = await fetch_page(session, executor, offset, limit, filters)
+            pages[offset] = parse_page(data, MARKET_COLUMNS)
+            if len(data) < limit:
+                end = offset + len(data)
+                if state["end_offset"] is None or end < state["end_offset"]:
+                    state["end_offset"] = end
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        async with asyncio.TaskGroup() as group:
+            for _ in range(max_in_flight):
+                group.create_task(worker())
+
+    # Offsets can shift while crawling; drop markets seen on an earlier page
+    return MarketSnapshot.concat([pages[offset] for offset in sorted(pages)]).unique()
+
+def fetch_all_markets(filters=ALL_MARKETS):
+    """Fetch all active markets (or those matching filters) from Gamma API"""
+    try:
+        return asyncio.run(crawl_markets(filters=filters))
+    finally:
+        print(response_cache.summary())
+        response_cache.evict()
+
+def market_records(snapshot):
+    """Per-market dicts (RECORD_FIELDS) of a snapshot, in row order, for the lifecycle index"""
+    rows = zip(snapshot.tickers.tolist(), snapshot.status_names().tolist(), snapshot.active.tolist(),
+               snapshot.close_times(), *(snapshot.columns[name].tolist() for name in RECORD_FIELDS[4:]))
+    return [dict(zip(RECORD_FIELDS, row)) for row in rows]
+
+def fetch_live_markets(index):
+    """
+    Fetch the markets that can still change and update the lifecycle index.
+
+    Normally only open markets are crawled; markets the index had open that
+    are no longer listed are retired with their last values. Once every
+    FULL_REFRESH_INTERVAL the closed and settled markets are crawled too.
+    Returns (MarketSnapshot, frozen totals to add, or None after a full crawl,
+    the whole universe: the crawled markets plus the index's closed/settled
+    records after an open-only crawl - what each run's snapshot diff compares).
+    """
+    full = index.full_refresh_due(VENUE)
+    markets = fetch_all_markets(ALL_MARKETS if full else OPEN_MARKETS)
+    entries = snapshot_entries(markets, market_records(markets))
+    if full:
+        dropped = index.record(VENUE, entries, full=True)
+        print(f"Full refresh of the market index: {len(entries):,} markets, {dropped:,} dropped")
+        return markets, None, markets
+    index.record(VENUE, entries)
+    retired = index.retire_missing(VENUE, markets.tickers.tolist())
+    frozen = index.frozen_totals(VENUE)
+    # unique() keeps the crawled row if a market is also frozen in the index
+    universe = MarketSnapshot.concat([
+        markets, parse_page(index.frozen_records(VENUE), RECORD_COLUMNS)]).unique()
+    print(f"Fetched open markets only: {retired:,} newly closed, "
+          f"{frozen['markets']:,} closed/settled markets taken from the index")
+    return markets, frozen, universe
+
+def calculate_volume_metrics(markets, frozen=None):
+    """
+    Calculate aggregate volume metrics from a MarketSnapshot (one vector sum
+    per column), plus the frozen contributions of closed/settled markets
+    (MarketIndex.frozen_totals()) if given
+    """
+    totals = markets.totals()
+    for key, value in (frozen or {}).items():
+        if key in totals:
+            totals[key] += value
     return {
-        'volume_24h': total_volume_24h,
-        'volume_all_time': total_volume_all_time,
-        'open_interest': total_open_interest,
-        'liquidity': total_liquidity,
-        'active_markets': active_markets
+        'volume_24h': totals['volume_24h'],
+        'volume_all_time': totals['volume_all_time'],
+        'open_interest': totals['open_interest'],
+        'liquidity': totals['liquidity'],
+        'active_markets': totals['active_markets']
     }
 
 def generate_daily_data(days=90):
@@ -112,40 +225,31 @@ def generate_daily_data(days=90):
 
 def aggregate_weekly(daily_data):
     """Aggregate daily data into weekly totals"""
-    weekly = defaultdict(float)
-    
-    for day in daily_data:
-        date = datetime.strptime(day['date'], '%Y-%m-%d')
-        # ISO week (Monday start)
-        week_start = date - timedelta(days=date.weekday())
-        week_key = week_start.strftime('%Y-%m-%d')
-        weekly[week_key] += day['volume']
+    dates = [day['date'] for day in daily_data]
+    volumes = [day['volume'] for day in daily_data]
+    # ISO week (Monday start)
+    week_starts, week_volumes = rollup(dates, volumes)['weekly']
     
     weekly_data = [
         {'week': week, 'volume': round(vol / 1000, 3)}  # Convert to billions
-        for week, vol in sorted(weekly.items())
+        for week, vol in zip(labels(week_starts), week_volumes.tolist())
     ]
     
     return weekly_data
 
-def main():
-    print("Fetching Polymarket data at " + datetime.utcnow().isoformat() + "Z")
-    
-    # Fetch markets
-    markets = fetch_all_markets()
-    print("Fetched " + str(len(markets)) + " markets")
-    
-    # Calculate metrics
-    metrics = calculate_volume_metrics(markets)
-    print("24h Volume: $" + str(round(metrics['volume_24h']/1e6, 2)) + "M")
-    print("Open Interest: $" + str(round(metrics['open_interest']/1e6, 2)) + "M")
-    
-    # Generate daily and weekly data
+def fetch_markets():
+    """fetch_live_markets() through the lifecycle index; returns (MarketSnapshot, frozen totals or None, universe)"""
+    index = MarketIndex()
+    try:
+        return fetch_live_markets(index)
+    finally:
+        index.close()
+
+def build_volume_data(metrics):
+    """The dashboard data file from the volume metrics, with the daily and weekly series"""
     daily_data = generate_daily_data(90)
     weekly_data = aggregate_weekly(daily_data)
-    
-    # Prepare output data
-    output = {
+    return {
         'last_updated': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC'),
         'metrics': {
             'volume_24h_millions': round(metrics['volume_24h'] / 1e6, 2),
@@ -156,13 +260,47 @@ def main():
         'daily_data': daily_data,
         'weekly_data': weekly_data
     }
-    
-    # Save to JSON file
-    output_path = os.path.join(SCRIPT_DIR, 'polymarket_volume_data.json')
-    with open(output_path, 'w') as f:
+
+def save_volume_data(output):
+    with open(VOLUME_DATA_PATH, 'w') as f:
         json.dump(output, f, indent=2)
+    print("Data saved to " + VOLUME_DATA_PATH)
+
+def write_polymarket_chart_data(output):
+    """Chart series as sharded columnar files for the dashboard to load lazily"""
+    daily_data, weekly_data = output['daily_data'], output['weekly_data']
+    manifest_path = write_chart_data('polymarket', {
+        'daily': ([d['date'] for d in daily_data], {'volume': [d['volume'] for d in daily_data]}),
+        'weekly': ([w['week'] for w in weekly_data], {'volume': [w['volume'] for w in weekly_data]}),
+    })
+    print("Chart data written to " + os.path.dirname(manifest_path))
+    return manifest_path
+
+@instrumented('polymarket_gamma')
+def main():
+    print("Fetching Polymarket data at " + datetime.utcnow().isoformat() + "Z")
+    
+    # Fetch markets that can still change; closed/settled ones come from the index
+    with stage('fetch_markets'):
+        markets, frozen, universe = fetch_markets()
+    set_metrics(http_cache=dict(response_cache.stats))
+    print("Fetched " + str(len(markets)) + " markets")
+    with stage('snapshot_diff'):
+        _, summary, movers = record_run(VENUE, universe, DELTA_PATH)
+    print(describe(summary, movers))
+    
+    # Calculate metrics
+    with stage('aggregate'):
+        metrics = calculate_volume_metrics(markets, frozen)
+    set_metrics(markets=len(markets), market_changes=summary, **metrics)
+    print("24h Volume: $" + str(round(metrics['volume_24h']/1e6, 2)) + "M")
+    print("Open Interest: $" + str(round(metrics['open_interest']/1e6, 2)) + "M")
     
-    print("Data saved to " + output_path)
+    output = build_volume_data(metrics)
+    with stage('write_json'):
+        save_volume_data(output)
+    with stage('chart_data'):
+        write_polymarket_chart_data(output)
     return output
 
 if __name__ == '__main__':
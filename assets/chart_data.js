@@ -0,0 +1,48 @@
+// Lazy loader for the columnar chart data written by shared/chart_data.py.
+// ChartData.load(base, series, from, to) fetches only the shards that overlap
+// [from, to] - day numbers or epoch seconds, per the series' key column - and
+// returns parallel arrays trimmed to that range.
+const ChartData = (() => {
+    const requests = new Map();
+
+    function fetchJson(url) {
+        if (!requests.has(url)) {
+            requests.set(url, fetch(url).then(response => {
+                if (!response.ok) throw new Error(url + ': HTTP ' + response.status);
+                return response.json();
+            }));
+        }
+        return requests.get(url);
+    }
+
+    function manifest(base) {
+        return fetchJson(base + '/manifest.json');
+    }
+
+    async function load(base, name, from, to) {
+        const series = (await manifest(base)).series[name];
+        const result = {};
+        if (!series) return result;
+        series.columns.forEach(column => { result[column] = []; });
+        const shards = series.shards.filter(s => s.last >= from && s.first <= to);
+        const parts = await Promise.all(shards.map(s => fetchJson(base + '/' + s.file + '?v=' + s.hash)));
+        parts.forEach(part => {
+            part[series.key].forEach((k, i) => {
+                if (k < from || k > to) return;
+                series.columns.forEach(column => result[column].push(part[column][i]));
+            });
+        });
+        return result;
+    }
+
+    function dayToDate(day) {
+        return new Date(day * 864e5).toISOString().slice(0, 10);
+    }
+
+    function tsToLabel(ts, step) {
+        const iso = new Date(ts * 1000).toISOString();
+        return step < 86400 ? iso.slice(0, 16).replace('T', ' ') : iso.slice(0, 10);
+    }
+
+    return { manifest, load, dayToDate, tsToLabel };
+})();
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Pipeline benchmark
+Runs the update scripts end to end (fetch -> aggregate -> render) against a
+local stand-in for the Kalshi, Gamma and Dune APIs (benchmarks/fixture_server.py)
+serving recorded pages scaled to 1k, 100k or 1M markets, trades and Dune rows.
+
+Each scale runs in a scratch copy of the pipeline code, so caches, history and
+outputs start empty and the working tree is never touched. Every script is
+timed as a whole and per stage (from the run report it writes); stages are
+grouped into fetch / aggregate / render phases. Run 1 is cold; further runs
+reuse the copy's caches and history like consecutive scheduled runs. Results
+are written as JSON, and --baseline prints the ratios against an earlier file.
+
+Usage: python benchmarks/bench_pipeline.py [--scales 1k,100k,1m] [--runs 2]
+                                           [--output FILE] [--baseline FILE] [--keep]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fixture_server import FixtureData, FixtureServer, environment
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+DEFAULT_SCALES = "1k,100k"
+SCALE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+# Directories a pipeline run needs; caches, history and outputs are left behind
+PIPELINE_DIRS = ("shared", "Kalshi-HOOD Dashboard", "Polymarket Dashboard", "polymarket", "assets")
+IGNORED = shutil.ignore_patterns("__pycache__", ".cache", "history", "kalshi_markets.json", "*_delta.json")
+# (name in the run report, script) in dependency order
+PIPELINES = (
+    ("kalshi", "Kalshi-HOOD Dashboard/update_kalshi_data.py"),
+    ("kalshi_dashboard", "Kalshi-HOOD Dashboard/update_dashboard.py"),
+    ("kalshi_drilldowns", "Kalshi-HOOD Dashboard/generate_drilldowns.py"),
+    ("polymarket_gamma", "Polymarket Dashboard/update_polymarket_data.py"),
+    ("polymarket_dashboard", "Polymarket Dashboard/update_dashboard.py"),
+    ("polymarket_dune", "polymarket/update_data.py"),
+)
+# Stages that are network fetches, and scripts that only render; every other
+# stage is aggregation (Kalshi's trade_history includes its incremental trade fetch)
+FETCH_STAGES = {"fetch_markets", "fetch_dune"}
+RENDER_PIPELINES = {"kalshi_dashboard", "kalshi_drilldowns", "polymarket_dashboard"}
+PHASES = ("fetch", "aggregate", "render", "overhead")
+
+
+def parse_scale(text):
+    text = text.strip().lower()
+    if text[-1:] in SCALE_SUFFIXES:
+        return int(float(text[:-1]) * SCALE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def make_tree(directory):
+    """Copy the pipeline code into directory (a fresh checkout without state)"""
+    for name in PIPELINE_DIRS:
+        shutil.copytree(os.path.join(ROOT_DIR, name), os.path.join(directory, name), ignore=IGNORED)
+    os.makedirs(os.path.join(directory, "logs"))
+
+
+def read_reports(path):
+    """Every run report record appended so far, oldest first"""
+    try:
+        with open(path, "r") as f:
+            return [json.loads(line) for line in f]
+    except OSError:
+        return []
+
+
+def run_pipelines(tree, env, run):
+    """Run every script once in tree; returns {pipeline: result}"""
+    report_path = os.path.join(tree, "history", "run_report.jsonl")
+    env = dict(os.environ, **env, RUN_REPORT_PATH=report_path)
+    results = {}
+    for name, script in PIPELINES:
+        log_path = os.path.join(tree, "logs", f"{name}-{run}.log")
+        seen = len(read_reports(report_path))
+        start = time.perf_counter()
+        with open(log_path, "w") as log:
+            code = subprocess.call([sys.executable, script], cwd=tree, env=env,
+                                   stdout=log, stderr=subprocess.STDOUT)
+        seconds = time.perf_counter() - start
+        if code:
+            print(f"  {name} exited with {code}, see {log_path}")
+        report = next((r for r in read_reports(report_path)[seen:] if r["pipeline"] == name), None)
+        results[name] = {
+            "seconds": round(seconds, 3),
+            "returncode": code,
+            "stages": {s["stage"]: s["seconds"] for s in report["stages"]} if report else {},
+            "requests": report["requests"] if report else None,
+            "bytes": report["bytes"] if report else None,
+            "peak_rss_mb": report["peak_rss_mb"] if report else None,
+        }
+    return results
+
+
+def phase_times(pipelines):
+    """Seconds per phase: stage times grouped by phase, plus per-script time outside any stage"""
+    phases = dict.fromkeys(PHASES, 0.0)
+    for name, result in pipelines.items():
+        if name in RENDER_PIPELINES and not result["stages"]:
+            phases["render"] += result["seconds"]
+            continue
+        for stage, seconds in result["stages"].items():
+            if stage in FETCH_STAGES:
+                phases["fetch"] += seconds
+            elif name in RENDER_PIPELINES:
+                phases["render"] += seconds
+            else:
+                phases["aggregate"] += seconds
+        phases["overhead"] += max(0.0, result["seconds"] - sum(result["stages"].values()))
+    return {phase: round(seconds, 3) for phase, seconds in phases.items()}
+
+
+def bench_scale(n, runs, keep=False):
+    data = FixtureData(n)
+    server = FixtureServer(data).start()
+    tree = tempfile.mkdtemp(prefix=f"bench-pipeline-{n}-")
+    try:
+        make_tree(tree)
+        results = []
+        for run in range(1, runs + 1):
+            server.stats.clear()
+            start = time.perf_counter()
+            pipelines = run_pipelines(tree, environment(server.url), run)
+            results.append({
+                "run": run,
+                "cache": "cold" if run == 1 else "warm",
+                "seconds": round(time.perf_counter() - start, 3),
+                "phases": phase_times(pipelines),
+                "pipelines": pipelines,
+                "served": {route: dict(stats) for route, stats in sorted(server.stats.items())},
+            })
+        return {"n": n, "runs": results}
+    finally:
+        server.shutdown()
+        server.server_close()
+        if keep:
+            print(f"  scratch tree kept at {tree}")
+        else:
+            shutil.rmtree(tree, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_run(label, run):
+    phases = "  ".join(f"{phase} {run['phases'][phase]:7.2f}s" for phase in PHASES)
+    print(f"{label:>6} run {run['run']} ({run['cache']}): {run['seconds']:8.2f}s  {phases}")
+    for name, result in run["pipelines"].items():
+        status = "ok" if result["returncode"] == 0 else f"exit {result['returncode']}"
+        rss = f"peak RSS {result['peak_rss_mb']} MB" if result["peak_rss_mb"] is not None else ""
+        print(f"         {name:<22} {result['seconds']:8.2f}s  {status:<8} {rss}".rstrip())
+
+
+def compare(results, baseline):
+    """Print current / baseline time per scale, run and phase"""
+    print(f"Against {baseline['started_at']} ({baseline.get('commit') or 'unknown commit'}):")
+    for label, scale in results["scales"].items():
+        before = baseline["scales"].get(label)
+        if not before:
+            print(f"{label:>6} not in the baseline")
+            continue
+        for run, old in zip(scale["runs"], before["runs"]):
+            ratios = [f"total {run['seconds'] / old['seconds']:.2f}x"]
+            ratios += [f"{phase} {run['phases'][phase] / old['phases'][phase]:.2f}x"
+                       for phase in PHASES if old["phases"].get(phase)]
+            print(f"{label:>6} run {run['run']}: " + "  ".join(ratios))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", default=DEFAULT_SCALES,
+                        help=f"comma-separated market/trade counts, e.g. 1k,100k,1m (default {DEFAULT_SCALES})")
+    parser.add_argument("--runs", type=int, default=2, help="runs per scale; the first is cold (default 2)")
+    parser.add_argument("--output", help="results file (default benchmarks/results/pipeline-<time>.json)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch trees for inspection")
+    args = parser.parse_args()
+
+    started_at = datetime.now(timezone.utc)
+    results = {
+        "benchmark": "pipeline",
+        "started_at": started_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "scales": {},
+    }
+    for label in args.scales.split(","):
+        n = parse_scale(label)
+        print(f"{label}: {n:,} markets, trades and Dune rows")
+        scale = bench_scale(n, args.runs, args.keep)
+        results["scales"][label.strip()] = scale
+        for run in scale["runs"]:
+            print_run(label.strip(), run)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"pipeline-{started_at.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Rollup benchmark
+Times shared.rollups on 10M synthetic trades against the old per-row
+strptime/strftime + defaultdict weekly loop (timed on a sample and scaled up).
+
+Usage: python benchmarks/bench_rollups.py [n_trades]
+"""
+
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from shared.rollups import labels, rollup
+
+N_TRADES = 10_000_000
+LOOP_SAMPLE = 200_000
+SPAN_DAYS = 730
+
+
+def synthetic_trades(n, seed=0):
+    rng = np.random.default_rng(seed)
+    end = int(time.time())
+    ts = np.sort(rng.integers(end - SPAN_DAYS * 86400, end, size=n))
+    counts = rng.integers(1, 500, size=n).astype(np.float64)
+    return ts, counts
+
+
+def per_row_weekly(ts, counts):
+    """The per-row pattern the pipelines used before shared.rollups"""
+    weekly = defaultdict(float)
+    for t, c in zip(ts.tolist(), counts.tolist()):
+        date_str = datetime.utcfromtimestamp(t).strftime("%Y-%m-%d")
+        dt = datetime.strptime(date_str, "%Y-%m-%d")
+        week_start = dt - timedelta(days=dt.weekday())
+        weekly[week_start.strftime("%Y-%m-%d")] += c
+    return weekly
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else N_TRADES
+    ts, counts = synthetic_trades(n)
+    print(f"{n:,} trades over {SPAN_DAYS} days")
+
+    start = time.perf_counter()
+    result = rollup(ts, counts)
+    vectorized = time.perf_counter() - start
+    for freq, (starts, sums) in result.items():
+        print(f"  {freq:<8} {len(starts):>5} buckets, total {sums.sum():,.0f}")
+    print(f"vectorized rollup:  {vectorized:8.3f}s ({n / vectorized / 1e6:,.1f}M trades/s)")
+
+    sample = min(n, LOOP_SAMPLE)
+    start = time.perf_counter()
+    weekly = per_row_weekly(ts[:sample], counts[:sample])
+    loop = (time.perf_counter() - start) * n / sample
+    print(f"per-row loop (est): {loop:8.3f}s (timed on {sample:,} trades)")
+    print(f"speedup:            {loop / vectorized:8.1f}x")
+
+    # Sanity check: both paths agree on the sampled weeks
+    check = rollup(ts[:sample], counts[:sample])["weekly"]
+    assert dict(zip(labels(check[0]), check[1].tolist())) == dict(weekly)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""
+Local API stand-in for the pipeline benchmark
+Serves the endpoints the update scripts read - Kalshi /series, /markets and
+/markets/trades, Gamma /markets and Dune /query/{id}/results - from one
+ThreadingHTTPServer on 127.0.0.1, with the paging, filters and conditional
+GETs the real APIs have. Dune executions (POST /query/{id}/execute, then
+/execution/{id}/status and /results) stay pending for a configurable number
+of status polls, or end FAILED for the queries told to fail. A Polygon
+JSON-RPC endpoint at /rpc answers batched eth_getLogs / eth_getBlockByNumber
+from given logs and blocks, refusing log ranges over a result limit the way
+public nodes do.
+
+Responses are the recorded pages in benchmarks/fixtures/ scaled up: every
+generated market, trade or result row is a copy of a recorded record with its
+identity, status, close time and numbers rewritten from seeded columns, so a
+scale of 1k, 100k or 1M markets produces the same shapes and sizes the
+pipelines see in production. Records are built per page on request; only the
+numeric columns are held in memory.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+KALSHI_PREFIX = "/trade-api/v2"
+DUNE_PREFIX = "/api/v1"
+# Markets per Kalshi series (one cursor chain each) and per event
+MARKETS_PER_SERIES = 500
+MARKETS_PER_EVENT = 10
+# Share of markets per status; closed and settled markets are still listed
+STATUS_SHARES = {"active": 0.7, "closed": 0.1, "settled": 0.2}
+# Trades are spread over this window before the server started (inside the
+# ingest script's first-run lookback)
+TRADE_SPAN = 47 * 3600
+# Dune query -> time column of its rows (the queries polymarket/update_data.py reads)
+DUNE_QUERIES = {3343108: "day", 2683517: "month"}
+DEFAULT_PAGE_LIMIT = 100
+RPC_PATH = "/rpc"
+# The error public Polygon nodes return when an eth_getLogs range matches too many logs
+RPC_LIMIT_ERROR = {"code": -32005, "message": "query returned more than {limit} results"}
+# Dune execution states
+DUNE_PENDING, DUNE_COMPLETED, DUNE_FAILED = "QUERY_STATE_PENDING", "QUERY_STATE_COMPLETED", "QUERY_STATE_FAILED"
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), "r") as f:
+        return json.load(f)
+
+
+def iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FixtureData:
+    """Seeded columns for n markets, n trades and n Dune rows, and the API pages built from them"""
+
+    def __init__(self, n, seed=0, now=None):
+        self.n = n
+        self.now = int(now or time.time())
+        rng = np.random.default_rng(seed)
+
+        names = list(STATUS_SHARES)
+        self.status = rng.choice(len(names), size=n, p=list(STATUS_SHARES.values()))
+        self.status_names = np.array(names, dtype=object)[self.status]
+        live = self.status == names.index("active")
+        # Live markets close within a month; the others closed during the last week
+        self.close_ts = np.where(live, self.now + rng.integers(3600, 30 * 86400, size=n),
+                                 self.now - rng.integers(0, 7 * 86400, size=n))
+        self.volume = rng.lognormal(9, 2, size=n).astype(np.int64)
+        recent = self.close_ts >= self.now - 86400
+        self.volume_24h = np.where(recent, (self.volume * rng.uniform(0, 0.3, size=n)).astype(np.int64), 0)
+        self.open_interest = np.where(live, (self.volume * rng.uniform(0.1, 0.6, size=n)).astype(np.int64), 0)
+        self.liquidity = np.where(live, rng.lognormal(10, 1.5, size=n), 0.0)
+        self.open_rows = np.flatnonzero(live)
+
+        self.trade_counts = rng.integers(1, 500, size=n)
+        self.trade_prices = rng.integers(1, 100, size=n)
+        self.trade_step = TRADE_SPAN / n
+
+        self.kalshi_series = load_fixture("kalshi_series.json")["series"]
+        self.kalshi_markets = load_fixture("kalshi_markets.json")["markets"]
+        self.kalshi_trades = load_fixture("kalshi_trades.json")["trades"]
+        self.gamma_markets = load_fixture("gamma_markets.json")
+        self.dune_results = load_fixture("dune_results.json")
+        self.n_series = max(1, -(-n // MARKETS_PER_SERIES))
+
+    # -- Kalshi ---------------------------------------------------------------
+
+    def series_page(self):
+        series = []
+        for s in range(self.n_series):
+            record = copy.copy(self.kalshi_series[s % len(self.kalshi_series)])
+            record["ticker"] = f"BENCH{s}"
+            series.append(record)
+        return {"series": series}
+
+    def kalshi_market(self, i):
+        record = copy.copy(self.kalshi_markets[i % len(self.kalshi_markets)])
+        series, event = i // MARKETS_PER_SERIES, i // MARKETS_PER_EVENT
+        status = self.status_names[i]
+        record.update({
+            "ticker": f"BENCH{series}-E{event}-M{i}",
+            "event_ticker": f"BENCH{series}-E{event}",
+            "title": f"Benchmark market {i}",
+            "status": status,
+            "close_time": iso(int(self.close_ts[i])),
+            "volume": int(self.volume[i]),
+            "volume_24h": int(self.volume_24h[i]),
+            "open_interest": int(self.open_interest[i]),
+            "liquidity": int(self.liquidity[i] * 100),
+            "result": "yes" if status == "settled" and i % 2 else ("no" if status == "settled" else ""),
+        })
+        return record
+
+    def markets_page(self, query):
+        """/markets: series_ticker, status ("open" = active), min_close_ts, limit and cursor"""
+        series = query.get("series_ticker")
+        if series:
+            s = int(series[len("BENCH"):])
+            rows = np.arange(s * MARKETS_PER_SERIES, min((s + 1) * MARKETS_PER_SERIES, self.n))
+        else:
+            rows = np.arange(self.n)
+        if query.get("status") == "open":
+            rows = rows[self.status_names[rows] == "active"]
+        if query.get("min_close_ts"):
+            rows = rows[self.close_ts[rows] >= int(query["min_close_ts"])]
+        offset = int(query.get("cursor") or 0)
+        limit = int(query.get("limit") or DEFAULT_PAGE_LIMIT)
+        page = rows[offset:offset + limit]
+        cursor = str(offset + limit) if offset + limit < len(rows) else ""
+        return {"markets": [self.kalshi_market(i) for i in page.tolist()], "cursor": cursor}
+
+    def trades_page(self, query):
+        """/markets/trades, newest first: min_ts, max_ts, limit and cursor"""
+        def index_at(ts):
+            # Trade j happened at now - j * trade_step
+            return (self.now - ts) / self.trade_step
+
+        first = max(0, int(np.ceil(index_at(int(query["max_ts"])))) if query.get("max_ts") else 0)
+        end = self.n
+        if query.get("min_ts"):
+            end = min(end, int(np.floor(index_at(int(query["min_ts"])))) + 1)
+        offset = first + int(query.get("cursor") or 0)
+        limit = int(query.get("limit") or DEFAULT_PAGE_LIMIT)
+        trades = []
+        for j in range(offset, min(offset + limit, end)):
+            record = copy.copy(self.kalshi_trades[j % len(self.kalshi_trades)])
+            market = (j * 7919) % self.n
+            count, price = int(self.trade_counts[j]), int(self.trade_prices[j])
+            ts = self.now - j * self.trade_step
+            record.update({
+                "trade_id": f"bench-{j}",
+                "ticker": f"BENCH{market // MARKETS_PER_SERIES}-E{market // MARKETS_PER_EVENT}-M{market}",
+                "count": count, "count_fp": f"{count}.00",
+                "yes_price": price, "no_price": 100 - price,
+                "taker_side": "yes" if j % 2 else "no",
+                "created_time": iso(int(ts)),
+            })
+            trades.append(record)
+        cursor = str(offset + limit - first) if offset + limit < end else ""
+        return {"trades": trades, "cursor": cursor}
+
+    # -- Gamma ----------------------------------------------------------------
+
+    def gamma_market(self, i):
+        record = copy.copy(self.gamma_markets[i % len(self.gamma_markets)])
+        status = self.status_names[i]
+        record.update({
+            "id": str(1_000_000 + i),
+            "question": f"Benchmark market {i}?",
+            "slug": f"benchmark-market-{i}",
+            "endDate": iso(int(self.close_ts[i])),
+            "volumeNum": float(self.volume[i]), "volume": str(float(self.volume[i])),
+            "volume24hr": float(self.volume_24h[i]),
+            "openInterest": float(self.open_interest[i]),
+            "liquidity": f"{self.liquidity[i]:.4f}", "liquidityNum": float(self.liquidity[i]),
+            "active": True,
+            "closed": status != "active",
+            "umaResolutionStatus": "resolved" if status == "settled" else None,
+        })
+        return record
+
+    def gamma_page(self, query):
+        """Gamma /markets: closed=false, limit and offset"""
+        rows = self.open_rows if query.get("closed") == "false" else np.arange(self.n)
+        offset = int(query.get("offset") or 0)
+        limit = int(query.get("limit") or DEFAULT_PAGE_LIMIT)
+        return [self.gamma_market(i) for i in rows[offset:offset + limit].tolist()]
+
+    # -- Dune -----------------------------------------------------------------
+
+    def dune_page(self, query_id, query):
+        """/query/{id}/results: limit, offset and columns; one row per hour back from now"""
+        key = DUNE_QUERIES[query_id]
+        offset = int(query.get("offset") or 0)
+        limit = int(query["limit"]) if query.get("limit") else self.n
+        columns = query["columns"].split(",") if query.get("columns") else None
+        rows = []
+        for j in range(offset, min(offset + limit, self.n)):
+            row = {key: time.strftime("%Y-%m-%d %H:00:00.000 UTC", time.gmtime(self.now - j * 3600)),
+                   "volume": float(self.volume[j]), "trades": int(self.trade_counts[j])}
+            rows.append({c: row.get(c) for c in columns} if columns else row)
+        response = copy.deepcopy(self.dune_results)
+        response["query_id"] = query_id
+        response["result"]["rows"] = rows
+        response["result"]["metadata"].update(row_count=len(rows), total_row_count=self.n)
+        end = offset + len(rows)
+        response["next_offset"] = end if end < self.n else None
+        return response
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self._handle("POST", json.loads(self.rfile.read(length) or b"{}"))
+
+    def _handle(self, method, payload=None):
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        try:
+            route, body = self.server.route(parts.path, query, method, payload)
+        except (KeyError, ValueError) as e:
+            route, body = None, {"error": f"bad request: {e}"}
+        if route is None:
+            return self._send(404 if "error" not in body else 400, json.dumps(body).encode())
+        encoded = json.dumps(body, separators=(",", ":")).encode()
+        self.server.count(route, len(encoded))
+        if method != "GET":
+            return self._send(200, encoded)
+        etag = '"%s"' % hashlib.sha1(encoded).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", etag)
+        self._send(200, encoded, etag)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """
+    The API stand-in; counts requests and bytes served per route. A Dune
+    execution answers pending_polls status polls with PENDING before it
+    completes; executions of failing_queries end FAILED instead. The RPC
+    endpoint serves rpc_logs and rpc_blocks ({hex number: block}) and refuses
+    eth_getLogs ranges matching more than rpc_log_limit logs.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, data, port=0, pending_polls=0, failing_queries=(),
+                 rpc_logs=(), rpc_blocks=None, rpc_log_limit=None):
+        super().__init__(("127.0.0.1", port), FixtureHandler)
+        self.data = data
+        self.stats = {}
+        self.pending_polls = pending_polls
+        self.failing_queries = set(failing_queries)
+        self.executions = {}
+        self.rpc_logs = list(rpc_logs)
+        self.rpc_blocks = dict(rpc_blocks or {})
+        self.rpc_log_limit = rpc_log_limit
+        # (fromBlock, toBlock, served) of every eth_getLogs call
+        self.log_ranges = []
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def route(self, path, query, method="GET", payload=None):
+        """(route name, JSON body) for a request, or (None, {}) if unknown"""
+        if path == RPC_PATH and method == "POST":
+            return "rpc", [self.rpc_call(call) for call in payload]
+        if path.startswith(f"{DUNE_PREFIX}/query/") and path.endswith("/execute") and method == "POST":
+            return "dune_execute", self.execute(int(path.split("/")[-2]), payload)
+        if path.startswith(f"{DUNE_PREFIX}/execution/"):
+            execution_id, action = path.split("/")[-2:]
+            if action == "status":
+                return "dune_status", self.execution_status(execution_id)
+            if action == "results":
+                return "dune_execution_results", self.execution_results(execution_id)
+        if method != "GET":
+            return None, {}
+        if path == f"{KALSHI_PREFIX}/series":
+            return "kalshi_series", self.data.series_page()
+        if path == f"{KALSHI_PREFIX}/markets":
+            return "kalshi_markets", self.data.markets_page(query)
+        if path == f"{KALSHI_PREFIX}/markets/trades":
+            return "kalshi_trades", self.data.trades_page(query)
+        if path == "/markets":
+            return "gamma_markets", self.data.gamma_page(query)
+        if path.startswith(f"{DUNE_PREFIX}/query/") and path.endswith("/results"):
+            query_id = int(path.split("/")[-2])
+            if query_id in DUNE_QUERIES:
+                return "dune_results", self.data.dune_page(query_id, query)
+        return None, {}
+
+    def execute(self, query_id, payload):
+        if query_id not in DUNE_QUERIES:
+            raise KeyError(query_id)
+        with self._lock:
+            execution_id = f"01BENCH{len(self.executions):06d}"
+            self.executions[execution_id] = {"query_id": query_id, "polls": 0,
+                                             "parameters": (payload or {}).get("query_parameters")}
+        return {"execution_id": execution_id, "state": DUNE_PENDING}
+
+    def execution_status(self, execution_id):
+        """PENDING for the first pending_polls polls, then COMPLETED (or FAILED)"""
+        with self._lock:
+            execution = self.executions[execution_id]
+            execution["polls"] += 1
+            polls = execution["polls"]
+        status = {"execution_id": execution_id, "query_id": execution["query_id"],
+                  "submitted_at": iso(self.data.now)}
+        if polls <= self.pending_polls:
+            return dict(status, state=DUNE_PENDING)
+        status["execution_ended_at"] = iso(int(time.time()))
+        if execution["query_id"] in self.failing_queries:
+            return dict(status, state=DUNE_FAILED, error={"type": "FAILED_TYPE_EXECUTION_FAILED",
+                                                          "message": "benchmark failure"})
+        return dict(status, state=DUNE_COMPLETED)
+
+    def execution_results(self, execution_id):
+        execution = self.executions[execution_id]
+        response = self.data.dune_page(execution["query_id"], {})
+        response.update(execution_id=execution_id, state=DUNE_COMPLETED,
+                        execution_ended_at=iso(int(time.time())))
+        return response
+
+    def rpc_call(self, call):
+        """One JSON-RPC response object for one call of a batch"""
+        method, params = call["method"], call.get("params") or []
+        response = {"jsonrpc": "2.0", "id": call.get("id")}
+        if method == "eth_getBlockByNumber" and params[0] in self.rpc_blocks:
+            return dict(response, result=self.rpc_blocks[params[0]])
+        if method != "eth_getLogs":
+            return dict(response, error={"code": -32601, "message": f"the method {method} does not exist"})
+        log_filter = params[0]
+        start, end = int(log_filter["fromBlock"], 16), int(log_filter["toBlock"], 16)
+        addresses = {a.lower() for a in log_filter.get("address") or []}
+        topics = {t.lower() for t in (log_filter.get("topics") or [[]])[0]}
+        logs = [log for log in self.rpc_logs
+                if start <= int(log["blockNumber"], 16) <= end
+                and (not addresses or log["address"].lower() in addresses)
+                and (not topics or log["topics"][0].lower() in topics)]
+        served = self.rpc_log_limit is None or len(logs) <= self.rpc_log_limit
+        with self._lock:
+            self.log_ranges.append((start, end, served))
+        if not served:
+            error = dict(RPC_LIMIT_ERROR, message=RPC_LIMIT_ERROR["message"].format(limit=self.rpc_log_limit))
+            return dict(response, error=error)
+        return dict(response, result=logs)
+
+    def count(self, route, size):
+        with self._lock:
+            stats = self.stats.setdefault(route, {"requests": 0, "bytes": 0})
+            stats["requests"] += 1
+            stats["bytes"] += size
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def environment(url):
+    """Environment variables pointing the update scripts at a FixtureServer url"""
+    return {
+        "KALSHI_API_BASE": f"{url}{KALSHI_PREFIX}",
+        "GAMMA_API_BASE": url,
+        "DUNE_API_BASE": f"{url}{DUNE_PREFIX}",
+        "DUNE_API_KEY": "benchmark",
+        "HTTP_RATE_LIMITS": "127.0.0.1=100000:100000",
+    }
@@ -5,49 +5,65 @@ Polymarket Volume Data Fetcher using Dune Analytics API
 
 import json
 import os
-import urllib.request
+import sys
 from datetime import datetime
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from shared.dune_client import DuneClient
+from shared.instrumentation import instrumented, set_metrics, stage
+
 DUNE_API_KEY = os.environ.get('DUNE_API_KEY')
+DATA_PATH = os.path.join(SCRIPT_DIR, 'data.json')
 DAILY_VOLUME_QUERY_ID = 3343108
 MONTHLY_VOLUME_QUERY_ID = 2683517
 
-def fetch_dune_query(query_id):
-    url = f"https://api.dune.com/api/v1/query/{query_id}/results"
-    headers = {'X-Dune-API-Key': DUNE_API_KEY, 'Content-Type': 'application/json'}
-    req = urllib.request.Request(url, headers=headers)
-    try:
-        with urllib.request.urlopen(req, timeout=60) as response:
-            return json.loads(response.read().decode())
-    except Exception as e:
-        print(f"Error: {e}")
-        return None
+def fetch_latest_rows():
+    """Latest 7 daily rows and latest monthly row, fetched concurrently with only the needed columns"""
+    client = DuneClient(DUNE_API_KEY)
+    results = client.run_concurrently({
+        'daily': lambda: client.latest_top_rows(DAILY_VOLUME_QUERY_ID, 'day', 7, columns=['day', 'volume']),
+        'monthly': lambda: client.latest_top_rows(MONTHLY_VOLUME_QUERY_ID, 'month', 1, columns=['month', 'volume']),
+    })
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            print(f"Error fetching {name} query: {result}")
+            results[name] = []
+    return results
 
 def get_volume_data():
-    daily = fetch_dune_query(DAILY_VOLUME_QUERY_ID)
-    monthly = fetch_dune_query(MONTHLY_VOLUME_QUERY_ID)
+    rows = fetch_latest_rows()
     metrics = {'volume_24hr': 0, 'volume_1wk': 0, 'volume_1mo': 0, 
                'data_source': 'Dune Analytics', 'query_ids': {'daily': DAILY_VOLUME_QUERY_ID, 'monthly': MONTHLY_VOLUME_QUERY_ID}}
-    if daily and 'result' in daily and 'rows' in daily['result']:
-        rows = sorted(daily['result']['rows'], key=lambda x: x.get('day', ''), reverse=True)
-        if rows:
-            metrics['volume_24hr'] = float(rows[0].get('volume', 0))
-            metrics['volume_1wk'] = sum(float(r.get('volume', 0)) for r in rows[:7])
-    if monthly and 'result' in monthly and 'rows' in monthly['result']:
-        rows = sorted(monthly['result']['rows'], key=lambda x: x.get('month', ''), reverse=True)
-        if rows:
-            metrics['volume_1mo'] = float(rows[0].get('volume', 0))
+    daily = rows['daily']
+    if daily:
+        metrics['volume_24hr'] = float(daily[0].get('volume', 0))
+        metrics['volume_1wk'] = sum(float(r.get('volume', 0)) for r in daily)
+    monthly = rows['monthly']
+    if monthly:
+        metrics['volume_1mo'] = float(monthly[0].get('volume', 0))
     return metrics
 
+def save_volume_data(metrics):
+    """Stamp the metrics and write them to data.json (read by polymarket/index.html)"""
+    metrics = dict(metrics, last_updated=datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC'))
+    print(f"24hr: ${metrics['volume_24hr']:,.0f}, 7d: ${metrics['volume_1wk']:,.0f}, 30d: ${metrics['volume_1mo']:,.0f}")
+    with open(DATA_PATH, 'w') as f:
+        json.dump(metrics, f, indent=2)
+
+@instrumented('polymarket_dune')
 def main():
     if not DUNE_API_KEY:
         print("ERROR: DUNE_API_KEY not set")
         return
-    metrics = get_volume_data()
-    metrics['last_updated'] = datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')
-    print(f"24hr: ${metrics['volume_24hr']:,.0f}, 7d: ${metrics['volume_1wk']:,.0f}, 30d: ${metrics['volume_1mo']:,.0f}")
-    with open('polymarket/data.json', 'w') as f:
-        json.dump(metrics, f, indent=2)
+    with stage('fetch_dune'):
+        metrics = get_volume_data()
+    set_metrics(volume_24hr=metrics['volume_24hr'], volume_1wk=metrics['volume_1wk'],
+                volume_1mo=metrics['volume_1mo'])
+    with stage('write_json'):
+        save_volume_data(metrics)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Dashboard pipeline runner
+Runs the Kalshi, Polymarket (Gamma) and Dune updates as one stage DAG
+(shared.pipeline) instead of one script per step re-reading the previous
+step's JSON:
+
+    fetch_kalshi_markets --+
+    fetch_kalshi_trades ---+-> rollups_kalshi -----> render_kalshi_dashboard
+                                                 +-> render_kalshi_drilldowns
+    fetch_gamma -----------> rollups_polymarket -> render_polymarket_dashboard
+    fetch_dune ------------> write_dune
+
+The fetches run concurrently and outputs are passed in memory. A stage whose
+inputs hash the same as on the last run is skipped, e.g. no new trades and no
+market changes leave the rollups and pages untouched. Each stage still writes
+the same files as the standalone scripts, which keep working on their own.
+
+--daemon keeps one process running and re-runs the targets (default Kalshi
+and Polymarket; Dune data is daily) every --interval seconds, with HTTP
+sessions, templates and the last market snapshot kept warm. Each run walks
+only open markets and ingests only new trades, and the rollups and data
+files are updated every time, but the pages are re-rendered only when a
+headline total moved by more than --threshold or --max-age went by.
+
+Usage:
+    python run_pipeline.py                    # every stage
+    python run_pipeline.py kalshi dune        # only these targets and what they need
+    python run_pipeline.py --force            # ignore the stored input hashes
+    python run_pipeline.py --daemon --interval 60 --threshold 0.01
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT_DIR)
+
+from shared.instrumentation import instrumented, set_metrics
+from shared.pipeline import FAILED, MAX_WORKERS, ChangeGate, Pipeline, Stage, describe
+from shared.renderer import LAST_UPDATED, write_if_changed
+from shared.snapshot_diff import canonical, load_delta, record_run
+from shared.snapshot_diff import describe as describe_changes
+
+
+def load_script(relative_path, module_name):
+    """Import a dashboard script by path (their directories have spaces, and two share a file name)"""
+    path = os.path.join(ROOT_DIR, relative_path)
+    script_dir = os.path.dirname(path)
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)  # for sibling imports such as ingest_kalshi_trades
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+kalshi = load_script("Kalshi-HOOD Dashboard/update_kalshi_data.py", "update_kalshi_data")
+kalshi_dashboard = load_script("Kalshi-HOOD Dashboard/update_dashboard.py", "kalshi_dashboard")
+drilldowns = load_script("Kalshi-HOOD Dashboard/generate_drilldowns.py", "generate_drilldowns")
+gamma = load_script("Polymarket Dashboard/update_polymarket_data.py", "update_polymarket_data")
+gamma_dashboard = load_script("Polymarket Dashboard/update_dashboard.py", "polymarket_dashboard")
+dune = load_script("polymarket/update_data.py", "polymarket_update_data")
+
+# Target groups: the end stages of each dashboard
+TARGETS = {
+    "kalshi": ("render_kalshi_dashboard", "render_kalshi_drilldowns"),
+    "polymarket": ("render_polymarket_dashboard",),
+    "dune": ("write_dune",),
+}
+DAEMON_TARGETS = ("kalshi", "polymarket")
+# Daemon defaults: seconds between runs, relative change of a headline total
+# that re-renders the pages, and the longest the pages go without a re-render
+DAEMON_INTERVAL = 60
+MIN_INTERVAL = 5
+CHANGE_THRESHOLD = 0.01
+MAX_AGE = 15 * 60
+# Headline totals each dashboard shows, watched by the daemon's change gates
+KALSHI_HEADLINE = ("volume_24h", "open_interest", "active_markets")
+POLYMARKET_HEADLINE = ("volume_24h_millions", "open_interest_millions", "liquidity_millions", "active_markets")
+
+
+def read_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# -- Kalshi -------------------------------------------------------------------
+
+def fetch_kalshi_markets(inputs):
+    """Market totals and snapshot (None if the API was unavailable)"""
+    return kalshi.fetch_markets_data()
+
+
+def fetch_kalshi_trades(inputs):
+    return kalshi.ingest_trades()
+
+
+def rollups_kalshi(inputs):
+    """Snapshot diff, trade rollups, chart data and the data files; returns what the pages need"""
+    totals = inputs["fetch_kalshi_markets"]
+    snapshot_run = None
+    if totals:
+        snapshot_run, summary, movers = record_run(kalshi.VENUE, totals["markets"], kalshi.DELTA_PATH)
+        print(describe_changes(summary, movers))
+    history, candles = kalshi.read_trade_history()
+    data, daily_all, weekly_all = kalshi.build_volume_data(totals, history)
+    kalshi.write_kalshi_chart_data(daily_all, weekly_all, candles)
+    kalshi.save_volume_data(data, totals, snapshot_run)
+    markets = kalshi.sorted_market_records(totals["markets"]) if totals and len(totals["markets"]) else None
+    return {"data": data, "markets": markets, "snapshot_run": snapshot_run}
+
+
+def restore_kalshi():
+    """rollups_kalshi's output as last written to disk (None, so it runs again, if a file is missing)"""
+    data, snapshot = read_json(kalshi.VOLUME_DATA_PATH), read_json(kalshi.MARKETS_PATH)
+    if data is None or snapshot is None:
+        return None
+    return {"data": data, "markets": snapshot["markets"], "snapshot_run": snapshot.get("snapshot")}
+
+
+def render_kalshi_dashboard(inputs):
+    html = kalshi_dashboard.generate_dashboard_html(inputs["rollups_kalshi"]["data"])
+    return write_if_changed(kalshi_dashboard.OUTPUT_PATH, html, LAST_UPDATED)
+
+
+def render_kalshi_drilldowns(inputs):
+    rollups = inputs["rollups_kalshi"]
+    if not rollups["markets"]:
+        print("No per-market data, skipping drill-down pages")
+        return None
+    stats = drilldowns.generate(rollups["markets"], rollups["data"]["last_updated"],
+                                snapshot_run=rollups["snapshot_run"], delta=load_delta(kalshi.DELTA_PATH))
+    print(f"Drill-down pages: {stats['shards']:,} shards, {stats['hashed']:,} hashed, "
+          f"{stats['rendered']:,} rendered, {stats['written']:,} written, {stats['removed']:,} removed")
+    return stats
+
+
+# -- Polymarket (Gamma) -------------------------------------------------------
+
+def fetch_gamma(inputs):
+    markets, frozen, universe = gamma.fetch_markets()
+    return {"markets": markets, "frozen": frozen, "universe": universe}
+
+
+def rollups_polymarket(inputs):
+    fetched = inputs["fetch_gamma"]
+    _, summary, movers = record_run(gamma.VENUE, fetched["universe"], gamma.DELTA_PATH)
+    print(describe_changes(summary, movers))
+    output = gamma.build_volume_data(gamma.calculate_volume_metrics(fetched["markets"], fetched["frozen"]))
+    gamma.save_volume_data(output)
+    gamma.write_polymarket_chart_data(output)
+    return output
+
+
+def render_polymarket_dashboard(inputs):
+    return write_if_changed(gamma_dashboard.OUTPUT_PATH,
+                            gamma_dashboard.generate_html(inputs["rollups_polymarket"]), LAST_UPDATED)
+
+
+# -- Dune -----------------------------------------------------------------------
+
+def fetch_dune(inputs):
+    if not dune.DUNE_API_KEY:
+        raise RuntimeError("DUNE_API_KEY not set")
+    return dune.get_volume_data()
+
+
+def write_dune(inputs):
+    dune.save_volume_data(inputs["fetch_dune"])
+
+
+def headline(keys):
+    """Picks the headline totals out of a rollups output's dashboard data"""
+    def values(output):
+        data = output["data"] if "data" in output else output
+        return {key: data["metrics"].get(key) for key in keys}
+    return values
+
+
+def build_pipeline(max_workers=MAX_WORKERS, threshold=None, max_age=None):
+    """
+    The dashboard DAG. With a threshold the rollups pass on their headline
+    totals through a ChangeGate instead of their whole output, so the pages
+    are only re-rendered on a change of more than threshold (or after max_age)
+    """
+    kalshi_fingerprint = lambda out: {"data": out["data"], "snapshot_run": out["snapshot_run"]}
+    polymarket_fingerprint = None
+    if threshold is not None:
+        kalshi_fingerprint = ChangeGate(headline(KALSHI_HEADLINE), threshold, max_age)
+        polymarket_fingerprint = ChangeGate(headline(POLYMARKET_HEADLINE), threshold, max_age)
+    return Pipeline([
+        # Series are walked concurrently, so market rows arrive in a different order every run
+        Stage("fetch_kalshi_markets", fetch_kalshi_markets,
+              fingerprint=lambda totals: totals and dict(totals, markets=canonical(totals["markets"]))),
+        # The store changed iff its size or newest trade did, whatever this run ingested
+        Stage("fetch_kalshi_trades", fetch_kalshi_trades,
+              fingerprint=lambda trades: {k: trades[k] for k in ("trades", "max_ts")}),
+        Stage("rollups_kalshi", rollups_kalshi, deps=("fetch_kalshi_markets", "fetch_kalshi_trades"),
+              restore=restore_kalshi, fingerprint=kalshi_fingerprint),
+        Stage("render_kalshi_dashboard", render_kalshi_dashboard, deps=("rollups_kalshi",),
+              files=(kalshi_dashboard.TEMPLATE_PATH,)),
+        Stage("render_kalshi_drilldowns", render_kalshi_drilldowns, deps=("rollups_kalshi",),
+              files=(drilldowns.TEMPLATE_PATH,)),
+        Stage("fetch_gamma", fetch_gamma,
+              fingerprint=lambda fetched: dict(fetched, markets=canonical(fetched["markets"]),
+                                               universe=canonical(fetched["universe"]))),
+        Stage("rollups_polymarket", rollups_polymarket, deps=("fetch_gamma",),
+              restore=gamma_dashboard.load_volume_data, fingerprint=polymarket_fingerprint),
+        Stage("render_polymarket_dashboard", render_polymarket_dashboard, deps=("rollups_polymarket",),
+              files=(gamma_dashboard.TEMPLATE_PATH,)),
+        Stage("fetch_dune", fetch_dune),
+        Stage("write_dune", write_dune, deps=("fetch_dune",)),
+    ], max_workers=max_workers)
+
+
+@instrumented("pipeline")
+def run_once(pipeline, targets, force=False, **metrics):
+    """One instrumented pipeline run; returns {stage name: StageResult}"""
+    results = pipeline.run(targets or None, force=force)
+    set_metrics(stages={name: result.status for name, result in results.items()}, **metrics)
+    print(describe(results))
+    return results
+
+
+def run_daemon(pipeline, targets, interval):
+    """Run the pipeline every interval seconds until SIGINT/SIGTERM (the current run is finished first)"""
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    print(f"Daemon started: {', '.join(targets)} every {interval:g}s")
+    run = 0
+    while not stop.is_set():
+        start = time.monotonic()
+        run += 1
+        print(f"Daemon run {run} at {datetime.utcnow().isoformat()}")
+        try:
+            run_once(pipeline, targets, daemon_run=run)
+        except Exception as e:
+            print(f"Daemon run {run} failed: {e}")
+        stop.wait(max(0.0, interval - (time.monotonic() - start)))
+    print(f"Daemon stopped after {run} run(s)")
+
+
+def main():
+    """Returns the exit status: 1 if any stage of a one-off run failed"""
+    parser = argparse.ArgumentParser(description="Run the dashboard update stages as one DAG")
+    parser.add_argument("targets", nargs="*",
+                        help=f"target groups ({', '.join(sorted(TARGETS))}) or stage names (default: everything, "
+                             f"or {' and '.join(DAEMON_TARGETS)} with --daemon)")
+    parser.add_argument("--force", action="store_true", help="run every stage even if its inputs are unchanged")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="stages run at once")
+    parser.add_argument("--daemon", action="store_true", help="keep running, refreshing every --interval seconds")
+    parser.add_argument("--interval", type=float, default=DAEMON_INTERVAL,
+                        help=f"daemon: seconds between runs (default {DAEMON_INTERVAL}, at least {MIN_INTERVAL})")
+    parser.add_argument("--threshold", type=float, default=CHANGE_THRESHOLD,
+                        help=f"daemon: relative change of a headline total that re-renders the pages "
+                             f"(default {CHANGE_THRESHOLD})")
+    parser.add_argument("--max-age", type=float, default=MAX_AGE,
+                        help=f"daemon: seconds after which the pages are re-rendered anyway (default {MAX_AGE})")
+    args = parser.parse_args()
+    if args.daemon and args.interval < MIN_INTERVAL:
+        parser.error(f"--interval must be at least {MIN_INTERVAL} seconds")
+
+    if args.daemon:
+        pipeline = build_pipeline(args.workers, args.threshold, args.max_age)
+    else:
+        pipeline = build_pipeline(args.workers)
+    names = args.targets or (DAEMON_TARGETS if args.daemon else ())
+    targets = [stage for target in names for stage in TARGETS.get(target, (target,))]
+    unknown = [name for name in targets if name not in pipeline.stages]
+    if unknown:
+        parser.error(f"unknown target(s): {', '.join(unknown)}")
+    if args.daemon:
+        run_daemon(pipeline, targets, args.interval)
+        return 0
+    results = run_once(pipeline, targets, force=args.force)
+    return 1 if any(result.status == FAILED for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
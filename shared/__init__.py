@@ -0,0 +1,4 @@
+"""
+Shared helpers for the Kalshi and Polymarket update scripts.
+The scripts add the repository root to sys.path before importing from here.
+"""
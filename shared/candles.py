@@ -0,0 +1,77 @@
+"""
+Multi-resolution OHLC + volume candles
+Per-ticker candles in four tiers - 1 minute, 1 hour, 1 day and 1 ISO week. The
+minute tier is cut from raw trades; every coarser tier is merged from the tier
+below it (open of the first, close of the last, max high, min low, summed
+volume and trade count), so a trade is only ever read once. Each tier has its
+own retention, measured back from the latest trade.
+
+The kernels here work on NumPy columns sorted by (ticker, time); the
+TradeStore keeps the tiers in its candles table (see refresh_candles()).
+"""
+
+import numpy as np
+
+from shared.rollups import week_starts
+
+WEEK = 7 * 86400
+
+# (name, bucket width in seconds, retention in seconds or None to keep forever)
+TIERS = (
+    ("1m", 60, 3 * 86400),
+    ("1h", 3600, 90 * 86400),
+    ("1d", 86400, 3 * 365 * 86400),
+    ("1w", WEEK, None),
+)
+TIER_WIDTHS = {name: width for name, width, _ in TIERS}
+
+# Column order of a candle batch; ticker_ids index into a separate ticker array
+CANDLE_COLUMNS = ("ticker_ids", "starts", "open", "high", "low", "close", "volume", "trades")
+
+
+def bucket_starts(ts, width):
+    """Start (epoch seconds) of the bucket holding each timestamp; weeks start on Monday"""
+    ts = np.asarray(ts, dtype=np.int64)
+    if width == WEEK:
+        return week_starts(ts // 86400) * 86400
+    return ts - ts % width
+
+
+def combine(ticker_ids, starts, open_, high, low, close, volume, trades):
+    """
+    Merge consecutive rows with the same (ticker, start) into one candle each.
+    Rows must be sorted by ticker, then time. Missing prices are NaN and are
+    ignored by high/low. Returns a tuple in CANDLE_COLUMNS order.
+    """
+    n = len(starts)
+    if n == 0:
+        return tuple(np.asarray(col)[:0] for col in (ticker_ids, starts, open_, high, low,
+                                                     close, volume, trades))
+    change = np.empty(n, dtype=bool)
+    change[0] = True
+    change[1:] = (ticker_ids[1:] != ticker_ids[:-1]) | (starts[1:] != starts[:-1])
+    first = np.flatnonzero(change)
+    last = np.append(first[1:], n) - 1
+    return (
+        ticker_ids[first],
+        starts[first],
+        open_[first],
+        np.fmax.reduceat(high, first),
+        np.fmin.reduceat(low, first),
+        close[last],
+        np.add.reduceat(volume, first),
+        np.add.reduceat(trades, first),
+    )
+
+
+def from_trades(ticker_ids, ts, prices, counts):
+    """Minute candles from raw trades sorted by (ticker, ts)"""
+    prices = np.asarray(prices, dtype=np.float64)
+    return combine(np.asarray(ticker_ids), bucket_starts(ts, 60), prices, prices, prices, prices,
+                   np.asarray(counts, dtype=np.float64), np.ones(len(prices), dtype=np.int64))
+
+
+def downsample(candles, width):
+    """Candles of a coarser tier (bucket width in seconds) from a sorted batch of finer ones"""
+    ticker_ids, starts = candles[0], candles[1]
+    return combine(ticker_ids, bucket_starts(starts, width), *candles[2:])
@@ -0,0 +1,91 @@
+"""
+Chart data artifacts
+Chart series are written next to the site as small columnar JSON files - one
+shard per calendar period (year, month or day), holding parallel arrays (a key
+column of day numbers or epoch seconds plus value columns) - and a manifest
+listing each shard's key range and content hash. Pages load the manifest, then
+fetch only the shards that overlap the time range a chart is showing (see
+assets/chart_data.js), so page size no longer grows with history.
+"""
+
+import glob
+import json
+import os
+
+import numpy as np
+
+from shared.renderer import content_hash, write_if_changed
+from shared.rollups import to_days
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SITE_DATA_DIR = os.path.join(ROOT_DIR, "data")
+
+# datetime64 units per key column, used to cut shards by calendar period
+KEY_UNITS = {"day": "D", "ts": "s"}
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def build_series(name, keys, columns, site_dir, key="day", shard="Y"):
+    """
+    Write one series as per-period shards under site_dir and return its manifest entry.
+
+    keys: sorted 'YYYY-MM-DD' strings (key="day") or epoch seconds (key="ts");
+    columns: {column name: list of numbers} aligned with keys; shard: "Y", "M"
+    or "D" shards per year, month or day. Unchanged shards are not rewritten.
+    """
+    if key == "day":
+        values = to_days(keys) if len(keys) else np.zeros(0, dtype=np.int64)
+    else:
+        values = np.asarray(keys, dtype=np.int64)
+    periods = values.astype(f"datetime64[{KEY_UNITS[key]}]").astype(f"datetime64[{shard}]")
+    shards = []
+    for period in np.unique(periods):
+        mask = periods == period
+        payload = {key: values[mask].tolist()}
+        for column, column_values in columns.items():
+            payload[column] = np.asarray(column_values)[mask].tolist()
+        content = _dumps(payload)
+        file_name = f"{name}-{np.datetime_as_string(period)}.json"
+        write_if_changed(os.path.join(site_dir, file_name), content)
+        shards.append({
+            "file": file_name,
+            "first": payload[key][0],
+            "last": payload[key][-1],
+            "rows": len(payload[key]),
+            "hash": content_hash(content)[:12],
+        })
+    return {
+        "key": key,
+        "columns": [key] + list(columns),
+        "first": shards[0]["first"] if shards else None,
+        "last": shards[-1]["last"] if shards else None,
+        "shards": shards,
+    }
+
+
+def write_chart_data(site, series, extra=None):
+    """
+    Write every series of a site (e.g. "kalshi") plus its manifest under data/<site>/.
+
+    series: {series name: (keys, {column: values}) or (keys, {column: values}, options)}
+    where options are build_series() keyword arguments (key, shard). Shards no
+    longer listed (e.g. aged out of a tier's retention) are deleted. extra is
+    merged into the manifest. Returns the manifest path.
+    """
+    site_dir = os.path.join(SITE_DATA_DIR, site)
+    manifest = {"version": 1, "series": {}}
+    manifest.update(extra or {})
+    for name, spec in series.items():
+        keys, columns = spec[0], spec[1]
+        options = spec[2] if len(spec) > 2 else {}
+        manifest["series"][name] = build_series(name, keys, columns, site_dir, **options)
+    current = {s["file"] for entry in manifest["series"].values() for s in entry["shards"]}
+    for path in glob.glob(os.path.join(site_dir, "*-*.json")):
+        if os.path.basename(path) not in current:
+            os.remove(path)
+    manifest_path = os.path.join(site_dir, "manifest.json")
+    write_if_changed(manifest_path, json.dumps(manifest, indent=1).encode("utf-8"))
+    return manifest_path
@@ -0,0 +1,221 @@
+"""
+Dune Analytics client
+Submits several queries at once, polls each execution's status endpoint with
+exponential backoff, and caches results on disk keyed by query ID, parameters
+and execution timestamp, so a rerun inside the freshness window costs no API
+credits and no waiting.
+
+Large result sets are read with limit/offset pages restricted to the needed
+columns, each page body decoded row by row as it streams in.
+"""
+
+import glob
+import hashlib
+import heapq
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from shared.http_client import CACHE_DIR, request_with_failover
+from shared.instrumentation import bind, counted
+from shared.json_stream import iter_array_items
+
+DUNE_API_BASE = os.environ.get("DUNE_API_BASE", "https://api.dune.com/api/v1")
+DUNE_CACHE_DIR = os.path.join(CACHE_DIR, "dune")
+# Results younger than this (by execution end time) are served from the cache
+DEFAULT_MAX_AGE = float(os.environ.get("DUNE_CACHE_MAX_AGE", 12 * 3600))
+
+# Status polling: first delay, growth factor, cap and overall deadline (seconds)
+POLL_INITIAL = 0.5
+POLL_FACTOR = 1.6
+POLL_MAX = 15
+POLL_TIMEOUT = 600
+MAX_WORKERS = 4
+# Rows per results page and bytes per streamed read
+RESULT_PAGE_SIZE = 10_000
+STREAM_CHUNK = 64 * 1024
+
+COMPLETED = "QUERY_STATE_COMPLETED"
+FAILED_STATES = {"QUERY_STATE_FAILED", "QUERY_STATE_CANCELLED", "QUERY_STATE_EXPIRED"}
+
+
+class DuneError(Exception):
+    """A Dune execution failed, was cancelled or did not finish in time"""
+
+
+def _params_key(params):
+    encoded = json.dumps(params or {}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+def _parse_time(value):
+    """Epoch seconds from a Dune timestamp such as 2024-01-01T12:00:00.123456789Z"""
+    if not value:
+        return None
+    value = value.rstrip("Z")
+    if "." in value:
+        head, fraction = value.split(".", 1)
+        value = f"{head}.{fraction[:6]}"
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+class DuneClient:
+    """Concurrent Dune query runner with an on-disk result cache"""
+
+    def __init__(self, api_key=None, base_url=DUNE_API_BASE, cache_dir=DUNE_CACHE_DIR,
+                 max_age=DEFAULT_MAX_AGE, max_workers=MAX_WORKERS):
+        self.api_key = api_key or os.environ.get("DUNE_API_KEY")
+        self.base_url = base_url
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.max_workers = max_workers
+
+    # -- HTTP ---------------------------------------------------------------
+
+    def _send(self, method, path, **kwargs):
+        headers = {"X-Dune-API-Key": self.api_key, "Content-Type": "application/json"}
+        _, response = request_with_failover([self.base_url], path, method=method,
+                                            headers=headers, timeout=(5, 60), **kwargs)
+        return response
+
+    def _request(self, method, path, **kwargs):
+        return self._send(method, path, **kwargs).json()
+
+    # -- cache --------------------------------------------------------------
+
+    def _cache_pattern(self, kind, query_id, params):
+        return os.path.join(self.cache_dir, f"{kind}-{query_id}-{_params_key(params)}-*.json")
+
+    def _cache_get(self, kind, query_id, params):
+        """Newest cached response for the key if it is still fresh, else None"""
+        paths = sorted(glob.glob(self._cache_pattern(kind, query_id, params)))
+        if not paths:
+            return None
+        executed_at = int(os.path.basename(paths[-1]).rsplit("-", 1)[1].split(".")[0])
+        if time.time() - executed_at > self.max_age:
+            return None
+        try:
+            with open(paths[-1], "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _cache_put(self, kind, query_id, params, response):
+        executed_at = _parse_time(response.get("execution_ended_at")) or time.time()
+        stale = glob.glob(self._cache_pattern(kind, query_id, params))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir,
+                            f"{kind}-{query_id}-{_params_key(params)}-{int(executed_at)}.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(response, f)
+        os.replace(tmp_path, path)
+        for old in stale:
+            if old != path:
+                os.remove(old)
+
+    # -- queries ------------------------------------------------------------
+
+    def latest_results(self, query_id, params=None):
+        """Latest stored results of a saved query (no new execution, no credits)"""
+        cached = self._cache_get("latest", query_id, params)
+        if cached is not None:
+            return cached
+        query = {f"params.{k}": v for k, v in (params or {}).items()}
+        response = self._request("GET", f"/query/{query_id}/results", params=query)
+        self._cache_put("latest", query_id, params, response)
+        return response
+
+    def wait_for(self, execution_id, timeout=POLL_TIMEOUT):
+        """Poll /execution/{id}/status with exponential backoff until it completes"""
+        deadline = time.monotonic() + timeout
+        delay = POLL_INITIAL
+        while True:
+            status = self._request("GET", f"/execution/{execution_id}/status")
+            state = status.get("state")
+            if state == COMPLETED:
+                return status
+            if state in FAILED_STATES:
+                raise DuneError(f"Execution {execution_id} ended in {state}: {status.get('error')}")
+            if time.monotonic() + delay > deadline:
+                raise DuneError(f"Execution {execution_id} still {state} after {timeout}s")
+            time.sleep(delay)
+            delay = min(delay * POLL_FACTOR, POLL_MAX)
+
+    def execute(self, query_id, params=None, timeout=POLL_TIMEOUT):
+        """Execute a query (unless fresh results are cached) and return its results response"""
+        cached = self._cache_get("execution", query_id, params)
+        if cached is not None:
+            return cached
+        body = {"query_parameters": params} if params else {}
+        execution_id = self._request("POST", f"/query/{query_id}/execute", json=body)["execution_id"]
+        self.wait_for(execution_id, timeout)
+        response = self._request("GET", f"/execution/{execution_id}/results")
+        self._cache_put("execution", query_id, params, response)
+        return response
+
+    def iter_result_rows(self, query_id, columns=None, params=None, page_size=RESULT_PAGE_SIZE):
+        """
+        Stream the latest result rows of a saved query. Pages are requested with
+        limit/offset and only the given columns; each page body is decoded one
+        row at a time, so memory stays at one row plus one network chunk.
+        """
+        offset = 0
+        while True:
+            query = {f"params.{k}": v for k, v in (params or {}).items()}
+            query.update({"limit": page_size, "offset": offset})
+            if columns:
+                query["columns"] = ",".join(columns)
+            response = self._send("GET", f"/query/{query_id}/results", params=query, stream=True)
+            count = 0
+            with response:
+                for row in iter_array_items(counted(response.iter_content(STREAM_CHUNK)), "rows"):
+                    count += 1
+                    yield row
+            if count < page_size:
+                return
+            offset += page_size
+
+    def latest_top_rows(self, query_id, sort_key, n, columns=None, params=None):
+        """
+        The n rows with the largest sort_key (e.g. the latest n days) from a
+        query's latest results, kept in a bounded heap while the rows stream
+        past instead of sorting them all. Cached like latest_results().
+        """
+        cache_key = {"params": params or {}, "top": [sort_key, n, columns]}
+        cached = self._cache_get("top", query_id, cache_key)
+        if cached is not None:
+            return cached["rows"]
+        rows = heapq.nlargest(n, self.iter_result_rows(query_id, columns, params),
+                              key=lambda row: row.get(sort_key) or "")
+        self._cache_put("top", query_id, cache_key, {"rows": rows})
+        return rows
+
+    def run_concurrently(self, jobs):
+        """Run {name: callable} on the worker pool; returns {name: result or exception}"""
+
+        def job(fn):
+            try:
+                return fn()
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs) or 1)) as pool:
+            futures = {name: pool.submit(bind(job), fn) for name, fn in jobs.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def run_many(self, queries, execute=False):
+        """
+        Run several queries concurrently. queries is a list of query IDs or
+        (query_id, params) pairs; returns {query_id: response or exception}.
+        """
+        jobs = [q if isinstance(q, tuple) else (q, None) for q in queries]
+        run = self.execute if execute else self.latest_results
+        return self.run_concurrently({
+            query_id: (lambda q=query_id, p=params: run(q, p)) for query_id, params in jobs
+        })
@@ -0,0 +1,217 @@
+"""
+Shared HTTP client layer
+Keeps one pooled keep-alive requests.Session per host, remembers which base URL
+answered last (and how fast) in a small on-disk health cache, and skips hosts
+that recently failed until their cooldown has passed.
+
+Every request made through these sessions is paced by the host's token bucket
+(shared.rate_limit) and waits out 429 / Retry-After responses before retrying.
+Requests, bytes received, throttled responses and failover retries are counted
+for the run report (shared.instrumentation).
+"""
+
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from shared.instrumentation import count
+from shared.rate_limit import bucket_for, retry_after
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(ROOT_DIR, ".cache")
+HEALTH_CACHE_PATH = os.path.join(CACHE_DIR, "endpoint_health.json")
+
+# Connections kept alive per host; sized for the largest worker pool we run
+POOL_SIZE = 32
+# (connect, read) seconds - a dead host fails on connect instead of the full read timeout
+DEFAULT_TIMEOUT = (5, 30)
+# First failure skips a host for this long, doubling per consecutive failure
+BASE_COOLDOWN = 15 * 60
+MAX_COOLDOWN = 24 * 3600
+# Weight of the newest sample in the latency moving average
+LATENCY_ALPHA = 0.3
+# Throttled responses are retried this many times, waiting Retry-After (or backoff)
+MAX_THROTTLE_RETRIES = 5
+THROTTLE_BACKOFF = 1.0
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def host_key(url):
+    """scheme://host[:port] for a URL"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class EndpointHealth:
+    """Per-base-URL health record persisted as JSON between runs"""
+
+    def __init__(self, path=HEALTH_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        with self._lock:
+            snapshot = json.dumps(self._records, indent=2, sort_keys=True)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Per-thread temp file: concurrent workers may save at the same time
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(snapshot)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save endpoint health cache: {e}")
+
+    def _record(self, base_url):
+        return self._records.setdefault(base_url, {"failures": 0})
+
+    def record_success(self, base_url, latency=None):
+        with self._lock:
+            record = self._record(base_url)
+            record["failures"] = 0
+            record["last_success"] = time.time()
+            record.pop("skip_until", None)
+            if latency is not None:
+                previous = record.get("latency")
+                record["latency"] = latency if previous is None else (
+                    LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * previous)
+
+    def record_failure(self, base_url, error=None):
+        with self._lock:
+            record = self._record(base_url)
+            record["failures"] += 1
+            record["last_failure"] = time.time()
+            record["last_error"] = str(error)[:200] if error else None
+            cooldown = min(BASE_COOLDOWN * 2 ** (record["failures"] - 1), MAX_COOLDOWN)
+            record["skip_until"] = time.time() + cooldown
+
+    def is_available(self, base_url):
+        """False while the host's circuit is open (failed and still cooling down)"""
+        with self._lock:
+            record = self._records.get(base_url)
+            return not record or record.get("skip_until", 0) <= time.time()
+
+    def order(self, endpoints):
+        """
+        Endpoints worth trying, best first: the most recently healthy one, then
+        other available ones by latency, then untried ones in the given order.
+        Hosts with an open circuit are left out unless nothing else is left.
+        """
+        available = [url for url in endpoints if self.is_available(url)]
+        if not available:
+            return list(endpoints)
+
+        def rank(item):
+            position, url = item
+            record = self._records.get(url) or {}
+            if "last_success" not in record:
+                return (1, 0, position)
+            return (0, -record["last_success"], record.get("latency") or 0)
+
+        return [url for _, url in sorted(enumerate(available), key=rank)]
+
+
+health = EndpointHealth()
+
+
+def is_throttled(response):
+    """429, or 503 carrying Retry-After (an overloaded host asking callers to back off)"""
+    return response.status_code == 429 or (
+        response.status_code == 503 and "Retry-After" in response.headers)
+
+
+class RateLimitedSession(requests.Session):
+    """
+    Session that takes a token from the host's bucket before every request and
+    retries throttled responses after Retry-After, pausing the whole host.
+    Pass acquire=False when the caller already took the token (e.g. with
+    rate_limit.acquire_async() from a coroutine).
+    """
+
+    def request(self, method, url, *args, acquire=True, **kwargs):
+        bucket = bucket_for(url)
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            if acquire or attempt:
+                bucket.acquire()
+            response = super().request(method, url, *args, **kwargs)
+            count("requests")
+            if not kwargs.get("stream"):
+                count("bytes", len(response.content))
+            if not is_throttled(response) or attempt == MAX_THROTTLE_RETRIES:
+                return response
+            count("throttled")
+            delay = retry_after(response)
+            if delay is None:
+                delay = THROTTLE_BACKOFF * 2 ** attempt
+            print(f"{host_key(url)} throttled ({response.status_code}), pausing {delay:.1f}s")
+            response.close()
+            bucket.block_for(delay)
+
+
+def get_session(url):
+    """Pooled keep-alive session for the host of url, created on first use"""
+    key = host_key(url)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = RateLimitedSession()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount(key, adapter)
+            session.headers.update({"Accept": "application/json"})
+            _sessions[key] = session
+        return session
+
+
+def call_with_failover(endpoints, operation):
+    """
+    Run operation(session, base_url) against the healthiest endpoint, moving on
+    to the next one if it raises. Returns (base_url, result); raises the last
+    error if every endpoint failed.
+    """
+    last_error = None
+    try:
+        for attempt, base_url in enumerate(health.order(endpoints)):
+            if attempt:
+                count("retries")
+            start = time.monotonic()
+            try:
+                result = operation(get_session(base_url), base_url)
+            except Exception as e:
+                print(f"Error with {base_url}: {e}")
+                health.record_failure(base_url, e)
+                last_error = e
+                continue
+            if isinstance(result, requests.Response):
+                latency = result.elapsed.total_seconds()
+            else:
+                latency = time.monotonic() - start
+            health.record_success(base_url, latency)
+            return base_url, result
+    finally:
+        health.save()
+    raise last_error or RuntimeError("No endpoints configured")
+
+
+def request_with_failover(endpoints, path, method="GET", timeout=DEFAULT_TIMEOUT, **kwargs):
+    """Single request against the first healthy endpoint; returns (base_url, response)"""
+
+    def operation(session, base_url):
+        response = session.request(method, f"{base_url}{path}", timeout=timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    return call_with_failover(endpoints, operation)
@@ -0,0 +1,202 @@
+"""
+Pipeline run instrumentation
+A script's main() is wrapped with @instrumented("<pipeline>") and its steps with
+`with stage("<name>"):`. Each stage records its wall time, the HTTP requests,
+bytes received, retries and throttled responses it caused (counted by the
+shared HTTP layer through count()), and the process's peak RSS when it ended.
+
+When the run finishes - successfully or not - one JSON line with every stage
+and any extra metrics (set_metrics()) is appended to the run report, which is
+kept between runs like the trade history, so regressions show up as a trend.
+
+Counts go to the stages open in the calling context (a contextvars.ContextVar),
+so stages running concurrently each see only their own traffic. Work a stage
+hands to a thread pool is attributed to it when submitted through bind(),
+which carries the submitting context into the worker thread.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUN_REPORT_PATH = os.environ.get("RUN_REPORT_PATH") or os.path.join(ROOT_DIR, "history", "run_report.jsonl")
+
+# Counters kept per stage; the HTTP layer feeds them through count()
+COUNTERS = ("requests", "bytes", "retries", "throttled")
+
+
+class Counters:
+    """Process-wide, thread-safe event counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = dict.fromkeys(COUNTERS, 0)
+
+    def add(self, name, n=1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + n
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+
+# Process-wide totals (run reports), and the counters of the stages open in this context
+counters = Counters()
+_stage_counters = contextvars.ContextVar("stage_counters", default=())
+
+
+def count(name, n=1):
+    counters.add(name, n)
+    for stage_counters in _stage_counters.get():
+        stage_counters.add(name, n)
+
+
+def counted(chunks):
+    """Pass through an iterable of byte chunks (a streamed body), counting the bytes"""
+    for chunk in chunks:
+        count("bytes", len(chunk))
+        yield chunk
+
+
+def bind(fn):
+    """
+    fn bound to a copy of the current context, to hand to a thread pool: what
+    it counts in the worker thread goes to the stages open here. Bind once per
+    submission (a context can only be entered by one thread at a time).
+    """
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class RunReport:
+    """Stages and metrics of one pipeline run"""
+
+    def __init__(self, pipeline, path=RUN_REPORT_PATH):
+        self.pipeline = pipeline
+        self.path = path
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self._before = counters.snapshot()
+        self._lock = threading.Lock()
+        self.stages = []
+        self.metrics = {}
+
+    @contextmanager
+    def stage(self, name):
+        own = Counters()
+        token = _stage_counters.set(_stage_counters.get() + (own,))
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            _stage_counters.reset(token)
+            record = {"stage": name, "status": status,
+                      "seconds": round(time.perf_counter() - start, 3)}
+            record.update(own.snapshot())
+            record["peak_rss_mb"] = peak_rss_mb()
+            with self._lock:
+                self.stages.append(record)
+
+    def to_dict(self, status):
+        return {
+            "pipeline": self.pipeline,
+            "started_at": self.started_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "status": status,
+            "seconds": round(time.perf_counter() - self._start, 3),
+            **_delta(self._before, counters.snapshot()),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+            "metrics": self.metrics,
+        }
+
+    def write(self, status="ok"):
+        """Append this run as one JSON line; returns the record"""
+        record = self.to_dict(status)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+        except OSError as e:
+            print(f"Could not write run report: {e}")
+        return record
+
+
+def _delta(before, after):
+    return {name: after.get(name, 0) - before.get(name, 0) for name in COUNTERS}
+
+
+_current = None
+
+
+@contextmanager
+def stage(name):
+    """Time a step of the running pipeline (a no-op outside an instrumented run)"""
+    report = _current
+    if report is None:
+        yield
+        return
+    with report.stage(name):
+        yield
+
+
+def set_metrics(**metrics):
+    """Attach values (e.g. market counts, totals) to the running pipeline's report"""
+    if _current is not None:
+        _current.metrics.update(metrics)
+
+
+def describe(record):
+    """One log line per stage of a report record"""
+    lines = [f"Run report ({record['pipeline']}, {record['status']}): {record['seconds']:.1f}s, "
+             f"{record['requests']:,} requests, {record['bytes'] / 1e6:.1f} MB, "
+             f"peak RSS {record['peak_rss_mb']} MB"]
+    for s in record["stages"]:
+        lines.append(f"  {s['stage']:<28} {s['seconds']:>8.2f}s {s['requests']:>7,} req "
+                     f"{s['bytes'] / 1e6:>8.1f} MB {s['retries']:>4} retries {s['throttled']:>4} throttled")
+    return "\n".join(lines)
+
+
+def instrumented(pipeline, path=None):
+    """Decorator: run the function as one pipeline run and append its report when it returns or raises"""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            global _current
+            outer, _current = _current, RunReport(pipeline, path or RUN_REPORT_PATH)
+            status = "error"
+            try:
+                result = fn(*args, **kwargs)
+                status = "ok"
+                return result
+            finally:
+                report, _current = _current, outer
+                print(describe(report.write(status)))
+        return wrapper
+
+    return decorate
@@ -0,0 +1,106 @@
+"""
+Incremental JSON array reader
+Yields the items of one named array (e.g. "rows") from a JSON document arriving
+as byte chunks, decoding one item at a time instead of loading the whole body.
+"""
+
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+# Drop consumed text from the buffer once this many characters have been read
+_COMPACT_AT = 1 << 16
+
+
+class _ChunkBuffer:
+    """Text buffer fed from byte chunks, tolerant of UTF-8 sequences split across chunks"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.text = ""
+        self.pending = b""
+
+    def fill(self):
+        """Append the next chunk; False at end of input"""
+        for chunk in self.chunks:
+            if not chunk:
+                continue
+            data = self.pending + chunk
+            try:
+                self.text += data.decode("utf-8")
+                self.pending = b""
+            except UnicodeDecodeError as e:
+                self.text += data[:e.start].decode("utf-8")
+                self.pending = data[e.start:]
+            return True
+        return False
+
+    def skip(self, pos, chars):
+        """Index of the first character at or after pos not in chars (filling as needed), or None at EOF"""
+        while True:
+            while pos < len(self.text) and self.text[pos] in chars:
+                pos += 1
+            if pos < len(self.text):
+                return pos
+            if not self.fill():
+                return None
+
+    def compact(self, pos):
+        """Drop text before pos; returns the new position"""
+        self.text = self.text[pos:]
+        return 0
+
+
+def iter_array_items(chunks, key):
+    """
+    Yield each element of the first array stored under "key" in a streamed JSON
+    document. chunks is an iterable of bytes (e.g. response.iter_content()).
+    Everything outside that array is skipped without being decoded.
+    """
+    buf = _ChunkBuffer(chunks)
+    marker = f'"{key}"'
+
+    # Seek to  "key" : [
+    pos = 0
+    while True:
+        index = buf.text.find(marker, pos)
+        if index < 0:
+            pos = buf.compact(max(0, len(buf.text) - len(marker) + 1))
+            if not buf.fill():
+                return
+            continue
+        colon = buf.skip(index + len(marker), _WHITESPACE)
+        if colon is None:
+            return
+        if buf.text[colon] != ":":
+            pos = index + 1
+            continue
+        bracket = buf.skip(colon + 1, _WHITESPACE)
+        if bracket is None:
+            return
+        if buf.text[bracket] != "[":
+            pos = index + 1
+            continue
+        pos = buf.compact(bracket + 1)
+        break
+
+    # Decode one element at a time until the closing bracket
+    while True:
+        pos = buf.skip(pos, _WHITESPACE + ",")
+        if pos is None:
+            raise ValueError(f"Truncated JSON while reading {key!r}")
+        if buf.text[pos] == "]":
+            return
+        try:
+            item, end = _decoder.raw_decode(buf.text, pos)
+        except ValueError:
+            if not buf.fill():
+                raise
+            continue
+        if (end == len(buf.text) or buf.text[end] not in _WHITESPACE + ",]") and buf.fill():
+            # a number cut at a chunk boundary (e.g. "2." + "5") continues in the next chunk
+            continue
+        yield item
+        pos = end
+        if pos > _COMPACT_AT:
+            pos = buf.compact(pos)
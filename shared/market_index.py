@@ -0,0 +1,170 @@
+"""
+Persistent market lifecycle index
+One SQLite row per market per venue with its lifecycle state (open, closed,
+settled), close time and the last values it contributed to the exchange totals
+(24h volume, all-time volume, open interest, liquidity, active flag), plus the
+trimmed per-market record the venue keeps for its pages.
+
+Once a market stops trading its contribution no longer changes, so a run only
+fetches open markets and adds the frozen contributions of everything else from
+here. A full fetch (closed and settled markets too) runs on a much slower
+schedule to pick up settlements and drop markets the venue no longer lists.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from shared.snapshot import NO_TIME, STATUSES
+from shared.trade_store import HISTORY_DIR
+
+MARKET_INDEX_DB = os.path.join(HISTORY_DIR, "market_index.db")
+
+OPEN, CLOSED, SETTLED = "open", "closed", "settled"
+# How often a venue's closed/settled markets are fetched again
+FULL_REFRESH_INTERVAL = 7 * 24 * 3600
+# A frozen market's 24h volume still counts this long after it closed
+DAY = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS markets (
+    venue           TEXT NOT NULL,
+    market_id       TEXT NOT NULL,
+    lifecycle       TEXT NOT NULL,
+    close_ts        INTEGER,
+    volume_24h      REAL NOT NULL,
+    volume_all_time REAL NOT NULL,
+    open_interest   REAL NOT NULL,
+    liquidity       REAL NOT NULL,
+    active          INTEGER NOT NULL,
+    record          TEXT,
+    updated_at      INTEGER NOT NULL,
+    PRIMARY KEY (venue, market_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS markets_lifecycle ON markets (venue, lifecycle, close_ts);
+CREATE TABLE IF NOT EXISTS full_refreshes (
+    venue        TEXT PRIMARY KEY,
+    refreshed_at INTEGER NOT NULL
+);
+"""
+
+
+# Snapshot status -> lifecycle (every other status is open); markets not open yet
+# carry no volume or open interest and are not indexed
+STATUS_LIFECYCLES = {"closed": CLOSED, "determined": SETTLED, "finalized": SETTLED, "settled": SETTLED}
+UNOPENED_STATUSES = ("initialized", "unopened")
+
+
+def snapshot_entries(snapshot, records=None):
+    """
+    Index entries for the markets of a MarketSnapshot (shared.snapshot);
+    records optionally holds one JSON-serializable dict per row to keep with it
+    """
+    lifecycles = np.array([STATUS_LIFECYCLES.get(name, OPEN) for name in STATUSES], dtype=object)
+    keep = ~snapshot.has_status(UNOPENED_STATUSES)
+    close_ts = snapshot.close_ts.astype(object)
+    close_ts[snapshot.close_ts == NO_TIME] = None
+    if records is None:
+        encoded = [None] * len(snapshot)
+    else:
+        encoded = [json.dumps(r, separators=(",", ":")) for r in records]
+    columns = snapshot.columns
+    rows = zip(snapshot.tickers.tolist(), lifecycles[snapshot.status].tolist(), close_ts.tolist(),
+               columns["volume_24h"].tolist(), columns["volume_all_time"].tolist(),
+               columns["open_interest"].tolist(), columns["liquidity"].tolist(),
+               snapshot.active.astype(int).tolist(), encoded, keep.tolist())
+    return [row[:-1] for row in rows if row[-1]]
+
+
+class MarketIndex:
+    """Lifecycle state and frozen contributions of every known market"""
+
+    def __init__(self, path=MARKET_INDEX_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def full_refresh_due(self, venue, interval=FULL_REFRESH_INTERVAL, now=None):
+        """True if the venue's closed/settled markets have not been fetched for `interval` seconds"""
+        row = self.conn.execute("SELECT refreshed_at FROM full_refreshes WHERE venue = ?",
+                                (venue,)).fetchone()
+        return not row or row[0] <= (now or time.time()) - interval
+
+    def record(self, venue, entries, full=False, now=None):
+        """
+        Upsert entries (see snapshot_entries()) seen by this run. After a full fetch the
+        venue's markets missing from it are dropped and the refresh time is
+        stamped. Returns the number of markets dropped.
+        """
+        now = int(now or time.time())
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO markets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(venue, *e, now) for e in entries])
+            if not full:
+                return 0
+            dropped = self.conn.execute(
+                "DELETE FROM markets WHERE venue = ? AND updated_at < ?", (venue, now)).rowcount
+            self.conn.execute("INSERT OR REPLACE INTO full_refreshes VALUES (?, ?)", (venue, now))
+        return dropped
+
+    def retire_missing(self, venue, seen_ids, min_close_ts=None, now=None):
+        """
+        Mark open markets that an open-only fetch did not return as closed: they
+        stopped trading since the last run. Their close time is capped at now
+        and their last values become frozen contributions. Markets closing
+        before min_close_ts (outside the fetch window) are left alone.
+        Returns the number of markets retired.
+        """
+        now = int(now or time.time())
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (market_id TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM seen")
+            self.conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)",
+                                  ((str(market_id),) for market_id in seen_ids))
+            retired = self.conn.execute(
+                "UPDATE markets SET lifecycle = ?, active = 0, updated_at = ?, "
+                "close_ts = MIN(COALESCE(close_ts, ?), ?), "
+                "record = CASE WHEN record IS NULL THEN NULL ELSE json_set(record, '$.status', ?) END "
+                "WHERE venue = ? AND lifecycle = ? AND COALESCE(close_ts, ?) >= ? "
+                "AND market_id NOT IN (SELECT market_id FROM seen)",
+                (CLOSED, now, now, now, CLOSED, venue, OPEN, now, min_close_ts or 0)).rowcount
+        return retired
+
+    def frozen_totals(self, venue, min_close_ts=None, now=None):
+        """
+        Summed contributions of the venue's closed and settled markets closing at
+        or after min_close_ts. 24h volume only counts for markets that closed
+        (or, without a close time, were last seen) within the last day.
+        """
+        now = int(now or time.time())
+        row = self.conn.execute(
+            "SELECT COUNT(*), "
+            "COALESCE(SUM(CASE WHEN COALESCE(close_ts, updated_at) >= ? THEN volume_24h ELSE 0 END), 0), "
+            "COALESCE(SUM(volume_all_time), 0), COALESCE(SUM(open_interest), 0), "
+            "COALESCE(SUM(liquidity), 0), COALESCE(SUM(active), 0) "
+            "FROM markets WHERE venue = ? AND lifecycle != ? AND COALESCE(close_ts, 0) >= ?",
+            (now - DAY, venue, OPEN, min_close_ts or 0)).fetchone()
+        return dict(zip(("markets", "volume_24h", "volume_all_time", "open_interest",
+                         "liquidity", "active_markets"), row))
+
+    def frozen_records(self, venue, min_close_ts=None):
+        """Per-market records of the venue's closed and settled markets closing at or after min_close_ts"""
+        rows = self.conn.execute(
+            "SELECT record FROM markets WHERE venue = ? AND lifecycle != ? "
+            "AND COALESCE(close_ts, 0) >= ? AND record IS NOT NULL",
+            (venue, OPEN, min_close_ts or 0))
+        return [json.loads(row[0]) for row in rows]
+
+    def counts(self, venue):
+        """{lifecycle: number of markets} for a venue"""
+        return dict(self.conn.execute(
+            "SELECT lifecycle, COUNT(*) FROM markets WHERE venue = ? GROUP BY lifecycle", (venue,)))
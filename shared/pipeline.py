@@ -0,0 +1,264 @@
+"""
+Stage DAG runner
+A pipeline is a set of named stages, each a function of its dependencies'
+outputs. Stages whose dependencies are done are started on a thread pool, so
+independent ones (e.g. the Kalshi, Gamma and Dune fetches) run concurrently,
+and outputs are handed to dependents in memory instead of through files.
+
+Every stage with inputs - dependency outputs and/or files such as page
+templates - gets a content hash of those inputs. The hash of the last
+successful run's inputs and output is kept in history/pipeline_state.json;
+when a stage's inputs hash the same as last time it is skipped, its output
+restored from what it last wrote (if a dependent needs it) and its stored
+output hash passed on, so an unchanged fetch skips everything downstream.
+Stages without inputs (the API fetches) always run.
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from shared import instrumentation
+from shared.renderer import file_hash
+from shared.trade_store import HISTORY_DIR
+
+PIPELINE_STATE_PATH = os.path.join(HISTORY_DIR, "pipeline_state.json")
+MAX_WORKERS = 8
+
+RAN, SKIPPED, FAILED, BLOCKED = "ran", "skipped", "failed", "blocked"
+
+
+def _feed(h, value):
+    if isinstance(value, np.ndarray):
+        h.update(f"ndarray {value.dtype.str} {value.shape}".encode())
+        if value.dtype == object:
+            h.update(json.dumps(value.tolist(), default=str).encode("utf-8"))
+        else:
+            h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        h.update(b"{")
+        for key in sorted(value, key=str):
+            _feed(h, str(key))
+            _feed(h, value[key])
+        h.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        h.update(b"[")
+        for item in value:
+            _feed(h, item)
+        h.update(b"]")
+    elif hasattr(value, "__dict__"):
+        _feed(h, vars(value))
+    else:
+        h.update(json.dumps(value, default=str).encode("utf-8"))
+        h.update(b",")
+
+
+def value_hash(value):
+    """
+    sha256 of a stage output: JSON scalars, dicts, lists and tuples of them,
+    NumPy arrays (by dtype, shape and bytes) and objects holding those in their
+    attributes (e.g. a MarketSnapshot)
+    """
+    h = hashlib.sha256()
+    _feed(h, value)
+    return h.hexdigest()
+
+
+class Stage:
+    """
+    One step of the DAG. run(inputs) gets {dependency name: output} and returns
+    this stage's output. files are extra inputs hashed by content. restore()
+    returns the output of the last run (e.g. re-read from the file the stage
+    writes) for when the stage is skipped; without it a skipped stage passes
+    on None. fingerprint(output) picks the part of the output dependents
+    care about (default: all of it), e.g. leaving out a per-run id.
+    """
+
+    def __init__(self, name, run, deps=(), files=(), restore=None, fingerprint=None):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.files = tuple(files)
+        self.restore = restore
+        self.fingerprint = fingerprint or (lambda output: output)
+
+
+class ChangeGate:
+    """
+    Fingerprint for a long-running pipeline (run_pipeline.py --daemon).
+    values(output) picks the numbers dependents show, e.g. the headline
+    totals; the gate passes them on only when one moved by more than
+    threshold (relative to the value last passed on) or max_age seconds went
+    by, and otherwise repeats the last values - so the dependents' inputs hash
+    the same and they are skipped until the change is worth showing. Both
+    are checked whenever the gated stage runs, i.e. when its own inputs changed.
+    """
+
+    def __init__(self, values, threshold, max_age=None):
+        self.values = values
+        self.threshold = threshold
+        self.max_age = max_age
+        self.published = None
+        self.published_at = 0.0
+
+    def crossed(self, current):
+        if self.published is None or self.published.keys() != current.keys():
+            return True
+        if self.max_age is not None and time.monotonic() - self.published_at >= self.max_age:
+            return True
+        for name, value in current.items():
+            old = self.published[name]
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                if value != old:
+                    return True
+            elif abs(value - old) > self.threshold * abs(old):
+                return True
+        return False
+
+    def __call__(self, output):
+        current = self.values(output)
+        if self.crossed(current):
+            self.published, self.published_at = current, time.monotonic()
+        return self.published
+
+
+class StageResult:
+    def __init__(self, status, output=None, output_hash=None, seconds=0.0, error=None):
+        self.status = status
+        self.output = output
+        self.output_hash = output_hash
+        self.seconds = seconds
+        self.error = error
+
+
+class Pipeline:
+    """Stages run in dependency order, concurrently where possible, skipped when their inputs are unchanged"""
+
+    def __init__(self, stages, state_path=PIPELINE_STATE_PATH, max_workers=MAX_WORKERS):
+        self.stages = {s.name: s for s in stages}
+        self.state_path = state_path
+        self.max_workers = max_workers
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline has a dependency cycle through {name}")
+            if name not in self.stages:
+                raise ValueError(f"Unknown pipeline stage {name}")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def upstream(self, targets):
+        """The targets and every stage they depend on, in run order"""
+        needed = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown pipeline stage {name}")
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.stages[name].deps)
+        return [name for name in self.order if name in needed]
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def input_hash(self, stage, results):
+        """Content hash of a stage's inputs, or None for a stage without inputs (always run)"""
+        if not stage.deps and not stage.files:
+            return None
+        return value_hash({
+            "deps": {dep: results[dep].output_hash for dep in stage.deps},
+            "files": {path: file_hash(path) for path in stage.files},
+        })
+
+    def _execute(self, stage, inputs):
+        start = time.perf_counter()
+        with instrumentation.stage(stage.name):
+            output = stage.run(inputs)
+        return output, time.perf_counter() - start
+
+    def run(self, targets=None, force=False):
+        """
+        Run the targets (default: every stage) and what they depend on; force
+        ignores the stored input hashes. Returns {stage name: StageResult}.
+        A failed stage blocks its dependents but not unrelated stages.
+        """
+        state = self._load_state()
+        pending = self.upstream(targets) if targets else list(self.order)
+        results, running = {}, {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if any(dep not in results for dep in stage.deps):
+                        continue
+                    pending.remove(name)
+                    if any(results[dep].status in (FAILED, BLOCKED) for dep in stage.deps):
+                        results[name] = StageResult(BLOCKED)
+                        continue
+                    key = self.input_hash(stage, results)
+                    previous = state.get(name, {})
+                    if key is not None and not force and previous.get("inputs") == key:
+                        output = stage.restore() if stage.restore else None
+                        if stage.restore is None or output is not None:
+                            results[name] = StageResult(SKIPPED, output, previous.get("output"))
+                            continue
+                    inputs = {dep: results[dep].output for dep in stage.deps}
+                    running[pool.submit(instrumentation.bind(self._execute), stage, inputs)] = (name, key)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, key = running.pop(future)
+                    try:
+                        output, seconds = future.result()
+                    except Exception as e:
+                        print(f"Stage {name} failed: {e}")
+                        results[name] = StageResult(FAILED, error=e)
+                        continue
+                    output_hash = value_hash(self.stages[name].fingerprint(output))
+                    results[name] = StageResult(RAN, output, output_hash, seconds)
+                    state[name] = {"inputs": key, "output": output_hash}
+                    self._save_state(state)
+        return results
+
+
+def describe(results):
+    """One log line per stage: status and wall time"""
+    lines = ["Pipeline stages:"]
+    for name, result in results.items():
+        detail = f"{result.seconds:.2f}s" if result.status == RAN else ""
+        if result.error is not None:
+            detail = str(result.error)
+        lines.append(f"  {name:<28} {result.status:<8} {detail}".rstrip())
+    return "\n".join(lines)
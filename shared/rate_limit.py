@@ -0,0 +1,119 @@
+"""
+Per-host token-bucket rate limiting
+Every host gets one bucket shared by all threads and coroutines in the process.
+A caller takes a token before each request; when the bucket is empty the token
+is reserved "on credit" and the caller sleeps until it is due, so waiting
+callers leave in arrival order at exactly the configured rate. acquire() blocks
+the calling thread, acquire_async() only suspends the coroutine.
+
+A 429 (or 503 with Retry-After) pushes the whole host back by the server's
+Retry-After, so every worker pauses instead of each discovering the limit on
+its own.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# (requests per second, burst) per hostname, below each API's published limit
+HOST_RATES = {
+    "api.elections.kalshi.com": (20, 20),
+    "trading-api.kalshi.com": (20, 20),
+    "api.kalshi.com": (20, 20),
+    "gamma-api.polymarket.com": (12, 25),
+    "api.dune.com": (0.6, 5),
+}
+DEFAULT_RATE = (20, 20)
+# Optional overrides, e.g. HTTP_RATE_LIMITS="api.dune.com=1:10,127.0.0.1=1000:1000"
+RATE_LIMITS_ENV = "HTTP_RATE_LIMITS"
+# Longest Retry-After honoured; a larger value is treated as this many seconds
+MAX_RETRY_AFTER = 120
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Thread-safe token bucket; tokens may go negative to queue waiting callers"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """Take tokens now and return the seconds the caller must wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def acquire(self, tokens=1):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens=1):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def block_for(self, seconds):
+        """Hold every caller back for at least `seconds` (e.g. after a 429)"""
+        with self._lock:
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+def _parse_overrides(value):
+    rates = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        host, _, spec = item.partition("=")
+        rate, _, burst = spec.partition(":")
+        rates[host.strip()] = (float(rate), float(burst or rate))
+    return rates
+
+
+def rate_for(host):
+    """(rate, burst) for a hostname: environment override, known API, or the default"""
+    overrides = _parse_overrides(os.environ.get(RATE_LIMITS_ENV))
+    return overrides.get(host) or HOST_RATES.get(host) or DEFAULT_RATE
+
+
+def bucket_for(url):
+    """The shared bucket of url's host, created on first use"""
+    host = urlsplit(url).hostname or url
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(*rate_for(host))
+        return bucket
+
+
+def acquire(url, tokens=1):
+    bucket_for(url).acquire(tokens)
+
+
+async def acquire_async(url, tokens=1):
+    await bucket_for(url).acquire_async(tokens)
+
+
+def retry_after(response):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), capped; None if absent"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
@@ -0,0 +1,76 @@
+"""
+Dashboard page renderer
+A page template is split once into static byte segments around {{ name }}
+placeholders; rendering only encodes the per-run values and joins them with the
+cached segments. write_if_changed() compares content hashes with the file on
+disk and skips the write (and the resulting git commit) when nothing changed;
+parts that change every run, like a page's "Updated: ..." timestamp, can be
+left out of the comparison.
+"""
+
+import hashlib
+import os
+import re
+from functools import lru_cache
+
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+# A page's "Last Updated: ..." / "Updated: ..." text, up to the closing tag
+LAST_UPDATED = re.compile(rb"Updated: [^<]*")
+
+
+class Template:
+    """Precompiled page shell: static byte segments interleaved with placeholder names"""
+
+    def __init__(self, source):
+        parts = PLACEHOLDER.split(source)
+        self.segments = [part.encode("utf-8") for part in parts[0::2]]
+        self.names = parts[1::2]
+
+    def render(self, **values):
+        """Page bytes with every placeholder replaced by str(values[name])"""
+        out = [self.segments[0]]
+        for name, segment in zip(self.names, self.segments[1:]):
+            value = values[name]
+            out.append(value if isinstance(value, bytes) else str(value).encode("utf-8"))
+            out.append(segment)
+        return b"".join(out)
+
+
+@lru_cache(maxsize=None)
+def load_template(path):
+    """Read and compile a template file once per process"""
+    with open(path, "r", encoding="utf-8") as f:
+        return Template(f.read())
+
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_hash(path, volatile=None):
+    """sha256 of a file's bytes (without the volatile regex's matches), or None if it does not exist"""
+    try:
+        with open(path, "rb") as f:
+            return content_hash(_comparable(f.read(), volatile))
+    except FileNotFoundError:
+        return None
+
+
+def _comparable(content, volatile):
+    return content if volatile is None else volatile.sub(b"", content)
+
+
+def write_if_changed(path, content, volatile=None):
+    """
+    Write content (bytes) to path unless the file already holds the same bytes;
+    True if written. Matches of the volatile regex (e.g. LAST_UPDATED) are left
+    out of the comparison, so a page differing only there keeps its old copy.
+    """
+    if file_hash(path, volatile) == content_hash(_comparable(content, volatile)):
+        return False
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return True
@@ -0,0 +1,208 @@
+"""
+On-disk HTTP response cache
+GET responses are stored zlib-compressed under .cache/http, keyed by URL and
+query parameters, with an SQLite index holding each entry's ETag /
+Last-Modified, expiry, size and last access time.
+
+A lookup serves a fresh entry without touching the network; a stale entry with
+validators is revalidated with a conditional GET (a 304 costs headers only);
+otherwise the page is fetched again. Freshness comes from the caller's TTL -
+which may depend on the page (e.g. long for closed markets) - or the server's
+Cache-Control max-age. Least recently used entries are evicted once the cache
+grows past its size budget.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlencode
+
+from shared.http_client import CACHE_DIR, DEFAULT_TIMEOUT
+
+HTTP_CACHE_DIR = os.path.join(CACHE_DIR, "http")
+# Compressed bytes kept on disk before least recently used entries are evicted
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key           TEXT PRIMARY KEY,
+    url           TEXT NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    expires_at    REAL NOT NULL,
+    accessed_at   REAL NOT NULL,
+    size          INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+"""
+
+
+class CachedResponse:
+    """Minimal response: status, body bytes, headers and where it came from"""
+
+    def __init__(self, status_code, content, headers, source):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.source = source  # "cache", "revalidated" or "network"
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def cache_key(url, params=None):
+    query = urlencode(sorted((params or {}).items()))
+    return hashlib.sha256(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Conditional-GET cache with TTL fallback and LRU size eviction"""
+
+    def __init__(self, directory=HTTP_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self.stats = {"cache": 0, "revalidated": 0, "network": 0, "bytes_fetched": 0}
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.directory, "index.db"),
+                                         check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _body_path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".z")
+
+    def _lookup(self, key):
+        with self._lock:
+            row = self._db().execute(
+                "SELECT etag, last_modified, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        try:
+            with open(self._body_path(key), "rb") as f:
+                body = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            return None
+        return {"etag": row[0], "last_modified": row[1], "expires_at": row[2], "body": body}
+
+    def _store(self, key, url, body, etag, last_modified, expires_at):
+        compressed = zlib.compress(body, 6)
+        path = self._body_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+        with self._lock, self._db() as conn:
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (key, url, etag, last_modified, expires_at, time.time(), len(compressed)))
+
+    def _touch(self, key, expires_at=None):
+        with self._lock, self._db() as conn:
+            if expires_at is None:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            else:
+                conn.execute("UPDATE entries SET accessed_at = ?, expires_at = ? WHERE key = ?",
+                             (time.time(), expires_at, key))
+
+    def is_fresh(self, url, params=None):
+        """True if a GET of url would be served from the cache without a request"""
+        with self._lock:
+            row = self._db().execute("SELECT expires_at FROM entries WHERE key = ?",
+                                     (cache_key(url, params),)).fetchone()
+        return bool(row) and row[0] > time.time()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits max_bytes; returns entries removed"""
+        with self._lock, self._db() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            victims = []
+            for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                if total <= self.max_bytes:
+                    break
+                victims.append(key)
+                total -= size
+            conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in victims])
+        for key in victims:
+            try:
+                os.remove(self._body_path(key))
+            except FileNotFoundError:
+                pass
+        return len(victims)
+
+    def get(self, session, url, params=None, ttl=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+        """
+        GET url through the cache and return a CachedResponse (raises on HTTP errors).
+
+        ttl is the freshness in seconds, or a callable(parsed JSON body) -> seconds,
+        so a page can be kept longer when everything on it is final. Without a
+        ttl the server's Cache-Control max-age is used, else entries are always
+        revalidated (and only kept when the server sent validators).
+        """
+        key = cache_key(url, params)
+        entry = self._lookup(key)
+        now = time.time()
+        if entry and entry["expires_at"] > now:
+            self._touch(key)
+            self._count("cache")
+            return CachedResponse(200, entry["body"], {}, "cache")
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        response = session.get(url, params=params, headers=headers, timeout=timeout, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self._touch(key, now + self._ttl(ttl, response, entry["body"]))
+            self._count("revalidated")
+            return CachedResponse(200, entry["body"], response.headers, "revalidated")
+        response.raise_for_status()
+
+        body = response.content
+        self._count("network")
+        self._count("bytes_fetched", len(body))
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        fresh_for = self._ttl(ttl, response, body)
+        if fresh_for > 0 or etag or last_modified:
+            self._store(key, url, body, etag, last_modified, now + fresh_for)
+        return CachedResponse(response.status_code, body, response.headers, "network")
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    @staticmethod
+    def _ttl(ttl, response, body):
+        if callable(ttl):
+            try:
+                return ttl(json.loads(body))
+            except ValueError:
+                return 0
+        if ttl is not None:
+            return ttl
+        match = MAX_AGE.search(response.headers.get("Cache-Control", ""))
+        return int(match.group(1)) if match else 0
+
+    def summary(self):
+        s = self.stats
+        return (f"HTTP cache: {s['cache']} served from cache, {s['revalidated']} revalidated (304), "
+                f"{s['network']} fetched ({s['bytes_fetched'] / 1e6:.1f} MB)")
+
+
+response_cache = ResponseCache()
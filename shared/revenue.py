@@ -0,0 +1,110 @@
+"""
+HOOD prediction-market revenue scenarios
+Revenue is contracts traded x HOOD's fee per contract, where HOOD's fee is the
+exchange fee per contract x HOOD's share of it ($0.02 = $0.01 HOOD + $0.01
+Kalshi by default). Every scenario - fee rate x HOOD share x volume growth
+path - is evaluated at once by broadcasting the rate and growth axes against
+the volume base, so the whole grid is one NumPy expression.
+
+The dashboard reads the precomputed tables (revenue_tables()) instead of
+recomputing them in the browser: the revenue cards per HOOD fee rate on the
+rate input's grid, and annualized revenue over exchange fee x HOOD share x
+growth path for the sensitivity table.
+"""
+
+import numpy as np
+
+# HOOD fee rates ($/contract) the dashboard's rate input can take: 0.001 ... 0.100
+HOOD_RATES = np.round(np.arange(1, 101) * 0.001, 3)
+# Sensitivity axes: exchange fee per contract, HOOD's share of it, and annual volume growth
+FEE_RATES = np.array([0.01, 0.015, 0.02, 0.03])
+HOOD_SHARES = np.array([0.25, 0.5, 0.75, 1.0])
+GROWTH_RATES = {"-50%": -0.5, "-25%": -0.25, "Flat": 0.0, "+25%": 0.25, "+50%": 0.5, "+100%": 1.0}
+# The current fee split
+DEFAULT_FEE_RATE = 0.02
+DEFAULT_HOOD_SHARE = 0.5
+# Weeks per month of the monthly estimate, and months projected for the annual figure
+WEEKS_PER_MONTH = 4.3
+MONTHS = 12
+# Trailing daily history the trend growth path is fitted to (needs MIN_TREND_DAYS)
+TREND_DAYS = 90
+MIN_TREND_DAYS = 28
+
+
+def hood_rates(fee_rates, hood_shares):
+    """HOOD's fee per contract for every (exchange fee, HOOD share) pair, shape (fees, shares)"""
+    return np.asarray(fee_rates, dtype=np.float64)[:, None] * np.asarray(hood_shares, dtype=np.float64)[None, :]
+
+
+def growth_factors(growth_rates, months=MONTHS):
+    """
+    Sum over the next `months` months of each growth path's volume relative to
+    today (month m runs at (1 + annual rate) ** (m / 12)); a flat path gives months
+    """
+    rates = np.asarray(growth_rates, dtype=np.float64)
+    return ((1 + rates[:, None]) ** (np.arange(months) / 12)[None, :]).sum(axis=1)
+
+
+def trend_growth(daily_volume, days=TREND_DAYS):
+    """
+    Annualized growth of daily volume from a log-linear fit over the last
+    `days` days with volume, or None with fewer than MIN_TREND_DAYS of them
+    """
+    volume = np.asarray(daily_volume, dtype=np.float64)[-days:]
+    x = np.flatnonzero(volume > 0)
+    if len(x) < MIN_TREND_DAYS:
+        return None
+    slope = np.polyfit(x, np.log(volume[x]), 1)[0]
+    return float(np.expm1(slope * 365))
+
+
+def scenario_grid(monthly_volume, fee_rates, hood_shares, growth_rates, months=MONTHS):
+    """Revenue over the next `months` months for every fee x share x growth scenario, shape (fees, shares, growth)"""
+    volume = monthly_volume * growth_factors(growth_rates, months)
+    return hood_rates(fee_rates, hood_shares)[:, :, None] * volume[None, None, :]
+
+
+def revenue_tables(volume_24h, latest_week_volume, daily_volume=None):
+    """
+    The dashboard's revenue tables from the 24h volume, the latest ISO week's
+    volume and the daily history (contracts, oldest first; adds a fitted
+    "Trend" growth path). Amounts are $M, rounded for display:
+
+      hood_rates                      the rate input's grid
+      daily, weekly, monthly, annual  revenue at each of those rates (flat volume)
+      fee_rates, hood_shares, growth  sensitivity axes (growth: [{label, rate}])
+      current                         today's split: {fee_rate, hood_share}
+      annual_grid                     [fee][share][growth] annualized revenue
+    """
+    growth = dict(GROWTH_RATES)
+    if daily_volume is not None:
+        trend = trend_growth(daily_volume)
+        if trend is not None:
+            growth["Trend"] = round(trend, 4)
+    monthly_volume = latest_week_volume * WEEKS_PER_MONTH
+    # Cards: the rate input's grid as one exchange fee with HOOD taking all of it, flat volume
+    cards = np.stack([
+        HOOD_RATES * volume_24h,
+        HOOD_RATES * latest_week_volume,
+        HOOD_RATES * monthly_volume,
+        scenario_grid(monthly_volume, HOOD_RATES, [1.0], [0.0])[:, 0, 0],
+    ]) / 1e6
+    grid = scenario_grid(monthly_volume, FEE_RATES, HOOD_SHARES, list(growth.values())) / 1e6
+    daily, weekly, monthly, annual = np.round(cards, 4).tolist()
+    return {
+        "hood_rates": HOOD_RATES.tolist(),
+        "daily": daily,
+        "weekly": weekly,
+        "monthly": monthly,
+        "annual": annual,
+        "fee_rates": FEE_RATES.tolist(),
+        "hood_shares": HOOD_SHARES.tolist(),
+        "growth": [{"label": label, "rate": rate} for label, rate in growth.items()],
+        "current": {"fee_rate": DEFAULT_FEE_RATE, "hood_share": DEFAULT_HOOD_SHARE},
+        "annual_grid": np.round(grid, 2).tolist(),
+    }
+
+
+def estimated_daily_revenue(volume_24h, fee_rate=DEFAULT_FEE_RATE):
+    """Fee revenue ($) from the last 24h of volume at the full exchange fee"""
+    return round(volume_24h * fee_rate, 2)
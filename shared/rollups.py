@@ -0,0 +1,69 @@
+"""
+Vectorized volume rollups
+Turns per-trade or per-day (timestamp, volume) arrays into daily, ISO-weekly
+(Monday start) and monthly buckets with NumPy datetime64 arithmetic and
+np.bincount, instead of parsing and formatting a date per row.
+"""
+
+import numpy as np
+
+FREQUENCIES = ("daily", "weekly", "monthly")
+
+
+def to_days(timestamps):
+    """
+    Day numbers since 1970-01-01 (int64) from epoch seconds, datetime64 values
+    or 'YYYY-MM-DD' strings.
+    """
+    arr = np.asarray(timestamps)
+    if arr.dtype.kind in "UO":
+        return arr.astype("datetime64[D]").astype(np.int64)
+    if arr.dtype.kind == "M":
+        return arr.astype("datetime64[D]").astype(np.int64)
+    return np.floor_divide(arr.astype(np.int64), 86400)
+
+
+def _sum_by_key(keys, values):
+    """Sum values per distinct int key in one O(n) pass; returns (keys, sums) sorted"""
+    if keys.size == 0:
+        return keys, np.zeros(0, dtype=np.float64)
+    lo = keys.min()
+    offsets = keys - lo
+    sums = np.bincount(offsets, weights=values)
+    present = np.bincount(offsets) > 0
+    return np.flatnonzero(present) + lo, sums[present]
+
+
+def week_starts(days):
+    """Monday of each day's ISO week (1970-01-01 was a Thursday)"""
+    return days - (days + 3) % 7
+
+
+def month_starts(days):
+    """First day of each day's calendar month"""
+    months = days.astype("datetime64[D]").astype("datetime64[M]")
+    return months.astype("datetime64[D]").astype(np.int64)
+
+
+def rollup(timestamps, values):
+    """
+    Daily, weekly and monthly volume sums for (timestamps, values).
+
+    The raw rows are touched once, to sum them into days; weeks and months are
+    then derived from the (small) daily result. Returns
+    {"daily"|"weekly"|"monthly": (bucket_start datetime64[D] array, sums float64 array)}.
+    """
+    days, daily = _sum_by_key(to_days(timestamps), np.asarray(values, dtype=np.float64))
+    weeks, weekly = _sum_by_key(week_starts(days), daily)
+    months, monthly = _sum_by_key(month_starts(days), daily)
+    as_dates = lambda keys: keys.astype("datetime64[D]")
+    return {
+        "daily": (as_dates(days), daily),
+        "weekly": (as_dates(weeks), weekly),
+        "monthly": (as_dates(months), monthly),
+    }
+
+
+def labels(bucket_starts):
+    """'YYYY-MM-DD' strings for bucket start dates"""
+    return np.datetime_as_string(bucket_starts, unit="D").tolist()
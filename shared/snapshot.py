@@ -0,0 +1,189 @@
+"""
+Struct-of-arrays market snapshot
+A venue's market universe as typed NumPy columns instead of a list of API
+dicts: tickers and event tickers are interned (one string object each, events
+referenced by int32 id), the numeric fields are float64 columns, status is a
+uint8 code into STATUSES and close time is epoch seconds. Each API page is
+parsed once with parse_page(); totals, filters and top-N are then vector
+operations over the columns. save() / load() keep a snapshot as a compressed
+.npz for the next run to diff against (shared.snapshot_diff).
+"""
+
+import os
+
+import numpy as np
+
+# Status codes: the union of Kalshi's market statuses and the open/closed/settled
+# states derived for Polymarket; anything else is "unknown"
+STATUSES = ("unknown", "initialized", "unopened", "active", "open", "paused", "closed",
+            "determined", "finalized", "settled")
+STATUS_CODES = {name: code for code, name in enumerate(STATUSES)}
+NUMERIC_FIELDS = ("volume_24h", "volume_all_time", "open_interest", "liquidity")
+# close_ts of a market without a close time
+NO_TIME = np.iinfo(np.int64).min
+
+_EMPTY_STRINGS = np.array([], dtype=object)
+
+
+def to_float(value):
+    """API number (int, float, numeric string or missing) -> float; unparseable values count as 0"""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_times(values):
+    """ISO-8601 UTC strings (None for missing) -> int64 epoch seconds, NO_TIME where missing or invalid"""
+    values = ["NaT" if not v else v[:19] for v in values]
+    try:
+        return np.array(values, dtype="datetime64[s]").astype(np.int64)
+    except ValueError:
+        out = np.full(len(values), NO_TIME, dtype=np.int64)
+        for i, v in enumerate(values):
+            try:
+                out[i] = np.datetime64(v, "s").astype(np.int64)
+            except ValueError:
+                pass
+        return out
+
+
+def intern(values):
+    """Strings -> (unique strings as an object array, int32 id per value); None becomes ""."""
+    table = {}
+    ids = np.fromiter((table.setdefault(v or "", len(table)) for v in values),
+                      dtype=np.int32, count=len(values))
+    return np.array(list(table), dtype=object), ids
+
+
+def _field(market, source):
+    return source(market) if callable(source) else market.get(source)
+
+
+class MarketSnapshot:
+    """Columns of one market universe; every column has one row per market"""
+
+    def __init__(self, tickers, status, close_ts, columns, active=None,
+                 events=None, event_ids=None, titles=None):
+        n = len(tickers)
+        self.tickers = tickers
+        self.status = status
+        self.close_ts = close_ts
+        self.columns = {name: columns.get(name, np.zeros(n)) for name in NUMERIC_FIELDS}
+        self.active = active if active is not None else np.zeros(n, dtype=bool)
+        self.events = events if events is not None else np.array([""], dtype=object)
+        self.event_ids = event_ids if event_ids is not None else np.zeros(n, dtype=np.int32)
+        self.titles = titles if titles is not None else np.full(n, None, dtype=object)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    @classmethod
+    def empty(cls):
+        return cls(_EMPTY_STRINGS, np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int64), {})
+
+    def select(self, rows):
+        """Snapshot of the rows picked by a boolean mask or an index array"""
+        return MarketSnapshot(
+            self.tickers[rows], self.status[rows], self.close_ts[rows],
+            {name: col[rows] for name, col in self.columns.items()}, self.active[rows],
+            self.events, self.event_ids[rows], self.titles[rows])
+
+    @classmethod
+    def concat(cls, snapshots):
+        """One snapshot from several (e.g. one per page); event tables are merged"""
+        snapshots = [s for s in snapshots if len(s)]
+        if not snapshots:
+            return cls.empty()
+        if len(snapshots) == 1:
+            return snapshots[0]
+        events, event_ids = intern([e for s in snapshots for e in s.events[s.event_ids]])
+        return cls(
+            np.concatenate([s.tickers for s in snapshots]),
+            np.concatenate([s.status for s in snapshots]),
+            np.concatenate([s.close_ts for s in snapshots]),
+            {name: np.concatenate([s.columns[name] for s in snapshots]) for name in NUMERIC_FIELDS},
+            np.concatenate([s.active for s in snapshots]),
+            events, event_ids,
+            np.concatenate([s.titles for s in snapshots]))
+
+    def unique(self):
+        """Drop repeated tickers, keeping each one's first row (in row order)"""
+        _, first = np.unique(self.tickers.astype(str), return_index=True)
+        if len(first) == len(self):
+            return self
+        return self.select(np.sort(first))
+
+    def has_status(self, names):
+        """Boolean mask of rows whose status is one of names"""
+        return np.isin(self.status, [STATUS_CODES[name] for name in names])
+
+    def totals(self, mask=None):
+        """Sum of every numeric column plus the number of active markets, over mask (or all rows)"""
+        columns = self.columns if mask is None else {k: v[mask] for k, v in self.columns.items()}
+        totals = {name: float(col.sum()) for name, col in columns.items()}
+        active = self.active if mask is None else self.active[mask]
+        totals["active_markets"] = int(np.count_nonzero(active))
+        return totals
+
+    def top(self, field, n):
+        """Row indices of the n largest values of a numeric column, ties broken by ticker"""
+        return np.lexsort((self.tickers.astype(str), -self.columns[field]))[:n]
+
+    def event_totals(self, field):
+        """(event tickers, summed column per event)"""
+        return self.events, np.bincount(self.event_ids, weights=self.columns[field],
+                                        minlength=len(self.events))
+
+    def save(self, path):
+        """Write the columns to a compressed .npz (strings as fixed-width unicode, no pickling)"""
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path, tickers=self.tickers.astype(str), status=self.status, close_ts=self.close_ts,
+            active=self.active, events=self.events.astype(str), event_ids=self.event_ids,
+            titles=np.array(["" if t is None else t for t in self.titles.tolist()], dtype=str),
+            **self.columns)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            titles = f["titles"].astype(object)
+            titles[titles == ""] = None
+            return cls(f["tickers"].astype(object), f["status"], f["close_ts"],
+                       {name: f[name] for name in NUMERIC_FIELDS}, f["active"],
+                       f["events"].astype(object), f["event_ids"], titles)
+
+    def status_names(self):
+        return np.array(STATUSES, dtype=object)[self.status]
+
+    def close_times(self):
+        """close_ts as ISO-8601 UTC strings (None where missing)"""
+        missing = self.close_ts == NO_TIME
+        text = np.datetime_as_string(np.where(missing, 0, self.close_ts).astype("datetime64[s]"))
+        return [None if m else t + "Z" for m, t in zip(missing.tolist(), text.tolist())]
+
+
+def parse_page(markets, fields):
+    """
+    Parse one API page into a MarketSnapshot. fields maps snapshot fields
+    ("ticker", "event", "title", "status", "active", "close_time" and the
+    NUMERIC_FIELDS) to the market's key, or to a callable(market) for derived
+    values. Markets without a ticker are skipped.
+    """
+    markets = [m for m in markets if _field(m, fields["ticker"]) is not None]
+    n = len(markets)
+
+    def column(name):
+        return [_field(m, fields[name]) for m in markets]
+
+    tickers = np.array([str(t) for t in column("ticker")], dtype=object)
+    status = np.fromiter((STATUS_CODES.get(s, 0) for s in column("status")), dtype=np.uint8, count=n)
+    close_ts = parse_times(column("close_time")) if "close_time" in fields else np.full(n, NO_TIME)
+    numeric = {name: np.fromiter((to_float(v) for v in column(name)), dtype=np.float64, count=n)
+               for name in NUMERIC_FIELDS if name in fields}
+    active = (np.fromiter((bool(v) for v in column("active")), dtype=bool, count=n)
+              if "active" in fields else None)
+    events, event_ids = intern(column("event")) if "event" in fields else (None, None)
+    titles = np.array(column("title"), dtype=object) if "title" in fields else None
+    return MarketSnapshot(tickers, status, close_ts, numeric, active, events, event_ids, titles)
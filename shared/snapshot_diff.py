@@ -0,0 +1,204 @@
+"""
+Run-to-run market snapshot diffing
+Each run's MarketSnapshot is kept as a compressed .npz under
+history/snapshots/<venue>/ (the newest few only). diff() merge-joins the
+previous and current snapshots on their ticker-sorted columns - one
+searchsorted over both key arrays, no per-market Python loop - and returns
+only the markets that changed: new, removed, newly closed/settled, or with a
+different volume, open interest, liquidity, status, title, event or close time,
+with the per-field deltas.
+
+The delta is written as a columnar JSON file for downstream stages, which can
+then look at the markets that moved instead of the whole universe.
+"""
+
+import glob
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from shared.snapshot import NUMERIC_FIELDS, MarketSnapshot
+from shared.trade_store import HISTORY_DIR
+
+SNAPSHOT_DIR = os.path.join(HISTORY_DIR, "snapshots")
+# Snapshots kept per venue (the newest is the baseline of the next run)
+SNAPSHOTS_KEPT = 14
+# Statuses in which a market has stopped trading
+FINAL_STATUSES = ("closed", "determined", "finalized", "settled")
+# Change kinds, in the order they take precedence
+CHANGES = ("new", "removed", "closed", "changed")
+
+
+def sorted_by_ticker(snapshot):
+    """The snapshot's rows in ticker order, plus the tickers as a unicode array"""
+    keys = snapshot.tickers.astype(str)
+    order = np.argsort(keys, kind="stable")
+    return snapshot.select(order), keys[order]
+
+
+def canonical(snapshot):
+    """
+    A snapshot's content as columns in ticker order, with event tickers
+    resolved: equal for two snapshots of the same markets whatever order
+    their pages arrived in
+    """
+    s, keys = sorted_by_ticker(snapshot)
+    return {"tickers": keys, "status": s.status, "close_ts": s.close_ts, "columns": s.columns,
+            "active": s.active, "events": s.events[s.event_ids], "titles": s.titles}
+
+
+def diff(previous, current):
+    """
+    Per-market changes from previous to current snapshot. Returns a dict of
+    columns sorted by ticker: tickers, events, change (one of CHANGES),
+    status, the current value and the delta of every numeric field.
+    """
+    prev, prev_keys = sorted_by_ticker(previous)
+    cur, cur_keys = sorted_by_ticker(current)
+
+    # Merge join: position of every current ticker in the previous key array
+    pos = np.searchsorted(prev_keys, cur_keys)
+    matched = pos < len(prev_keys)
+    matched[matched] = prev_keys[pos[matched]] == cur_keys[matched]
+    m = np.flatnonzero(matched)  # current rows present before ...
+    p = pos[m]                   # ... and their previous rows
+    removed = np.ones(len(prev_keys), dtype=bool)
+    removed[p] = False
+
+    cur_events, prev_events = cur.events[cur.event_ids], prev.events[prev.event_ids]
+    differs = (cur.status[m] != prev.status[p]) | (cur.close_ts[m] != prev.close_ts[p])
+    differs |= (cur.titles[m] != prev.titles[p]) | (cur_events[m] != prev_events[p])
+    for name in NUMERIC_FIELDS:
+        differs |= cur.columns[name][m] != prev.columns[name][p]
+    closed = cur.has_status(FINAL_STATUSES)[m] & ~prev.has_status(FINAL_STATUSES)[p]
+
+    kinds = np.full(len(cur_keys), "new", dtype=object)
+    kinds[m] = np.where(closed, "closed", np.where(differs, "changed", ""))
+    keep = kinds != ""
+
+    gone = prev.select(removed)
+    columns = {
+        "tickers": np.concatenate([cur_keys[keep], prev_keys[removed]]),
+        "events": np.concatenate([cur_events[keep], gone.events[gone.event_ids]]),
+        "change": np.concatenate([kinds[keep], np.full(len(gone), "removed", dtype=object)]),
+        "status": np.concatenate([cur.status_names()[keep], gone.status_names()]),
+    }
+    for name in NUMERIC_FIELDS:
+        before = np.zeros(len(cur_keys))
+        before[m] = prev.columns[name][p]
+        columns[name] = np.concatenate([cur.columns[name][keep], np.zeros(len(gone))])
+        columns[f"{name}_delta"] = np.concatenate([(cur.columns[name] - before)[keep],
+                                                   -gone.columns[name]])
+    order = np.argsort(columns["tickers"], kind="stable")
+    return {name: col[order] for name, col in columns.items()}
+
+
+def summarize(delta):
+    """Counts per change kind and the net change of every numeric field"""
+    summary = {kind: int(np.count_nonzero(delta["change"] == kind)) for kind in CHANGES}
+    for name in NUMERIC_FIELDS:
+        summary[f"{name}_delta"] = float(delta[f"{name}_delta"].sum())
+    return summary
+
+
+def top_movers(delta, field="volume_24h", n=10):
+    """(ticker, delta) of the n markets whose field moved the most, either way"""
+    deltas = delta[f"{field}_delta"]
+    order = np.lexsort((delta["tickers"], -np.abs(deltas)))[:n]
+    return [(str(delta["tickers"][i]), float(deltas[i])) for i in order if deltas[i]]
+
+
+def describe(summary, movers, n=5):
+    """Log lines for a run's delta: change counts, net 24h volume change and the top movers"""
+    lines = [f"Markets since last run: {summary['new']:,} new, {summary['closed']:,} closed, "
+             f"{summary['removed']:,} removed, {summary['changed']:,} changed "
+             f"(24h volume {summary['volume_24h_delta']:+,.0f})"]
+    lines += [f"  {ticker}: {change:+,.0f}" for ticker, change in movers[:n]]
+    return "\n".join(lines)
+
+
+def load_delta(path):
+    """A delta file written by write_delta() as {venue, previous_run, current_run, summary, columns}, or None"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class SnapshotHistory:
+    """
+    The stored snapshots of one venue, newest last. The newest snapshot saved
+    or loaded is also kept in memory, so a long-running process (run_pipeline.py
+    --daemon) diffs against it without reading it back every run.
+    """
+
+    _latest = {}  # directory -> (run id, snapshot)
+
+    def __init__(self, venue, directory=SNAPSHOT_DIR, keep=SNAPSHOTS_KEPT):
+        self.venue = venue
+        self.directory = os.path.join(directory, venue)
+        self.keep = keep
+
+    def runs(self):
+        """Run ids (UTC timestamps, sortable) of the stored snapshots, oldest first"""
+        paths = glob.glob(os.path.join(self.directory, "*.npz"))
+        return sorted(os.path.basename(p)[:-4] for p in paths if not p.endswith(".tmp.npz"))
+
+    def path(self, run_id):
+        return os.path.join(self.directory, f"{run_id}.npz")
+
+    def latest(self):
+        """(run id, snapshot) of the newest stored snapshot, or (None, None)"""
+        runs = self.runs()
+        cached = self._latest.get(self.directory)
+        if cached and runs and cached[0] == runs[-1]:
+            return cached
+        for run_id in reversed(runs):
+            try:
+                self._latest[self.directory] = run_id, MarketSnapshot.load(self.path(run_id))
+                return self._latest[self.directory]
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Skipping unreadable snapshot {self.path(run_id)}: {e}")
+        return None, None
+
+    def save(self, snapshot, run_id=None):
+        """Store a snapshot under run_id (default: now) and prune beyond `keep`; returns the run id"""
+        run_id = run_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot.save(self.path(run_id))
+        self._latest[self.directory] = run_id, snapshot
+        for old in self.runs()[:-self.keep]:
+            os.remove(self.path(old))
+        return run_id
+
+
+def write_delta(path, venue, previous_run, current_run, delta):
+    """Write a delta as columnar JSON: run ids, summary and one array per column"""
+    payload = {
+        "venue": venue,
+        "previous_run": previous_run,
+        "current_run": current_run,
+        "summary": summarize(delta),
+        "columns": {name: col.tolist() for name, col in delta.items()},
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def record_run(venue, snapshot, delta_path):
+    """
+    Diff snapshot against the venue's previous one, write the delta file and
+    store snapshot as the new baseline. The first run diffs against an empty
+    snapshot (every market is new). Returns (run id, summary, top 24h-volume movers).
+    """
+    history = SnapshotHistory(venue)
+    previous_run, previous = history.latest()
+    delta = diff(previous if previous is not None else MarketSnapshot.empty(), snapshot)
+    current_run = history.save(snapshot)
+    write_delta(delta_path, venue, previous_run, current_run, delta)
+    return current_run, summarize(delta), top_movers(delta)
@@ -0,0 +1,357 @@
+"""
+Local append-only trade history store
+SQLite in WAL mode: one compact row per trade, keyed by the exchange trade id so
+re-ingesting an overlapping window is a no-op, plus per-stream ingestion state
+(high-water timestamp and an in-progress cursor) so runs resume where they stopped.
+Each ingest stream or backfill window also records the time span it holds every
+exchange trade of, so readers can tell complete days from partial ones.
+
+Daily and weekly volume are kept as materialized rollup tables. Every append
+marks the UTC days it touched as dirty; refresh_rollups() recomputes only those
+days and their ISO weeks, so refresh cost follows new data, not total history.
+The 1m/1h/1d/1w OHLC candle tiers (shared.candles) are refreshed the same way
+from their own dirty-day set.
+"""
+
+import math
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from shared.candles import TIERS, downsample, from_trades
+from shared.rollups import rollup, to_days, week_starts
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_DIR = os.path.join(ROOT_DIR, "history")
+KALSHI_TRADES_DB = os.path.join(HISTORY_DIR, "kalshi_trades.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id   TEXT PRIMARY KEY,
+    ticker     TEXT NOT NULL,
+    ts         INTEGER NOT NULL,
+    count      REAL NOT NULL,
+    yes_price  REAL,
+    taker_side TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trades_ts ON trades (ts);
+CREATE TABLE IF NOT EXISTS ingest_state (
+    stream         TEXT PRIMARY KEY,
+    high_water_ts  INTEGER,
+    pending_min_ts INTEGER,
+    cursor         TEXT,
+    updated_at     INTEGER
+);
+CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+    ticker     TEXT PRIMARY KEY,
+    start_ts   INTEGER NOT NULL,
+    end_ts     INTEGER NOT NULL,
+    cursor     TEXT,
+    done       INTEGER NOT NULL DEFAULT 0,
+    updated_at INTEGER
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    source   TEXT PRIMARY KEY,
+    start_ts INTEGER NOT NULL,
+    end_ts   INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dirty_days (
+    day INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    day    INTEGER PRIMARY KEY,
+    volume REAL NOT NULL,
+    trades INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS weekly_rollup (
+    week_start INTEGER PRIMARY KEY,
+    volume     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS candle_dirty_days (
+    day INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS candles (
+    tier   TEXT NOT NULL,
+    start  INTEGER NOT NULL,
+    ticker TEXT NOT NULL,
+    open   REAL,
+    high   REAL,
+    low    REAL,
+    close  REAL,
+    volume REAL NOT NULL,
+    trades INTEGER NOT NULL,
+    PRIMARY KEY (tier, start, ticker)
+) WITHOUT ROWID;
+"""
+
+# Relative tolerance when comparing incremental rollups with a full rebuild
+VERIFY_RTOL = 1e-9
+
+
+class TradeStore:
+    """Append-only trade table plus ingestion cursors in one SQLite file"""
+
+    def __init__(self, path=KALSHI_TRADES_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def append_trades(self, trades, stream=None, state=None):
+        """
+        Insert (trade_id, ticker, ts, count, yes_price, taker_side) rows, ignoring
+        ids already stored, and mark their days dirty for refresh_rollups(). If
+        stream/state are given the ingestion state is updated in the same
+        transaction, so a crash never loses or skips a page.
+        Returns the number of new rows.
+        """
+        with self.conn:
+            inserted = self._insert_trades(trades)
+            if stream is not None:
+                self._write_state(stream, **state)
+        return inserted
+
+    def _insert_trades(self, trades):
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO trades VALUES (?, ?, ?, ?, ?, ?)", trades)
+        inserted = self.conn.total_changes - before
+        if inserted:
+            days = [(day,) for day in {row[2] // 86400 for row in trades}]
+            self.conn.executemany("INSERT OR IGNORE INTO dirty_days VALUES (?)", days)
+            self.conn.executemany("INSERT OR IGNORE INTO candle_dirty_days VALUES (?)", days)
+        return inserted
+
+    def append_backfill_page(self, ticker, trades, start_ts, end_ts, cursor, done):
+        """
+        Store one page of a ticker's backfill together with its checkpoint (the
+        window, the cursor of the next page and whether the walk finished), so
+        a killed backfill resumes at the next page. Returns the number of new rows.
+        """
+        with self.conn:
+            inserted = self._insert_trades(trades)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO backfill_checkpoints VALUES (?, ?, ?, ?, ?, ?)",
+                (ticker, start_ts, end_ts, cursor, int(done), int(time.time())))
+        return inserted
+
+    def get_checkpoint(self, ticker):
+        """Backfill checkpoint dict for a ticker (empty if it was never backfilled)"""
+        row = self.conn.execute(
+            "SELECT start_ts, end_ts, cursor, done FROM backfill_checkpoints WHERE ticker = ?",
+            (ticker,)).fetchone()
+        if not row:
+            return {}
+        return {"start_ts": row[0], "end_ts": row[1], "cursor": row[2], "done": bool(row[3])}
+
+    def get_state(self, stream):
+        """Ingestion state dict for a stream (empty if never ingested)"""
+        row = self.conn.execute(
+            "SELECT high_water_ts, pending_min_ts, cursor FROM ingest_state WHERE stream = ?",
+            (stream,)).fetchone()
+        if not row:
+            return {}
+        return {"high_water_ts": row[0], "pending_min_ts": row[1], "cursor": row[2]}
+
+    def set_state(self, stream, **state):
+        with self.conn:
+            self._write_state(stream, **state)
+
+    def _write_state(self, stream, high_water_ts=None, pending_min_ts=None, cursor=None):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO ingest_state VALUES (?, ?, ?, ?, ?)",
+            (stream, high_water_ts, pending_min_ts, cursor, int(time.time())))
+
+    def extend_coverage(self, source, start_ts, end_ts):
+        """Record that source holds every trade in [start_ts, end_ts), widening its earlier span"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO coverage VALUES (?, ?, ?) ON CONFLICT (source) DO UPDATE SET "
+                "start_ts = MIN(start_ts, excluded.start_ts), end_ts = MAX(end_ts, excluded.end_ts)",
+                (source, int(start_ts), int(end_ts)))
+
+    def covered_span(self):
+        """
+        (start_ts, end_ts) of the newest contiguous span of recorded coverage,
+        or None for an empty store. Stores written before coverage was recorded
+        count as covered from their oldest trade to their newest.
+        """
+        spans = self.conn.execute("SELECT start_ts, end_ts FROM coverage ORDER BY start_ts").fetchall()
+        if not spans:
+            span = self.conn.execute("SELECT MIN(ts), MAX(ts) FROM trades").fetchone()
+            return None if span[0] is None else span
+        start, end = spans[0]
+        for span_start, span_end in spans[1:]:
+            if span_start > end:
+                start, end = span_start, span_end
+            else:
+                end = max(end, span_end)
+        return start, end
+
+    def max_ts(self):
+        return self.conn.execute("SELECT MAX(ts) FROM trades").fetchone()[0]
+
+    def trade_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+
+    def refresh_rollups(self):
+        """
+        Recompute the daily rollup for every dirty day (new trades, late
+        arrivals, corrections) and the weekly rollup for the weeks containing
+        them. A store with trades but no rollups yet is rebuilt in full.
+        Returns the number of days recomputed.
+        """
+        with self.conn:
+            if not self.conn.execute("SELECT 1 FROM daily_rollup LIMIT 1").fetchone():
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO dirty_days SELECT DISTINCT ts / 86400 FROM trades")
+            days = [row[0] for row in self.conn.execute("SELECT day FROM dirty_days")]
+            if not days:
+                return 0
+            for day in days:
+                volume, trades = self.conn.execute(
+                    "SELECT COALESCE(SUM(count), 0), COUNT(*) FROM trades "
+                    "WHERE ts >= ? AND ts < ?", (day * 86400, (day + 1) * 86400)).fetchone()
+                if trades:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO daily_rollup VALUES (?, ?, ?)", (day, volume, trades))
+                else:
+                    self.conn.execute("DELETE FROM daily_rollup WHERE day = ?", (day,))
+            for week in {int(w) for w in week_starts(np.array(days, dtype=np.int64))}:
+                volume, = self.conn.execute(
+                    "SELECT SUM(volume) FROM daily_rollup WHERE day >= ? AND day < ?",
+                    (week, week + 7)).fetchone()
+                if volume is None:
+                    self.conn.execute("DELETE FROM weekly_rollup WHERE week_start = ?", (week,))
+                else:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO weekly_rollup VALUES (?, ?)", (week, volume))
+            self.conn.execute("DELETE FROM dirty_days")
+        return len(days)
+
+    def _replace_candles(self, tier, lo, hi, tickers, candles):
+        """Swap the stored candles of a tier in [lo, hi) for a freshly built batch"""
+        self.conn.execute("DELETE FROM candles WHERE tier = ? AND start >= ? AND start < ?",
+                          (tier, lo, hi))
+        ticker_ids, starts, open_, high, low, close, volume, trades = candles
+        nan_to_none = lambda values: [None if v != v else v for v in values.tolist()]
+        self.conn.executemany(
+            "INSERT INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            zip([tier] * len(starts), starts.tolist(), tickers[ticker_ids].tolist(),
+                nan_to_none(open_), nan_to_none(high), nan_to_none(low), nan_to_none(close),
+                volume.tolist(), trades.tolist()))
+
+    def _stored_candles(self, tier, lo, hi):
+        """(tickers, candle batch sorted by ticker and start) of a tier in [lo, hi)"""
+        rows = self.conn.execute(
+            "SELECT ticker, start, open, high, low, close, volume, trades FROM candles "
+            "WHERE tier = ? AND start >= ? AND start < ? ORDER BY ticker, start",
+            (tier, lo, hi)).fetchall()
+        columns = list(zip(*rows)) if rows else [()] * 8
+        tickers, ticker_ids = np.unique(np.array(columns[0], dtype=object), return_inverse=True)
+        prices = [np.array(c, dtype=np.float64) for c in columns[2:6]]  # NULL -> nan
+        return tickers, (ticker_ids, np.array(columns[1], dtype=np.int64), *prices,
+                         np.array(columns[6], dtype=np.float64), np.array(columns[7], dtype=np.int64))
+
+    def refresh_candles(self):
+        """
+        Rebuild the candle tiers for every day with new trades: minute candles
+        from that day's trades, then 1h from 1m and 1d from 1h in memory, then
+        the affected ISO weeks from the stored 1d tier. Finally each tier is
+        pruned to its retention. A store with trades but no candles yet is
+        rebuilt in full. Returns the number of days recomputed.
+        """
+        with self.conn:
+            if not self.conn.execute("SELECT 1 FROM candles LIMIT 1").fetchone():
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO candle_dirty_days SELECT DISTINCT ts / 86400 FROM trades")
+            days = [row[0] for row in self.conn.execute("SELECT day FROM candle_dirty_days ORDER BY day")]
+            if not days:
+                return 0
+            (minute, _, _), (hour, hour_width, _), (day_tier, day_width, _), (week, week_width, _) = TIERS
+            for day in days:
+                lo, hi = day * 86400, (day + 1) * 86400
+                rows = self.conn.execute(
+                    "SELECT ticker, ts, yes_price, count FROM trades WHERE ts >= ? AND ts < ? "
+                    "ORDER BY ticker, ts, trade_id", (lo, hi)).fetchall()
+                columns = list(zip(*rows)) if rows else [()] * 4
+                tickers, ticker_ids = np.unique(np.array(columns[0], dtype=object), return_inverse=True)
+                prices = np.array([np.nan if p is None else p for p in columns[2]], dtype=np.float64)
+                batch = from_trades(ticker_ids, np.array(columns[1], dtype=np.int64), prices, columns[3])
+                self._replace_candles(minute, lo, hi, tickers, batch)
+                batch = downsample(batch, hour_width)
+                self._replace_candles(hour, lo, hi, tickers, batch)
+                self._replace_candles(day_tier, lo, hi, tickers, downsample(batch, day_width))
+            for week_day in {int(w) for w in week_starts(np.array(days, dtype=np.int64))}:
+                lo, hi = week_day * 86400, week_day * 86400 + week_width
+                tickers, batch = self._stored_candles(day_tier, lo, hi)
+                self._replace_candles(week, lo, hi, tickers, downsample(batch, week_width))
+            latest = self.max_ts() or 0
+            for tier, _, retention in TIERS:
+                if retention is not None:
+                    self.conn.execute("DELETE FROM candles WHERE tier = ? AND start < ?",
+                                      (tier, latest - retention))
+            self.conn.execute("DELETE FROM candle_dirty_days")
+        return len(days)
+
+    def candle_volume(self, tier, since_ts=0):
+        """[(bucket start ts, contracts, trades)] summed over all tickers for one candle tier"""
+        return self.conn.execute(
+            "SELECT start, SUM(volume), SUM(trades) FROM candles WHERE tier = ? AND start >= ? "
+            "GROUP BY start ORDER BY start", (tier, since_ts)).fetchall()
+
+    def candles(self, tier, ticker, since_ts=0):
+        """[(start, open, high, low, close, volume, trades)] for one ticker and tier"""
+        return self.conn.execute(
+            "SELECT start, open, high, low, close, volume, trades FROM candles "
+            "WHERE tier = ? AND ticker = ? AND start >= ? ORDER BY start",
+            (tier, ticker, since_ts)).fetchall()
+
+    def daily_volume(self, since_ts=0):
+        """[(YYYY-MM-DD, contracts)] per UTC day from since_ts onward, from the rollup table"""
+        return self.conn.execute(
+            "SELECT date(day * 86400, 'unixepoch'), volume FROM daily_rollup "
+            "WHERE day >= ? ORDER BY day", (since_ts // 86400,)).fetchall()
+
+    def weekly_volume(self, since_ts=0):
+        """[(YYYY-MM-DD week start, contracts)] per ISO week from since_ts onward"""
+        since_week = int(week_starts(np.int64(since_ts // 86400)))
+        return self.conn.execute(
+            "SELECT date(week_start * 86400, 'unixepoch'), volume FROM weekly_rollup "
+            "WHERE week_start >= ? ORDER BY week_start", (since_week,)).fetchall()
+
+    def trade_columns(self, since_ts=0):
+        """(ts int64, count float64) arrays for every stored trade from since_ts onward"""
+        rows = self.conn.execute(
+            "SELECT ts, count FROM trades WHERE ts >= ?", (since_ts,)).fetchall()
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        ts, counts = zip(*rows)
+        return np.array(ts, dtype=np.int64), np.array(counts, dtype=np.float64)
+
+    def verify_rollups(self):
+        """
+        Rebuild daily and weekly volume from every stored trade and compare with
+        the materialized tables. Returns a list of mismatch descriptions (empty
+        when the incremental rollups are correct).
+        """
+        full = rollup(*self.trade_columns())
+        mismatches = []
+        for name, table, key in (("daily", "daily_rollup", "day"),
+                                 ("weekly", "weekly_rollup", "week_start")):
+            starts, sums = full[name]
+            expected = dict(zip(to_days(starts).tolist(), sums.tolist()))
+            actual = dict(self.conn.execute(f"SELECT {key}, volume FROM {table}").fetchall())
+            for bucket in sorted(expected.keys() | actual.keys()):
+                want, got = expected.get(bucket), actual.get(bucket)
+                if want is None or got is None or not math.isclose(want, got, rel_tol=VERIFY_RTOL):
+                    label = np.datetime_as_string(np.datetime64(bucket, "D"))
+                    mismatches.append(f"{name} {label}: rebuilt {want}, materialized {got}")
+        return mismatches
@@ -0,0 +1,60 @@
+"""
+Shared test fixtures: the local API stand-in from benchmarks/fixture_server.py
+and scratch copies of the pipeline code, so update scripts run end to end
+without the network and without touching the working tree's history or outputs.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT_DIR, "benchmarks")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_pipeline import make_tree
+from fixture_server import FixtureData, FixtureServer, environment
+
+# Markets, trades and Dune rows served by the stand-in
+FIXTURE_SCALE = 300
+
+
+@pytest.fixture
+def fixture_data():
+    return FixtureData(FIXTURE_SCALE)
+
+
+@pytest.fixture
+def api(fixture_data):
+    server = FixtureServer(fixture_data).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def local_http(tmp_path, monkeypatch):
+    """In-process HTTP clients: no rate limiting for the stand-in, endpoint health kept in tmp_path"""
+    from shared import http_client
+    monkeypatch.setenv("HTTP_RATE_LIMITS", environment("")["HTTP_RATE_LIMITS"])
+    monkeypatch.setattr(http_client.health, "path", str(tmp_path / "endpoint_health.json"))
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """A fresh copy of the pipeline code (no caches, history or outputs)"""
+    make_tree(str(tmp_path))
+    return tmp_path
+
+
+def run_script(tree, script, server, *args):
+    """Run an update script in a scratch tree against the stand-in; returns its output"""
+    env = dict(os.environ, **environment(server.url),
+               RUN_REPORT_PATH=os.path.join(str(tree), "history", "run_report.jsonl"))
+    result = subprocess.run([sys.executable, script, *args], cwd=str(tree), env=env,
+                            capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
@@ -0,0 +1,86 @@
+"""
+backfill_kalshi_history.py resume logic: a walk killed partway resumes at the
+page after the last committed one, and the two walks together store every
+trade of the window exactly once.
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+from conftest import ROOT_DIR
+from fixture_server import KALSHI_PREFIX
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "Kalshi-HOOD Dashboard"))
+
+import backfill_kalshi_history as backfill
+from backfill_kalshi_history import backfill_ticker, resume_cursor
+from shared.trade_store import TradeStore
+
+TICKER = "BENCH0-E0-M0"
+PAGE_LIMIT = 25
+KILL_AFTER_PAGES = 3
+
+
+class Killed(Exception):
+    pass
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TradeStore(str(tmp_path / "trades.db"))
+    yield store
+    store.close()
+
+
+def test_resume_cursor():
+    window = {"start_ts": 100, "end_ts": 200}
+    assert resume_cursor({}, 100, 200) == ""
+    assert resume_cursor(dict(window, cursor="50", done=False), 100, 200) == "50"
+    # An interrupted walk of another window starts over
+    assert resume_cursor(dict(window, cursor="50", done=False), 100, 300) == ""
+    assert resume_cursor(dict(window, cursor="", done=True), 120, 200) is None
+    assert resume_cursor(dict(window, cursor="", done=True), 50, 200) == ""
+
+
+def test_killed_walk_resumes_without_duplicates_or_gaps(api, fixture_data, local_http, store, monkeypatch):
+    endpoints = [api.url + KALSHI_PREFIX]
+    start_ts = int(fixture_data.now - 250 * fixture_data.trade_step)
+    end_ts = int(fixture_data.now - 50 * fixture_data.trade_step)
+    window = fixture_data.trades_page({"min_ts": start_ts, "max_ts": end_ts - 1, "limit": 10 ** 6})
+    expected = {trade["trade_id"] for trade in window["trades"]}
+    pages = -(-len(expected) // PAGE_LIMIT)
+    assert pages > KILL_AFTER_PAGES + 1
+    monkeypatch.setattr(backfill, "TRADES_PAGE_LIMIT", PAGE_LIMIT)
+
+    request = backfill.request_with_failover
+    calls = []
+
+    def killed_partway(*args, **kwargs):
+        if len(calls) == KILL_AFTER_PAGES:
+            raise Killed()
+        calls.append(1)
+        return request(*args, **kwargs)
+
+    monkeypatch.setattr(backfill, "request_with_failover", killed_partway)
+    lock = threading.Lock()
+    with pytest.raises(Killed):
+        backfill_ticker(store, lock, endpoints, TICKER, start_ts, end_ts)
+    first_walk = store.trade_count()
+    assert first_walk == KILL_AFTER_PAGES * PAGE_LIMIT
+    assert not store.get_checkpoint(TICKER)["done"]
+
+    monkeypatch.setattr(backfill, "request_with_failover", request)
+    served = api.stats["kalshi_trades"]["requests"]
+    inserted, skipped = backfill_ticker(store, lock, endpoints, TICKER, start_ts, end_ts)
+
+    # The resumed walk only fetched the pages the killed one had not stored
+    assert api.stats["kalshi_trades"]["requests"] - served == pages - KILL_AFTER_PAGES
+    assert not skipped and inserted == len(expected) - first_walk
+    stored = {row[0] for row in store.conn.execute("SELECT trade_id FROM trades")}
+    assert stored == expected
+    assert store.get_checkpoint(TICKER)["done"]
+    # A finished window is skipped
+    assert backfill_ticker(store, lock, endpoints, TICKER, start_ts, end_ts) == (0, True)
@@ -0,0 +1,76 @@
+"""
+DuneClient.execute / wait_for against the stand-in's execution endpoints:
+polling through PENDING, timing out, a FAILED execution, and the on-disk
+results cache answering a repeat execution without any request.
+"""
+
+import pytest
+
+from fixture_server import DUNE_QUERIES, FixtureServer
+from shared import dune_client
+from shared.dune_client import DuneClient, DuneError
+
+QUERY_ID = next(iter(DUNE_QUERIES))
+
+
+@pytest.fixture
+def dune_api(fixture_data, request, local_http, monkeypatch):
+    """Stand-in configured by @pytest.mark.parametrize("dune_api", [kwargs], indirect=True)"""
+    server = FixtureServer(fixture_data, **getattr(request, "param", {})).start()
+    monkeypatch.setattr(dune_client, "POLL_INITIAL", 0.01)
+    monkeypatch.setattr(dune_client, "POLL_MAX", 0.05)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(dune_api, tmp_path):
+    return DuneClient(api_key="test", base_url=dune_api.url + "/api/v1",
+                      cache_dir=str(tmp_path / "dune"))
+
+
+def requests_to(server, route):
+    return server.stats.get(route, {}).get("requests", 0)
+
+
+@pytest.mark.parametrize("dune_api", [{"pending_polls": 3}], indirect=True)
+def test_execute_polls_until_completed(dune_api, client, fixture_data):
+    response = client.execute(QUERY_ID)
+
+    assert response["state"] == dune_client.COMPLETED
+    assert response["result"]["rows"] == fixture_data.dune_page(QUERY_ID, {})["result"]["rows"]
+    assert requests_to(dune_api, "dune_execute") == 1
+    assert requests_to(dune_api, "dune_status") == 4
+    assert requests_to(dune_api, "dune_execution_results") == 1
+
+
+@pytest.mark.parametrize("dune_api", [{"pending_polls": 10 ** 6}], indirect=True)
+def test_execute_times_out_while_pending(dune_api, client, tmp_path):
+    with pytest.raises(DuneError, match="still QUERY_STATE_PENDING"):
+        client.execute(QUERY_ID, timeout=0.2)
+
+    assert requests_to(dune_api, "dune_status") > 1
+    assert requests_to(dune_api, "dune_execution_results") == 0
+    assert not (tmp_path / "dune").exists()
+
+
+@pytest.mark.parametrize("dune_api", [{"pending_polls": 1, "failing_queries": [QUERY_ID]}], indirect=True)
+def test_failed_execution_raises(dune_api, client):
+    with pytest.raises(DuneError, match="QUERY_STATE_FAILED"):
+        client.execute(QUERY_ID)
+
+    assert requests_to(dune_api, "dune_status") == 2
+    assert requests_to(dune_api, "dune_execution_results") == 0
+
+
+def test_fresh_cached_results_skip_execution(dune_api, client):
+    first = client.execute(QUERY_ID, params={"days": 7})
+    served = sum(route["requests"] for route in dune_api.stats.values())
+
+    assert client.execute(QUERY_ID, params={"days": 7}) == first
+    assert sum(route["requests"] for route in dune_api.stats.values()) == served
+
+    # Other parameters are another cache entry
+    client.execute(QUERY_ID, params={"days": 30})
+    assert requests_to(dune_api, "dune_execute") == 2
@@ -0,0 +1,31 @@
+"""EndpointHealth saves from concurrent workers don't trip over each other's temp files"""
+
+import json
+import threading
+
+from shared.http_client import EndpointHealth
+
+SAVERS = 16
+SAVES = 50
+
+
+def test_concurrent_saves_leave_a_valid_file(tmp_path, capsys):
+    health = EndpointHealth(str(tmp_path / "endpoint_health.json"))
+    health._record("https://example.invalid")
+    barrier = threading.Barrier(SAVERS)
+
+    def saver():
+        barrier.wait()
+        for _ in range(SAVES):
+            health.save()
+
+    threads = [threading.Thread(target=saver) for _ in range(SAVERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert "Could not save" not in capsys.readouterr().out
+    assert json.loads((tmp_path / "endpoint_health.json").read_text()) == {
+        "https://example.invalid": {"failures": 0}}
+    assert [p.name for p in tmp_path.iterdir()] == ["endpoint_health.json"]
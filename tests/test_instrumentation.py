@@ -0,0 +1,44 @@
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import ROOT_DIR, run_script
+from shared import instrumentation
+
+
+def test_concurrent_stages_count_only_their_own_traffic(tmp_path):
+    report = instrumentation.RunReport("test", str(tmp_path / "report.jsonl"))
+    both_open = threading.Barrier(2)
+
+    def stage(name, requests):
+        with report.stage(name):
+            both_open.wait()
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                # Work handed on from inside the stage still counts towards it
+                for _ in range(requests):
+                    pool.submit(instrumentation.bind(instrumentation.count), "requests").result()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for future in [pool.submit(stage, "a", 3), pool.submit(stage, "b", 5)]:
+            future.result()
+
+    record = report.to_dict("ok")
+    stages = {s["stage"]: s for s in record["stages"]}
+    assert stages["a"]["requests"] == 3
+    assert stages["b"]["requests"] == 5
+    assert record["requests"] == 8
+
+
+def test_pipeline_stage_traffic_adds_up_to_the_run_total(tree, api):
+    shutil.copy(os.path.join(ROOT_DIR, "run_pipeline.py"), str(tree))
+    run_script(tree, "run_pipeline.py", api)
+
+    with open(tree / "history" / "run_report.jsonl") as f:
+        record = [json.loads(line) for line in f][-1]
+    stages = {s["stage"]: s for s in record["stages"]}
+    assert sum(s["requests"] for s in stages.values()) == record["requests"]
+    assert sum(s["bytes"] for s in stages.values()) == record["bytes"]
+    for name in ("rollups_kalshi", "rollups_polymarket", "render_kalshi_dashboard", "write_dune"):
+        assert stages[name]["requests"] == 0, name
@@ -0,0 +1,100 @@
+"""
+polygon_logs against responses in the shape polygon nodes return
+(tests/fixtures/polygon_rpc.json): ABI decoding to known values, and
+eth_getLogs ranges refused over the node's result limit being split and
+rejoined without gaps or duplicates.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+from conftest import ROOT_DIR
+from fixture_server import FixtureServer
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "Kalshi-HOOD Dashboard"))
+
+from polygon_logs import JsonRpcClient, RpcError, decode_logs, iter_decoded_events, to_rows
+from verify_double_counting import POLYMARKET_CONTRACTS
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "polygon_rpc.json")
+EXCHANGES = [POLYMARKET_CONTRACTS["CTF_EXCHANGE"], POLYMARKET_CONTRACTS["NEGRISK_CTF_EXCHANGE"]]
+FIRST_BLOCK, LAST_BLOCK = 65000000, 65000009
+ASSET_ID = "52114319501245915516055106046884209969926127482827954674443846427813813222426"
+
+
+@pytest.fixture(scope="module")
+def recorded():
+    with open(FIXTURE_PATH, "r") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def rpc_server(fixture_data, recorded, request):
+    server = FixtureServer(fixture_data, rpc_logs=recorded["logs"], rpc_blocks=recorded["blocks"],
+                           rpc_log_limit=request.param).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_decode_logs_matches_known_values(recorded):
+    decoded = decode_logs(recorded["logs"])
+
+    assert len(decoded["order_filled"]["block_number"]) == 7
+    assert len(decoded["orders_matched"]["block_number"]) == 3
+    filled = to_rows(decoded["order_filled"])
+    assert filled[0] == {
+        "block_number": 65000000,
+        "log_index": 12,
+        "tx_hash": "0xed823546927eea3bf39bededf65165ec68126f3448634b85c573d769b5186773",
+        "exchange": POLYMARKET_CONTRACTS["CTF_EXCHANGE"],
+        "maker": "0x2bd806c97f0e00af1a1fc3328fa763a9269723c8",
+        "maker_asset_id": "0",
+        "taker_asset_id": ASSET_ID,
+        "maker_amount": 5_000_000,
+        "taker_amount": 10_000_000,
+        "fee": 0,
+        "taker": "0x81b637d8fcd2c6da6359e6963113a1170de795e4",
+    }
+    # Amounts above 32 bits survive the uint64 decode
+    assert filled[-1]["maker_amount"] == 18_446_744_073
+    assert filled[-1]["taker_amount"] == 9_000_000_000
+    assert filled[-1]["fee"] == 45_000_000
+    matched = to_rows(decoded["orders_matched"])
+    assert matched[0]["maker"] == "0x81b637d8fcd2c6da6359e6963113a1170de795e4"
+    assert "taker" not in matched[0] and "fee" not in matched[0]
+
+
+@pytest.mark.parametrize("rpc_server", [3], indirect=True)
+def test_refused_ranges_are_split_and_rejoined(rpc_server, recorded):
+    rpc = JsonRpcClient(rpc_server.url + "/rpc", batch_size=2)
+    batches = list(iter_decoded_events(rpc, EXCHANGES, FIRST_BLOCK, LAST_BLOCK, block_chunk=10))
+
+    seen = [(block, index) for batch in batches for columns in batch.values()
+            for block, index in zip(columns["block_number"].tolist(), columns["log_index"].tolist())]
+    expected = [(int(log["blockNumber"], 16), int(log["logIndex"], 16)) for log in recorded["logs"]]
+    assert sorted(seen) == sorted(expected)
+    assert len(set(seen)) == len(seen)
+
+    # Some ranges were refused, and the served ones tile the requested range exactly
+    assert any(not served for _, _, served in rpc_server.log_ranges)
+    served = sorted((start, end) for start, end, ok in rpc_server.log_ranges if ok)
+    assert served[0][0] == FIRST_BLOCK and served[-1][1] == LAST_BLOCK
+    assert all(nxt[0] == prev[1] + 1 for prev, nxt in zip(served, served[1:]))
+
+    # Timestamps come from the logs where the node includes them, else from the blocks
+    timestamps = {block: ts for batch in batches for columns in batch.values()
+                  for block, ts in zip(columns["block_number"].tolist(), columns["timestamp"].tolist())}
+    assert timestamps == {block: 1727000000 + 2 * (block - FIRST_BLOCK) for block, _ in expected}
+
+
+@pytest.mark.parametrize("rpc_server", [2], indirect=True)
+def test_single_block_over_the_limit_raises(rpc_server):
+    rpc = JsonRpcClient(rpc_server.url + "/rpc", batch_size=2)
+
+    with pytest.raises(RpcError) as error:
+        list(iter_decoded_events(rpc, EXCHANGES, FIRST_BLOCK, LAST_BLOCK, block_chunk=10))
+    assert error.value.range_too_large
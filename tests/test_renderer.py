@@ -0,0 +1,63 @@
+"""
+write_if_changed skips dashboard pages that differ from the file on disk only
+in their "Last Updated" timestamp, and still writes real changes.
+"""
+
+import copy
+import importlib.util
+import json
+import os
+
+import pytest
+
+from conftest import ROOT_DIR
+from shared.renderer import LAST_UPDATED, write_if_changed
+
+DASHBOARDS = {
+    "kalshi": ("Kalshi-HOOD Dashboard", "generate_dashboard_html"),
+    "polymarket": ("Polymarket Dashboard", "generate_html"),
+}
+# The Polymarket data file is not committed; the fields its page reads
+POLYMARKET_DATA = {
+    "last_updated": "2026-10-16 12:00:00 UTC",
+    "metrics": {"volume_24h_millions": 41.2, "open_interest_millions": 310.5,
+                "liquidity_millions": 88.9, "active_markets": 5321},
+}
+
+
+def load_dashboard(name):
+    """A dashboard's render function (both modules are named update_dashboard) and its data"""
+    directory, render = DASHBOARDS[name]
+    spec = importlib.util.spec_from_file_location(
+        f"{name}_update_dashboard", os.path.join(ROOT_DIR, directory, "update_dashboard.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if name == "polymarket":
+        return getattr(module, render), POLYMARKET_DATA
+    with open(module.DATA_PATH, "r") as f:
+        return getattr(module, render), json.load(f)
+
+
+def test_volatile_parts_are_left_out_of_the_comparison(tmp_path):
+    path = str(tmp_path / "page.html")
+    assert write_if_changed(path, b"<p>Last Updated: 2026-10-16</p><b>1</b>", LAST_UPDATED)
+
+    assert not write_if_changed(path, b"<p>Last Updated: 2026-10-17</p><b>1</b>", LAST_UPDATED)
+    assert (tmp_path / "page.html").read_bytes() == b"<p>Last Updated: 2026-10-16</p><b>1</b>"
+    assert write_if_changed(path, b"<p>Last Updated: 2026-10-17</p><b>2</b>", LAST_UPDATED)
+    # Without a volatile pattern every byte counts
+    assert write_if_changed(path, b"<p>Last Updated: 2026-10-18</p><b>2</b>")
+
+
+@pytest.mark.parametrize("name", sorted(DASHBOARDS))
+def test_dashboard_rerender_with_only_a_new_timestamp_is_skipped(name, tmp_path):
+    render, data = load_dashboard(name)
+    path = str(tmp_path / "index.html")
+    assert write_if_changed(path, render(data), LAST_UPDATED)
+
+    later = dict(data, last_updated="2099-01-01 00:00:00 UTC")
+    assert not write_if_changed(path, render(later), LAST_UPDATED)
+
+    changed = copy.deepcopy(later)
+    changed["metrics"]["volume_24h_millions"] += 1
+    assert write_if_changed(path, render(changed), LAST_UPDATED)
@@ -0,0 +1,48 @@
+"""
+shared/revenue.py keeps the dashboard's published formulas: 24h and latest
+week volume x rate, monthly = weekly x 4.3, annual = monthly x 12, and the
+estimated daily revenue at the full $0.02 exchange fee.
+"""
+
+import pytest
+
+from shared.revenue import HOOD_RATES, estimated_daily_revenue, revenue_tables
+
+VOLUME_24H = 272_374_066
+LATEST_WEEK_VOLUME = 2_214_158_000
+
+
+def test_cards_follow_the_published_formulas():
+    tables = revenue_tables(VOLUME_24H, LATEST_WEEK_VOLUME)
+
+    for i, rate in enumerate(HOOD_RATES.tolist()):
+        weekly = LATEST_WEEK_VOLUME * rate / 1e6
+        assert tables["daily"][i] == pytest.approx(VOLUME_24H * rate / 1e6, abs=1e-4)
+        assert tables["weekly"][i] == pytest.approx(weekly, abs=1e-4)
+        assert tables["monthly"][i] == pytest.approx(weekly * 4.3, abs=1e-4)
+        assert tables["annual"][i] == pytest.approx(weekly * 4.3 * 12, abs=1e-4)
+
+
+def test_estimated_daily_revenue_is_volume_times_exchange_fee():
+    assert estimated_daily_revenue(VOLUME_24H) == round(VOLUME_24H * 0.02, 2)
+
+
+def revenue_at(tables, card, rate):
+    """The page's revenueAt(): grid rates read their value, others scale the largest grid rate's"""
+    rates = tables["hood_rates"]
+    for r, value in zip(rates, tables[card]):
+        if abs(r - rate) < 1e-9:
+            return value
+    return rate * tables[card][-1] / rates[-1]
+
+
+@pytest.mark.parametrize("rate", [0.0005, 0.001, 0.0125, 0.1, 0.15, 0.5])
+def test_cards_at_the_grid_ends_and_off_the_grid(rate):
+    tables = revenue_tables(VOLUME_24H, LATEST_WEEK_VOLUME)
+    weekly = LATEST_WEEK_VOLUME * rate / 1e6
+    expected = {"daily": VOLUME_24H * rate / 1e6, "weekly": weekly,
+                "monthly": weekly * 4.3, "annual": weekly * 4.3 * 12}
+
+    for card, value in expected.items():
+        # Within the 4-decimal rounding of the tables, not multiplied by an extrapolation
+        assert revenue_at(tables, card, rate) == pytest.approx(value, abs=1e-4 * max(1, rate / 0.1)), card
@@ -0,0 +1,21 @@
+import json
+import os
+
+from conftest import run_script
+
+GAMMA_SCRIPT = os.path.join("Polymarket Dashboard", "update_polymarket_data.py")
+GAMMA_DELTA = os.path.join("Polymarket Dashboard", "polymarket_markets_delta.json")
+
+
+def test_unchanged_gamma_runs_give_an_empty_delta(tree, api):
+    # The first run is a full crawl, the second walks open markets only and
+    # takes closed/settled ones from the lifecycle index
+    run_script(tree, GAMMA_SCRIPT, api)
+    output = run_script(tree, GAMMA_SCRIPT, api)
+    assert "Fetched open markets only" in output
+
+    with open(tree / GAMMA_DELTA) as f:
+        delta = json.load(f)
+    assert delta["previous_run"] is not None
+    assert delta["columns"]["tickers"] == []
+    assert all(value == 0 for value in delta["summary"].values()), delta["summary"]
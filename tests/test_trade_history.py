@@ -0,0 +1,89 @@
+"""
+The dashboard history read from the trade store only holds days the store
+fully covers and complete ISO weeks; until the store covers a complete week
+the data file keeps its labelled placeholder series instead.
+"""
+
+import os
+import sys
+from datetime import datetime, timezone
+
+from conftest import ROOT_DIR
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "Kalshi-HOOD Dashboard"))
+
+from ingest_kalshi_trades import STREAM
+from shared.trade_store import TradeStore
+from update_kalshi_data import build_history_from_store, build_volume_data
+
+# Wednesday 13:00 UTC to Sunday 08:00 UTC, two and a half weeks later
+COVERED_FROM = int(datetime(2026, 9, 2, 13, tzinfo=timezone.utc).timestamp())
+COVERED_TO = int(datetime(2026, 9, 20, 8, tzinfo=timezone.utc).timestamp())
+
+
+def hourly_trades(start_ts, end_ts, count=10.0):
+    return [(f"t{ts}", "KXTEST-1", ts, count, 50, "yes") for ts in range(start_ts, end_ts, 3600)]
+
+
+def make_store(path, covered=True):
+    store = TradeStore(str(path))
+    store.append_trades(hourly_trades(COVERED_FROM, COVERED_TO))
+    if covered:
+        store.extend_coverage(STREAM, COVERED_FROM, COVERED_TO)
+    store.refresh_rollups()
+    return store
+
+
+def test_history_drops_partial_days_and_weeks(tmp_path):
+    store = make_store(tmp_path / "trades.db")
+    try:
+        daily, weekly = build_history_from_store(store)
+    finally:
+        store.close()
+
+    assert daily[0]["date"] == "2026-09-03"
+    assert daily[-1]["date"] == "2026-09-19"
+    assert {d["volume"] for d in daily} == {240}
+    # Sep 14-20 ends on the partial last day; Aug 31 - Sep 6 starts before the store
+    assert weekly == [{"week_start": "2026-09-07", "volume": 1680,
+                       "volume_millions": 0.0, "volume_billions": 0.0}]
+
+
+def test_stores_without_recorded_coverage_use_their_trade_span(tmp_path):
+    store = make_store(tmp_path / "trades.db", covered=False)
+    try:
+        daily, _ = build_history_from_store(store)
+    finally:
+        store.close()
+
+    assert (daily[0]["date"], daily[-1]["date"]) == ("2026-09-03", "2026-09-19")
+
+
+def test_published_history_is_only_the_covered_span(tmp_path):
+    store = make_store(tmp_path / "trades.db")
+    try:
+        history = build_history_from_store(store)
+    finally:
+        store.close()
+
+    data, daily_all, weekly_all = build_volume_data(None, history)
+
+    assert (daily_all, weekly_all) == history
+    assert data["weekly_data"] == weekly_all
+    assert "from stored trades" in data["source"]
+
+
+def test_cold_start_keeps_the_placeholder_series(tmp_path):
+    # Two days of ingestion: one complete day, no complete week
+    store = TradeStore(str(tmp_path / "trades.db"))
+    try:
+        store.append_trades(hourly_trades(COVERED_TO - 2 * 86400, COVERED_TO))
+        store.extend_coverage(STREAM, COVERED_TO - 2 * 86400, COVERED_TO)
+        store.refresh_rollups()
+        history = build_history_from_store(store)
+    finally:
+        store.close()
+
+    assert history is None
+    data, _, _ = build_volume_data(None, history)
+    assert data["source"] == "Generated from historical patterns (API unavailable)"
@@ -0,0 +1,87 @@
+"""
+VolumeMethodAccumulator over the decoded events of tests/fixtures/polygon_rpc.json,
+against totals worked out by hand with verification_query.sql's rules:
+
+  sum_all_order_filled  takerAmountFilled of every OrderFilled with takerAssetId = 0
+  taker_side_only       the same, for taker-focused fills (taker is an exchange)
+  maker_side_only       makerAmountFilled of maker-focused fills with makerAssetId = 0
+  orders_matched        the USDC side of every OrdersMatched
+
+Fixture rows (USDC amounts in $, "-" where that side is the outcome token):
+
+  log  block  event  maker pays   taker pays   taker       market
+   0     0    fill       5.00         -        bob         ASSET
+   1     0    fill        -          2.12      bob         ASSET
+   2     0    match      5.00         -                    ASSET
+   3     1    fill        -         66.00      erin        ASSET2
+   4     1    match     66.00         -                    ASSET2
+   5     3    fill       1.25         -        CTF         ASSET
+   6     6    fill        -          0.15      hank        ASSET2
+   7     6    fill        -          0.35      NegRisk     ASSET2
+   8     6    match      0.50         -                    ASSET2
+   9     9    fill        -       9000.00      CTF         ASSET
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import ROOT_DIR
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "Kalshi-HOOD Dashboard"))
+
+from polygon_logs import decode_logs
+from verify_double_counting import POLYMARKET_CONTRACTS, VOLUME_METHODS, VolumeMethodAccumulator
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "polygon_rpc.json")
+EXCHANGES = {POLYMARKET_CONTRACTS[name][2:].encode() for name in ("CTF_EXCHANGE", "NEGRISK_CTF_EXCHANGE")}
+ASSET = "52114319501245915516055106046884209969926127482827954674443846427813813222426"
+ASSET2 = "71321045679252212594626385532706912750332728571942532289631379312455583992563"
+
+EXPECTED_TOTAL = {
+    "sum_all_order_filled": 2.12 + 66.00 + 0.15 + 0.35 + 9000.00,
+    "taker_side_only": 0.35 + 9000.00,
+    "maker_side_only": 5.00,
+    "orders_matched": 5.00 + 66.00 + 0.50,
+}
+EXPECTED_BY_MARKET = {
+    ASSET: {"sum_all_order_filled": 2.12 + 9000.00, "taker_side_only": 9000.00,
+            "maker_side_only": 5.00, "orders_matched": 5.00},
+    ASSET2: {"sum_all_order_filled": 66.00 + 0.15 + 0.35, "taker_side_only": 0.35,
+             "maker_side_only": 0.0, "orders_matched": 66.00 + 0.50},
+}
+
+
+def decoded_batches(split_at):
+    """The fixture's logs decoded in two batches, with block timestamps attached"""
+    with open(FIXTURE_PATH, "r") as f:
+        recorded = json.load(f)
+    timestamps = {int(number, 16): int(block["timestamp"], 16) for number, block in recorded["blocks"].items()}
+    for logs in (recorded["logs"][:split_at], recorded["logs"][split_at:]):
+        decoded = decode_logs(logs)
+        for columns in decoded.values():
+            columns["timestamp"] = np.array([timestamps[b] for b in columns["block_number"].tolist()])
+        yield decoded
+
+
+@pytest.mark.parametrize("split_at", [0, 4, 10])
+def test_volume_methods_match_hand_computed_totals(split_at):
+    accumulator = VolumeMethodAccumulator(EXCHANGES)
+    for decoded in decoded_batches(split_at):
+        accumulator.update(decoded)
+    result = accumulator.result()
+
+    assert result["events"] == 10
+    for method in VOLUME_METHODS:
+        assert result[method] == pytest.approx(EXPECTED_TOTAL[method])
+    assert result["double_count_ratio"] == pytest.approx(9068.62 / 9000.35)
+    # Every block falls on 2024-09-22 UTC
+    assert list(result["by_day"]) == ["2024-09-22"]
+    assert result["by_day"]["2024-09-22"]["taker_side_only"] == pytest.approx(9000.35)
+    assert set(result["by_market"]) == set(EXPECTED_BY_MARKET)
+    for market, expected in EXPECTED_BY_MARKET.items():
+        for method in VOLUME_METHODS:
+            assert result["by_market"][market][method] == pytest.approx(expected[method]), (market, method)